@@ -0,0 +1,193 @@
+import math
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from sqlalchemy import event, select, func, case, insert, delete, literal_column
+from app import app, db
+from models import Vaga, Candidato, TermoVetor, FrequenciaTermo, TextoCurriculo
+from leitura_curriculo import descomprimir_texto
+from banco import em_lotes
+
+# Afinidade entre vagas e candidatos por TF-IDF, no esquema lnc.ltc: cada documento
+# é gravado em vetores_termos com pesos 1 + log(tf) normalizados, sem IDF, e o IDF
+# entra só no vetor da consulta, na hora de pontuar. Incluir um documento não muda
+# os vetores já gravados, e pontuar todos os candidatos de uma vaga é um único
+# SELECT ... GROUP BY (a matriz esparsa multiplicada pelo vetor da consulta).
+
+STOPWORDS = frozenset('''
+    a ao aos as com como da das de do dos e ela ele em entre essa esse foi ha isso
+    ja mais mas na nas no nos o os ou para pela pelas pelo pelos por qual que se sem
+    ser seu sua sob sobre tem um uma umas uns vaga vagas the and of to in for with
+'''.split())
+
+PALAVRA = re.compile(r'[a-z0-9+#]+')
+
+TERMOS_CONSULTA = 40  # só os termos de maior peso entram na consulta
+TERMOS_DOCUMENTO = 300  # idem para os documentos gravados (currículos longos)
+PESO_VAGA_ATUAL = 0.5  # peso da vaga em que o candidato se inscreveu no perfil dele
+TERMO_DOCUMENTO = 0  # linha-sentinela por documento: sua frequência é o total de documentos
+
+DDL_AFINIDADE = [
+    """CREATE TRIGGER IF NOT EXISTS vetores_frequencia_ai AFTER INSERT ON vetores_termos BEGIN
+        INSERT INTO vetores_frequencia (tipo, termo, documentos) VALUES (new.tipo, new.termo, 1)
+        ON CONFLICT (tipo, termo) DO UPDATE SET documentos = documentos + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vetores_frequencia_ad AFTER DELETE ON vetores_termos BEGIN
+        UPDATE vetores_frequencia SET documentos = documentos - 1 WHERE tipo = old.tipo AND termo = old.termo;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vetores_candidato_au AFTER UPDATE OF vaga_id ON candidatos
+    WHEN old.vaga_id IS NOT new.vaga_id BEGIN
+        UPDATE vetores_termos SET grupo = coalesce(new.vaga_id, 0) WHERE tipo = 'candidato' AND dono_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vetores_candidato_ad AFTER DELETE ON candidatos BEGIN
+        DELETE FROM vetores_termos WHERE tipo = 'candidato' AND dono_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vetores_vaga_ad AFTER DELETE ON vagas BEGIN
+        DELETE FROM vetores_termos WHERE tipo = 'vaga' AND dono_id = old.id;
+    END""",
+]
+
+def criar_afinidade(conexao):
+    for comando in DDL_AFINIDADE:
+        conexao.exec_driver_sql(comando)
+
+# Os triggers dependem de candidatos, vagas e das tabelas de vetores
+event.listen(db.metadata, 'after_create',
+             lambda target, conexao, **kw: criar_afinidade(conexao))
+
+# ===== VETORES DOS DOCUMENTOS =====
+
+def contar_termos(*textos):
+    """Frequência de cada termo (crc32 da palavra sem acentos) nos textos"""
+    contagem = Counter()
+    for texto in textos:
+        if not texto:
+            continue
+        normalizado = unicodedata.normalize('NFKD', texto.lower()).encode('ascii', 'ignore').decode()
+        for palavra in PALAVRA.findall(normalizado):
+            if len(palavra) > 1 and not palavra.isdigit() and palavra not in STOPWORDS:
+                contagem[zlib.crc32(palavra.encode()) or 1] += 1
+    return contagem
+
+def vetor_documento(contagem):
+    """Pesos 1 + log(tf) dos TERMOS_DOCUMENTO termos mais frequentes, com norma 1 (o 'lnc' do esquema)"""
+    pesos = {termo: 1 + math.log(tf) for termo, tf in contagem.most_common(TERMOS_DOCUMENTO)}
+    norma = math.sqrt(sum(peso * peso for peso in pesos.values())) or 1.0
+    return {termo: peso / norma for termo, peso in pesos.items()}
+
+def texto_vaga(vaga):
+    # Título e requisitos contam em dobro
+    return (vaga.titulo, vaga.titulo, vaga.requisitos, vaga.requisitos, vaga.descricao)
+
+def texto_candidato(candidato):
+    # Observações do RH e o texto extraído do currículo (ver extracao.py)
+    return (candidato.observacoes, descomprimir_texto(candidato.texto))
+
+def _linhas(tipo, dono_id, grupo, textos):
+    linhas = [
+        {'tipo': tipo, 'grupo': grupo, 'termo': termo, 'dono_id': dono_id, 'peso': peso}
+        for termo, peso in vetor_documento(contar_termos(*textos)).items()
+    ]
+    linhas.append({'tipo': tipo, 'grupo': grupo, 'termo': TERMO_DOCUMENTO, 'dono_id': dono_id, 'peso': 0.0})
+    return linhas
+
+def _indexar(executor, tipo, ids, consulta, grupo, texto):
+    for lote in em_lotes(ids):
+        linhas = []
+        for documento in executor.execute(consulta(lote)):
+            linhas += _linhas(tipo, documento.id, grupo(documento), texto(documento))
+        executor.execute(delete(TermoVetor.__table__).where(TermoVetor.tipo == tipo, TermoVetor.dono_id.in_(lote)))
+        if linhas:
+            executor.execute(insert(TermoVetor.__table__), linhas)
+
+def indexar_candidatos(ids, conexao=None):
+    """(Re)calcula os vetores dos candidatos dentro da transação de quem chamou"""
+    _indexar(
+        db.session if conexao is None else conexao, 'candidato', ids,
+        lambda lote: select(Candidato.id, Candidato.vaga_id, Candidato.observacoes, TextoCurriculo.texto)
+        .outerjoin(TextoCurriculo, TextoCurriculo.hash == Candidato.arquivo_hash).where(Candidato.id.in_(lote)),
+        lambda candidato: candidato.vaga_id or 0,
+        texto_candidato
+    )
+
+def indexar_vagas(ids, conexao=None):
+    """(Re)calcula os vetores das vagas dentro da transação de quem chamou"""
+    _indexar(
+        db.session if conexao is None else conexao, 'vaga', ids,
+        lambda lote: select(Vaga.id, Vaga.titulo, Vaga.descricao, Vaga.requisitos).where(Vaga.id.in_(lote)),
+        lambda vaga: 0,
+        texto_vaga
+    )
+
+def reconstruir_afinidade(conexao):
+    """Recalcula todos os vetores a partir das tabelas vagas e candidatos"""
+    conexao.execute(delete(TermoVetor.__table__))
+    conexao.execute(delete(FrequenciaTermo.__table__))
+    indexar_vagas(conexao.execute(select(Vaga.id)).scalars().all(), conexao)
+    indexar_candidatos(conexao.execute(select(Candidato.id)).scalars().all(), conexao)
+
+# ===== PONTUAÇÃO =====
+
+def _vetor_gravado(tipo, dono_id):
+    return dict(db.session.execute(
+        select(TermoVetor.termo, TermoVetor.peso)
+        .where(TermoVetor.tipo == tipo, TermoVetor.dono_id == dono_id, TermoVetor.termo != TERMO_DOCUMENTO)
+    ).all())
+
+def _consulta(pesos, tipo_alvo):
+    """Vetor da consulta ('ltc'): pesos x IDF no corpus alvo, só os TERMOS_CONSULTA maiores, norma 1"""
+    if not pesos:
+        return {}
+    frequencias = dict(db.session.execute(
+        select(FrequenciaTermo.termo, FrequenciaTermo.documentos)
+        .where(FrequenciaTermo.tipo == tipo_alvo, FrequenciaTermo.termo.in_([TERMO_DOCUMENTO, *pesos]))
+    ).all())
+    total = frequencias.pop(TERMO_DOCUMENTO, 0)
+    ponderados = {
+        termo: peso * math.log(1 + total / frequencias[termo])
+        for termo, peso in pesos.items() if frequencias.get(termo, 0) > 0
+    }
+    maiores = sorted(ponderados.items(), key=lambda item: item[1], reverse=True)[:TERMOS_CONSULTA]
+    norma = math.sqrt(sum(peso * peso for _, peso in maiores)) or 1.0
+    return {termo: peso / norma for termo, peso in maiores}
+
+def pontuar(tipo, grupo, consulta):
+    """(id, afinidade) de cada documento do grupo com algum termo da consulta; afinidade = cosseno"""
+    return (
+        select(TermoVetor.dono_id.label('id'),
+               func.sum(TermoVetor.peso * case(consulta, value=TermoVetor.termo, else_=0.0)).label('afinidade'))
+        .where(TermoVetor.tipo == tipo, TermoVetor.grupo == grupo, TermoVetor.termo.in_(list(consulta)))
+        # "+ 0" impede o SQLite de trocar a chave primária (grupo, termo) pelo índice
+        # ix_vetores_dono só para evitar o agrupamento, o que varreria o tipo inteiro
+        .group_by(TermoVetor.dono_id + literal_column('0'))
+    )
+
+def subconsulta_afinidade(vaga_id):
+    """Subconsulta (id, afinidade) dos candidatos da vaga, ou None se a vaga não tem termos em comum com ninguém"""
+    consulta = _consulta(_vetor_gravado('vaga', vaga_id), 'candidato')
+    if not consulta:
+        return None
+    return pontuar('candidato', vaga_id, consulta).subquery('afinidade')
+
+def vagas_por_afinidade(candidato, limite=5):
+    """Vagas ativas mais próximas do perfil do candidato: [(Vaga, afinidade)]"""
+    perfil = _vetor_gravado('candidato', candidato.id)
+    if candidato.vaga_id:
+        for termo, peso in _vetor_gravado('vaga', candidato.vaga_id).items():
+            perfil[termo] = perfil.get(termo, 0.0) + PESO_VAGA_ATUAL * peso
+    consulta = _consulta(perfil, 'vaga')
+    if not consulta:
+        return []
+    pontos = pontuar('vaga', 0, consulta).subquery('afinidade')
+    query = db.session.query(Vaga, pontos.c.afinidade).join(pontos, pontos.c.id == Vaga.id).filter(Vaga.status == 'ativa')
+    if candidato.vaga_id:
+        query = query.filter(Vaga.id != candidato.vaga_id)
+    return query.order_by(pontos.c.afinidade.desc(), Vaga.id.desc()).limit(limite).all()
+
+@app.cli.command('reindexar-afinidade')
+def reindexar_afinidade_comando():
+    """Recalcula os vetores de afinidade de todas as vagas e candidatos"""
+    with db.engine.begin() as conexao:
+        reconstruir_afinidade(conexao)
+    print('Vetores de afinidade recalculados.')
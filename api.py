@@ -0,0 +1,114 @@
+import hashlib
+from flask import request, jsonify, Response
+from sqlalchemy import func
+from app import db
+from models import Vaga, Candidato
+
+# Apoio à API JSON: seleção de campos, serialização direto das colunas
+# (sem carregar relacionamentos) e GET condicional por impressão digital.
+
+def _data(formato):
+    return lambda valor: valor.strftime(formato) if valor else None
+
+CAMPOS_VAGA = {
+    'id': (Vaga.id, None),
+    'titulo': (Vaga.titulo, None),
+    'descricao': (Vaga.descricao, None),
+    'requisitos': (Vaga.requisitos, None),
+    'localizacao': (Vaga.localizacao, None),
+    'status': (Vaga.status, None),
+    'link_inscricao': (Vaga.link_inscricao, None),
+    'data_criacao': (Vaga.data_criacao, _data('%Y-%m-%d')),
+    'data_atualizacao': (Vaga.data_atualizacao, _data('%Y-%m-%d %H:%M')),
+    'candidatos_count': (Vaga.candidatos_count, None)
+}
+
+# O que visitantes sem login (site de carreiras) podem ver das vagas ativas
+CAMPOS_VAGA_PUBLICOS = ['id', 'titulo', 'descricao', 'requisitos', 'localizacao', 'link_inscricao', 'data_criacao']
+
+CAMPOS_CANDIDATO = {
+    'id': (Candidato.id, None),
+    'nome': (Candidato.nome, None),
+    'email': (Candidato.email, None),
+    'telefone': (Candidato.telefone, None),
+    'linkedin': (Candidato.linkedin, None),
+    'arquivo_curriculo': (Candidato.arquivo_curriculo, None),
+    'expectativa_salario': (Candidato.expectativa_salario, None),
+    'vaga_id': (Candidato.vaga_id, None),
+    'vaga_titulo': (Vaga.titulo, None),
+    'status': (Candidato.status, None),
+    'observacoes': (Candidato.observacoes, None),
+    'data_candidatura': (Candidato.data_candidatura, _data('%Y-%m-%d %H:%M')),
+    'data_atualizacao': (Candidato.data_atualizacao, _data('%Y-%m-%d %H:%M'))
+}
+
+class CampoInvalido(ValueError):
+    pass
+
+def escolher_campos(definicoes, permitidos=None):
+    """Campos pedidos em ?campos=a,b,c (todos os permitidos se ausente)"""
+    permitidos = permitidos or list(definicoes)
+    pedido = request.args.get('campos', '')
+    if not pedido:
+        return permitidos
+    campos = [campo.strip() for campo in pedido.split(',') if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in permitidos]
+    if invalidos:
+        raise CampoInvalido(f"Campos inválidos: {', '.join(invalidos)}")
+    return campos
+
+def colunas_consulta(definicoes, campos, chaves):
+    """Colunas do SELECT: os campos pedidos mais as chaves de paginação"""
+    colunas = [definicoes[campo][0].label(campo) for campo in campos]
+    colunas += [coluna.label(f'_chave{indice}') for indice, coluna in enumerate(chaves)]
+    return colunas
+
+def chave_linha(linha):
+    return (linha._chave0, linha._chave1)
+
+def serializar(linhas, definicoes, campos):
+    formatadores = [(campo, definicoes[campo][1]) for campo in campos]
+    return [
+        {campo: formatar(linha._mapping[campo]) if formatar else linha._mapping[campo]
+         for campo, formatar in formatadores}
+        for linha in linhas
+    ]
+
+def impressao_vagas(*filtros):
+    return db.session.query(
+        func.count(Vaga.id), func.max(Vaga.data_atualizacao), func.sum(Vaga.candidatos_count)
+    ).filter(*filtros).one()
+
+def impressao_candidatos(*filtros, com_vaga=False):
+    """Com com_vaga (campo vaga_titulo), inclui a última atualização das vagas dos
+    candidatos: renomear a vaga muda o JSON sem mudar nenhum candidato"""
+    colunas = [func.count(Candidato.id), func.max(Candidato.data_atualizacao), func.max(Candidato.id)]
+    if not com_vaga:
+        return db.session.query(*colunas).filter(*filtros).one()
+    return db.session.query(*colunas, func.max(Vaga.data_atualizacao)).outerjoin(
+        Vaga, Vaga.id == Candidato.vaga_id).filter(*filtros).one()
+
+def resposta_condicional(impressao, gerar, publica=False):
+    """Responde 304 se a coleção não mudou; senão chama gerar() e serializa.
+
+    O ETag combina a impressão digital (contagem e última atualização) com a URL,
+    então filtros, campos e cursores diferentes têm ETags diferentes. Só o ETag decide
+    o 304: If-Modified-Since é ignorado, porque a última atualização sozinha não muda
+    quando uma linha é excluída ou sai do filtro (vaga ativa que passa a encerrada).
+    """
+    ultima_atualizacao = impressao[1]
+    etag = hashlib.sha1(f'{tuple(impressao)!r}|{request.full_path}|{publica}'.encode()).hexdigest()
+
+    nao_mudou = bool(request.if_none_match) and request.if_none_match.contains(etag)
+    resposta = Response(status=304) if nao_mudou else jsonify(gerar())
+    resposta.set_etag(etag)
+    if ultima_atualizacao:
+        resposta.last_modified = ultima_atualizacao
+    if publica:
+        resposta.cache_control.public = True
+        resposta.cache_control.max_age = 60
+    else:
+        resposta.cache_control.private = True
+        resposta.cache_control.no_cache = True
+    resposta.vary.add('Cookie')
+    return resposta
@@ -1,20 +1,36 @@
 import os
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from dotenv import load_dotenv
+from banco import registrar_pragmas, opcoes_engine, registrar_comandos
 
 load_dotenv()
 
 app = Flask(__name__)
 
+# Proxies reversos à frente do gunicorn (ex.: 1 atrás do nginx ou do roteador da
+# plataforma). Só esse número de saltos do X-Forwarded-For é confiável: o resto vem
+# do cliente. 0 ignora o cabeçalho e o IP é o da conexão.
+app.config['PROXY_SALTOS'] = int(os.environ.get('PROXY_SALTOS', 0))
+if app.config['PROXY_SALTOS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_SALTOS'], x_proto=app.config['PROXY_SALTOS'])
+
 # Configurações de Segurança
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'talentos-budel-2024-secret-key-unique')
 
-# Configuração SQLite
-db_path = os.path.join(os.path.dirname(__file__), 'talentos_budel.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}?check_same_thread=False'
+# Configuração SQLite (WAL e pool por worker, ver banco.py)
+db_path = os.environ.get('DATABASE_PATH', os.path.join(os.path.dirname(__file__), 'talentos_budel.db'))
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+app.config['SQLITE_CACHE_KB'] = int(os.environ.get('SQLITE_CACHE_KB', 32768))
+app.config['SQLITE_MMAP_BYTES'] = int(os.environ.get('SQLITE_MMAP_BYTES', 256 * 1024 * 1024))
+app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('GUNICORN_THREADS', 4))
+app.config['SQLITE_TENTATIVAS_ESCRITA'] = int(os.environ.get('SQLITE_TENTATIVAS_ESCRITA', 5))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config)
+registrar_pragmas(app.config)
 
 # Configuração de Sessão
 app.config['SESSION_COOKIE_NAME'] = 'talentos_budel_session'
@@ -25,15 +41,94 @@ app.config['PERMANENT_SESSION_LIFETIME'] = 86400
 # Configurações de Upload
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Entrega dos currículos: '' (Python), 'x-sendfile' (Apache/lighttpd) ou 'x-accel-redirect' (nginx)
+app.config['ARQUIVOS_SENDFILE'] = os.environ.get('ARQUIVOS_SENDFILE', '')
+app.config['ARQUIVOS_ACCEL_PREFIXO'] = os.environ.get('ARQUIVOS_ACCEL_PREFIXO', '/uploads-protegidos/')
+app.config['ARQUIVOS_MAX_AGE'] = int(os.environ.get('ARQUIVOS_MAX_AGE', 86400))
+app.config['USE_X_SENDFILE'] = app.config['ARQUIVOS_SENDFILE'] == 'x-sendfile'
+
 # Configurações de Email
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
 app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'True') == 'True'
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', '')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
+app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
+
+# Fila de envio de emails (outbox)
+app.config['OUTBOX_THREAD'] = os.environ.get('OUTBOX_THREAD', 'True') == 'True'
+app.config['OUTBOX_LOTE'] = int(os.environ.get('OUTBOX_LOTE', 50))
+app.config['OUTBOX_INTERVALO'] = float(os.environ.get('OUTBOX_INTERVALO', 5))
+app.config['OUTBOX_LIMITE_POR_SEGUNDO'] = float(os.environ.get('OUTBOX_LIMITE_POR_SEGUNDO', 5))
+app.config['OUTBOX_MAX_TENTATIVAS'] = int(os.environ.get('OUTBOX_MAX_TENTATIVAS', 6))
+app.config['OUTBOX_BACKOFF_BASE'] = int(os.environ.get('OUTBOX_BACKOFF_BASE', 60))
+
+# Cache dos indicadores do dashboard (segundos)
+app.config['KPI_CACHE_TTL'] = int(os.environ.get('KPI_CACHE_TTL', 60))
+
+# Backup do banco de dados
+app.config['BACKUP_PASTA'] = os.environ.get('BACKUP_PASTA', 'backups')
+app.config['BACKUP_PAGINAS_POR_PASSO'] = int(os.environ.get('BACKUP_PAGINAS_POR_PASSO', 256))
+app.config['BACKUP_PAUSA'] = float(os.environ.get('BACKUP_PAUSA', 0.02))
+app.config['BACKUP_DIARIOS'] = int(os.environ.get('BACKUP_DIARIOS', 7))
+app.config['BACKUP_SEMANAIS'] = int(os.environ.get('BACKUP_SEMANAIS', 4))
+
+# Estado das tarefas em segundo plano
+app.config['TAREFAS_PASTA'] = os.environ.get('TAREFAS_PASTA', 'tarefas')
+app.config['TAREFAS_SEM_SINAL'] = int(os.environ.get('TAREFAS_SEM_SINAL', 1800))  # segundos sem atualização = interrompida
+app.config['TAREFAS_MANTER'] = int(os.environ.get('TAREFAS_MANTER', 20))  # arquivos guardados por tipo
+
+# Auditoria: eventos gravados em lotes por uma thread em cada worker
+app.config['AUDITORIA_THREAD'] = os.environ.get('AUDITORIA_THREAD', 'True') == 'True'
+app.config['AUDITORIA_INTERVALO'] = float(os.environ.get('AUDITORIA_INTERVALO', 2))
+app.config['AUDITORIA_LOTE'] = int(os.environ.get('AUDITORIA_LOTE', 500))
+app.config['AUDITORIA_BUFFER_MAX'] = int(os.environ.get('AUDITORIA_BUFFER_MAX', 10000))
+app.config['AUDITORIA_RETENCAO_DIAS'] = int(os.environ.get('AUDITORIA_RETENCAO_DIAS', 365))
+
+# Migrações do banco aplicadas na inicialização (segundos de espera por outro worker migrando)
+app.config['MIGRACOES_AUTOMATICAS'] = os.environ.get('MIGRACOES_AUTOMATICAS', 'True') == 'True'
+app.config['MIGRACOES_ESPERA'] = int(os.environ.get('MIGRACOES_ESPERA', 300))
+
+# Importação em lote de CSV (linhas por transação)
+app.config['IMPORTACAO_LOTE'] = int(os.environ.get('IMPORTACAO_LOTE', 2000))
+
+# Cache da página pública de inscrição (compartilhado entre workers), na pasta instance/
+app.config['CACHE_PAGINAS_ARQUIVO'] = os.environ.get('CACHE_PAGINAS_ARQUIVO', os.path.join(app.instance_path, 'cache_paginas.db'))
+app.config['CACHE_PAGINAS_TTL'] = int(os.environ.get('CACHE_PAGINAS_TTL', 300))
+app.config['CACHE_PAGINAS_TTL_ENCERRADA'] = int(os.environ.get('CACHE_PAGINAS_TTL_ENCERRADA', 60))
+app.config['CACHE_PAGINAS_MAX_AGE'] = int(os.environ.get('CACHE_PAGINAS_MAX_AGE', 60))
+
+# Cache dos templates (ver cache_templates.py): bytecode compartilhado pelos workers
+# ('' desliga) e fragmentos renderizados em memória, por worker
+app.config['TEMPLATES_BYTECODE_PASTA'] = os.environ.get('TEMPLATES_BYTECODE_PASTA', 'bytecode_templates')
+app.config['TEMPLATES_FRAGMENTOS'] = os.environ.get('TEMPLATES_FRAGMENTOS', 'True') == 'True'
+app.config['TEMPLATES_FRAGMENTOS_MAX'] = int(os.environ.get('TEMPLATES_FRAGMENTOS_MAX', 5000))
+
+# Métricas (ver metricas.py); METRICAS_CONSULTA_LENTA_MS=0 desliga o log de consultas lentas
+app.config['METRICAS_PASTA'] = os.environ.get('METRICAS_PASTA', 'metricas')
+app.config['METRICAS_INTERVALO'] = float(os.environ.get('METRICAS_INTERVALO', 10))
+app.config['METRICAS_SERVER_TIMING'] = os.environ.get('METRICAS_SERVER_TIMING', 'True') == 'True'
+app.config['METRICAS_CONSULTA_LENTA_MS'] = float(os.environ.get('METRICAS_CONSULTA_LENTA_MS', 0))
+app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN', '')  # Bearer para o coletor do Prometheus
+
+# Extração de texto dos currículos (ver extracao.py); o preenchimento usa todos os núcleos
+app.config['EXTRACAO_AUTOMATICA'] = os.environ.get('EXTRACAO_AUTOMATICA', 'True') == 'True'
+app.config['EXTRACAO_PROCESSOS'] = int(os.environ.get('EXTRACAO_PROCESSOS', 1))  # por worker, para uploads novos
+app.config['EXTRACAO_TEMPO_MAX'] = int(os.environ.get('EXTRACAO_TEMPO_MAX', 30))  # segundos por arquivo
+app.config['EXTRACAO_MEMORIA_MB'] = int(os.environ.get('EXTRACAO_MEMORIA_MB', 512))  # por processo extrator
+app.config['EXTRACAO_MAX_CARACTERES'] = int(os.environ.get('EXTRACAO_MAX_CARACTERES', 100000))
+
+# Ciclo de vida das vagas (ver arquivamento.py): dias após o encerramento até o arquivo
+app.config['ARQUIVAMENTO_DIAS'] = int(os.environ.get('ARQUIVAMENTO_DIAS', 180))
+app.config['ARQUIVAMENTO_LOTE'] = int(os.environ.get('ARQUIVAMENTO_LOTE', 1000))  # candidatos por transação
+
+# Paginação das listagens
+app.config['ITENS_POR_PAGINA'] = int(os.environ.get('ITENS_POR_PAGINA', 50))
+app.config['ITENS_POR_PAGINA_MAX'] = int(os.environ.get('ITENS_POR_PAGINA_MAX', 200))
 
 db = SQLAlchemy(app)
 mail = Mail(app)
+registrar_comandos(app)
 
 # Headers de Segurança
 @app.after_request
@@ -44,10 +139,14 @@ def add_security_headers(response):
 
 from routes import *
 from models import *
+from migracoes import aplicar_migracoes
+
+# Também roda sob o gunicorn (o bloco __main__ abaixo não)
+if app.config['MIGRACOES_AUTOMATICAS']:
+    with app.app_context():
+        aplicar_migracoes()
 
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False') == 'True'
-    with app.app_context():
-        db.create_all()
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=debug_mode, host='0.0.0.0', port=port, threaded=True)
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+from app import app, db
+from models import ArquivoCurriculo
+from metricas import medir
+from banco import erro_de_bloqueio, em_lotes
+
+# Armazenamento de currículos endereçado por conteúdo:
+# uploads/ab/cd/<sha256>.pdf, um arquivo por conteúdo, com contagem de referências.
+
+TAMANHO_BLOCO = 64 * 1024
+TEMPORARIOS_MAX_IDADE = 24 * 3600  # segundos até um upload incompleto em tmp/ ser removido
+
+MIME_POR_EXTENSAO = {
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+NOME_ARMAZENADO = re.compile(r'^([0-9a-f]{64})\.(\w+)$')
+
+def detectar_mime(inicio, extensao):
+    """Identifica o tipo pelo conteúdo (assinatura) e usa a extensão como alternativa"""
+    if inicio.startswith(b'%PDF'):
+        return MIME_POR_EXTENSAO['pdf']
+    if inicio.startswith(b'PK\x03\x04'):
+        return MIME_POR_EXTENSAO['docx']
+    if inicio.startswith(b'\xd0\xcf\x11\xe0'):
+        return MIME_POR_EXTENSAO['doc']
+    return MIME_POR_EXTENSAO.get(extensao, 'application/octet-stream')
+
+def caminho_relativo(hash_arquivo, extensao):
+    return os.path.join(hash_arquivo[:2], hash_arquivo[2:4], f'{hash_arquivo}.{extensao}')
+
+def caminho_arquivo(nome_arquivo):
+    """Caminho relativo a UPLOAD_FOLDER; nomes antigos continuam na pasta plana"""
+    nome_arquivo = os.path.basename(nome_arquivo)
+    encontrado = NOME_ARMAZENADO.match(nome_arquivo)
+    if encontrado:
+        return caminho_relativo(*encontrado.groups())
+    return nome_arquivo
+
+def salvar_curriculo(arquivo, extensao):
+    """Grava o upload em blocos calculando o SHA-256 e registra uma referência.
+
+    Deve ser chamado dentro da transação que grava o candidato. Retorna um dict
+    com nome, hash, extensao, tamanho e mime para preencher o Candidato. Se a
+    transação for desfeita, o arquivo fica no disco sem registro até varrer_disco.
+    """
+    pasta = app.config['UPLOAD_FOLDER']
+    pasta_temp = os.path.join(pasta, 'tmp')
+    os.makedirs(pasta_temp, exist_ok=True)
+
+    # O stream é relido do início se a view for repetida por banco bloqueado
+    arquivo.stream.seek(0)
+    sha = hashlib.sha256()
+    tamanho = 0
+    inicio = b''
+    descritor, temporario = tempfile.mkstemp(dir=pasta_temp)
+    try:
+        with medir('arquivo'), os.fdopen(descritor, 'wb') as destino:
+            while True:
+                bloco = arquivo.stream.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                if not inicio:
+                    inicio = bloco[:8]
+                sha.update(bloco)
+                destino.write(bloco)
+                tamanho += len(bloco)
+        hash_arquivo = sha.hexdigest()
+        mime = detectar_mime(inicio, extensao)
+
+        # O upsert pega o lock de escrita do SQLite antes de mexer no arquivo final,
+        # então não corre junto com a coleta de órfãos (que remove sob o mesmo lock)
+        extensao = db.session.execute(
+            insert(ArquivoCurriculo)
+            .values(hash=hash_arquivo, extensao=extensao, tamanho=tamanho, mime=mime, referencias=1)
+            .on_conflict_do_update(
+                index_elements=['hash'],
+                set_={'referencias': ArquivoCurriculo.referencias + 1}
+            )
+            .returning(ArquivoCurriculo.extensao)
+        ).scalar_one()
+
+        final = os.path.join(pasta, caminho_relativo(hash_arquivo, extensao))
+        if os.path.exists(final):
+            os.remove(temporario)
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(temporario, final)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    return {
+        'nome': f'{hash_arquivo}.{extensao}',
+        'hash': hash_arquivo,
+        'extensao': extensao,
+        'tamanho': tamanho,
+        'mime': mime
+    }
+
+def liberar_curriculos(hashes):
+    """Decrementa as referências dos hashes (um por candidato removido)"""
+    contagem = Counter(h for h in hashes if h)
+    if not contagem:
+        return
+    db.session.execute(
+        ArquivoCurriculo.__table__.update()
+        .where(ArquivoCurriculo.hash == db.bindparam('h'))
+        .values(referencias=ArquivoCurriculo.referencias - db.bindparam('n')),
+        [{'h': h, 'n': n} for h, n in contagem.items()]
+    )
+
+def coletar_orfaos():
+    """Remove do disco e da tabela os currículos sem nenhuma referência"""
+    pasta = app.config['UPLOAD_FOLDER']
+    removidos = 0
+    with db.engine.begin() as conexao:
+        orfaos = conexao.execute(
+            ArquivoCurriculo.__table__.delete()
+            .where(ArquivoCurriculo.referencias <= 0)
+            .returning(ArquivoCurriculo.hash, ArquivoCurriculo.extensao)
+        ).all()
+        for hash_arquivo, extensao in orfaos:
+            caminho = os.path.join(pasta, caminho_relativo(hash_arquivo, extensao))
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            removidos += 1
+    return removidos
+
+def _arquivos_no_disco(pasta):
+    """(hash, caminho) de cada currículo armazenado em uploads/ab/cd/"""
+    for raiz, _, nomes in os.walk(pasta):
+        if os.path.relpath(raiz, pasta).count(os.sep) != 1:
+            continue
+        for nome in nomes:
+            encontrado = NOME_ARMAZENADO.match(nome)
+            if encontrado:
+                yield encontrado.group(1), os.path.join(raiz, nome)
+
+def varrer_disco():
+    """Remove os currículos do disco sem linha em arquivos e os temporários
+    abandonados. O arquivo vai para o lugar antes do commit da inscrição: se ela é
+    desfeita, ele fica sem registro e só esta varredura o encontra."""
+    pasta = app.config['UPLOAD_FOLDER']
+    no_disco = list(_arquivos_no_disco(pasta))
+    removidos = 0
+    with db.engine.begin() as conexao:
+        # Sob o lock de escrita nenhuma inscrição está entre o upsert e o commit, então
+        # quem não tem linha agora não vai ganhar uma (ver salvar_curriculo)
+        conexao.execute(ArquivoCurriculo.__table__.delete().where(ArquivoCurriculo.referencias <= 0))
+        registrados = set()
+        for lote in em_lotes({hash_arquivo for hash_arquivo, _ in no_disco}):
+            registrados.update(conexao.execute(
+                select(ArquivoCurriculo.hash).where(ArquivoCurriculo.hash.in_(lote))).scalars())
+        for hash_arquivo, caminho in no_disco:
+            if hash_arquivo not in registrados and os.path.exists(caminho):
+                os.remove(caminho)
+                removidos += 1
+
+    limite = time.time() - TEMPORARIOS_MAX_IDADE
+    pasta_temp = os.path.join(pasta, 'tmp')
+    for nome in os.listdir(pasta_temp) if os.path.isdir(pasta_temp) else []:
+        caminho = os.path.join(pasta_temp, nome)
+        if os.path.getmtime(caminho) < limite:
+            os.remove(caminho)
+            removidos += 1
+    return removidos
+
+@app.cli.command('varrer-curriculos')
+def varrer_curriculos_comando():
+    """Remove do disco os currículos órfãos (para rodar via cron)"""
+    print(f'{varrer_disco()} arquivos removidos')
+
+def coletar_orfaos_apos_commit():
+    """coletar_orfaos para depois do commit de uma view: com o banco bloqueado a coleta
+    fica para a próxima (os órfãos continuam com referencias <= 0) e a view não falha"""
+    try:
+        return coletar_orfaos()
+    except OperationalError as erro:
+        if not erro_de_bloqueio(erro):
+            raise
+        app.logger.warning('Banco bloqueado; coleta de currículos órfãos adiada')
+        return 0
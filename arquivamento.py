@@ -0,0 +1,194 @@
+import click
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, update, func, literal, union_all, text, bindparam
+from app import app, db
+from models import Vaga, Candidato, VagaArquivada, CandidatoArquivado
+from busca import subconsulta_busca
+from cache_paginas import invalidar_pagina, chave_inscricao
+from indicadores import invalidar_kpis
+from paginacao import paginar_requisicao
+from tarefas import executar_tarefa
+
+# Ciclo de vida das vagas: encerra as que passaram da data_encerramento e, depois de
+# ARQUIVAMENTO_DIAS, move a vaga e seus candidatos (menos os do banco de talentos)
+# para vagas_arquivo/candidatos_arquivo, em transações de ARQUIVAMENTO_LOTE candidatos.
+# O arquivo fica no mesmo banco: cada lote sai das tabelas quentes e entra no arquivo
+# na mesma transação, e os triggers de contagem, busca e afinidade tratam a saída.
+#
+# Os ids são preservados (os candidatos do banco de talentos continuam apontando para
+# a vaga arquivada). vagas e candidatos usam AUTOINCREMENT, com a sequência acima
+# também dos ids do arquivo (migração 10), então um id arquivado nunca volta a ser
+# usado por uma linha nova.
+
+COLUNAS_VAGA = [coluna.name for coluna in Vaga.__table__.columns]
+COLUNAS_CANDIDATO = [coluna.name for coluna in Candidato.__table__.columns]
+
+def encerrar_vencidas(conexao, agora=None):
+    """Encerra as vagas cuja data_encerramento já passou; retorna os links de inscrição"""
+    agora = agora or datetime.utcnow()
+    return conexao.execute(
+        update(Vaga)
+        .where(Vaga.status != 'encerrada', Vaga.data_encerramento <= agora)
+        .values(status='encerrada', data_atualizacao=agora)
+        .returning(Vaga.link_inscricao)
+    ).scalars().all()
+
+def vagas_para_arquivar(conexao, agora=None):
+    """Ids das vagas encerradas há mais de ARQUIVAMENTO_DIAS"""
+    limite = (agora or datetime.utcnow()) - timedelta(days=app.config['ARQUIVAMENTO_DIAS'])
+    return conexao.execute(
+        select(Vaga.id)
+        .where(Vaga.status == 'encerrada',
+               func.coalesce(Vaga.data_encerramento, Vaga.data_atualizacao) <= limite)
+        .order_by(Vaga.id)
+    ).scalars().all()
+
+def _mover_candidatos(conexao, vaga_id, lote, agora):
+    """Move até `lote` candidatos da vaga para o arquivo; retorna quantos foram movidos"""
+    ids = conexao.execute(
+        select(Candidato.id)
+        .where(Candidato.vaga_id == vaga_id, Candidato.status.is_distinct_from('banco_talentos'))
+        .limit(lote)
+    ).scalars().all()
+    if not ids:
+        return 0
+    colunas = [getattr(Candidato, nome) for nome in COLUNAS_CANDIDATO]
+    conexao.execute(
+        insert(CandidatoArquivado).from_select(
+            [*COLUNAS_CANDIDATO, 'data_arquivamento'],
+            select(*colunas, literal(agora)).where(Candidato.id.in_(ids))
+        )
+    )
+    # O índice de busca do arquivo recebe as linhas com o título da vaga de agora
+    conexao.execute(
+        text("""INSERT INTO candidatos_arquivo_fts (rowid, nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos)
+        SELECT c.id, c.nome, c.email, c.observacoes, c.expectativa_salario, v.titulo, v.requisitos
+        FROM candidatos c LEFT JOIN vagas v ON v.id = c.vaga_id
+        WHERE c.id IN :ids""").bindparams(bindparam('ids', expanding=True)),
+        {'ids': ids}
+    )
+    conexao.execute(delete(Candidato).where(Candidato.id.in_(ids)))
+    return len(ids)
+
+def _mover_vaga(conexao, vaga_id, agora):
+    colunas = [getattr(Vaga, nome) for nome in COLUNAS_VAGA]
+    conexao.execute(
+        insert(VagaArquivada).from_select(
+            [*COLUNAS_VAGA, 'data_arquivamento'],
+            select(*colunas, literal(agora)).where(Vaga.id == vaga_id)
+        )
+    )
+    # candidatos_count já desconta os que saíram; o arquivo guarda o total da vaga
+    conexao.execute(
+        update(VagaArquivada).where(VagaArquivada.id == vaga_id)
+        .values(candidatos_count=VagaArquivada.candidatos_count + select(func.count()).where(
+            CandidatoArquivado.vaga_id == vaga_id).scalar_subquery())
+    )
+    conexao.execute(delete(Vaga).where(Vaga.id == vaga_id))
+    # O trigger de vagas apagou o histograma da vaga; os candidatos do banco de
+    # talentos que ficaram continuam contando em status_counts
+    conexao.exec_driver_sql(
+        "INSERT INTO status_counts (vaga_id, status, total) "
+        "SELECT vaga_id, coalesce(status, ''), count(*) FROM candidatos WHERE vaga_id = ? GROUP BY 2",
+        (vaga_id,)
+    )
+
+def arquivar_vaga(vaga_id, lote=None):
+    """Arquiva a vaga em transações curtas; retorna quantos candidatos foram movidos"""
+    lote = lote or app.config['ARQUIVAMENTO_LOTE']
+    agora = datetime.utcnow()
+    movidos = 0
+    while True:
+        with db.engine.begin() as conexao:
+            quantidade = _mover_candidatos(conexao, vaga_id, lote, agora)
+            if quantidade == 0:
+                _mover_vaga(conexao, vaga_id, agora)
+                return movidos
+        movidos += quantidade
+
+def executar_ciclo(tarefa):
+    """Encerra as vagas vencidas e arquiva as encerradas há mais de ARQUIVAMENTO_DIAS"""
+    with db.engine.begin() as conexao:
+        encerradas = encerrar_vencidas(conexao)
+    for link in encerradas:
+        invalidar_pagina(chave_inscricao(link))
+
+    with db.engine.connect() as conexao:
+        vagas = vagas_para_arquivar(conexao)
+    candidatos = 0
+    for numero, vaga_id in enumerate(vagas, 1):
+        candidatos += arquivar_vaga(vaga_id)
+        tarefa.atualizar(progresso=100 * numero / len(vagas),
+                         mensagem=f'Arquivando vagas ({numero}/{len(vagas)})')
+    if encerradas or vagas:
+        invalidar_kpis()
+
+    tarefa.atualizar(
+        mensagem=f'{len(encerradas)} vaga(s) encerrada(s), {len(vagas)} vaga(s) e '
+                 f'{candidatos} candidato(s) arquivado(s)',
+        encerradas=len(encerradas), vagas_arquivadas=len(vagas), candidatos_arquivados=candidatos
+    )
+
+@app.cli.command('ciclo-vagas')
+def ciclo_vagas_comando():
+    """Encerra as vagas vencidas e arquiva as antigas (para rodar via cron)"""
+    tarefa = executar_tarefa('arquivamento', executar_ciclo)
+    if tarefa.status == 'executando':
+        raise click.ClickException(f'Já há um ciclo em execução (tarefa {tarefa.id})')
+    print(tarefa.mensagem)
+    if tarefa.status == 'erro':
+        sys.exit(1)
+
+# ===== CONSULTA COM O ARQUIVO =====
+
+def _recarregar(pagina, quentes, arquivados):
+    """Troca as linhas (id, arquivado) da página pelos objetos, na mesma ordem"""
+    ids = {False: [], True: []}
+    for linha in pagina.itens:
+        ids[bool(linha.arquivado)].append(linha.id)
+    objetos = {}
+    for arquivado, consulta in ((False, quentes), (True, arquivados)):
+        if ids[arquivado]:
+            modelo = consulta.column_descriptions[0]['entity']
+            objetos.update({(arquivado, objeto.id): objeto
+                            for objeto in consulta.filter(modelo.id.in_(ids[arquivado]))})
+    pagina.itens = [objetos[(bool(linha.arquivado), linha.id)] for linha in pagina.itens]
+    return pagina
+
+def vagas_com_arquivo():
+    """Página de vagas quentes e arquivadas juntas, por (data_criacao, id)"""
+    uniao = union_all(
+        select(Vaga.id, Vaga.data_criacao, literal(False).label('arquivado')),
+        select(VagaArquivada.id, VagaArquivada.data_criacao, literal(True).label('arquivado')),
+    ).subquery('vagas')
+    pagina = paginar_requisicao(db.session.query(uniao), (uniao.c.data_criacao, uniao.c.id))
+    return _recarregar(pagina, Vaga.query, VagaArquivada.query)
+
+def candidatos_com_arquivo(status=None, busca=None):
+    """Página de candidatos quentes e arquivados juntos, com o mesmo filtro e a mesma ordem
+    do banco de talentos: relevância na busca, (data_candidatura, id) sem ela"""
+    partes = []
+    for modelo, indice, arquivado in ((Candidato, 'candidatos_fts', False),
+                                      (CandidatoArquivado, 'candidatos_arquivo_fts', True)):
+        colunas = [modelo.id, modelo.data_candidatura, literal(arquivado).label('arquivado')]
+        resultado = subconsulta_busca(busca, indice) if busca else None
+        if resultado is not None:
+            consulta = select(*colunas, resultado.c.rank).join(resultado, resultado.c.id == modelo.id)
+        else:
+            consulta = select(*colunas)
+        if status:
+            consulta = consulta.where(modelo.status == status)
+        partes.append(consulta)
+    uniao = union_all(*partes).subquery('candidatos')
+
+    if 'rank' in uniao.c:
+        pagina = paginar_requisicao(db.session.query(uniao), (uniao.c.rank, uniao.c.id), descendente=False)
+    else:
+        pagina = paginar_requisicao(db.session.query(uniao), (uniao.c.data_candidatura, uniao.c.id))
+    return _recarregar(pagina, Candidato.query.options(db.joinedload(Candidato.vaga),
+                                                       db.joinedload(Candidato.vaga_arquivada)),
+                       CandidatoArquivado.query.options(db.joinedload(CandidatoArquivado.vaga)))
+
+def contagem_arquivo_por_status():
+    return dict(db.session.query(CandidatoArquivado.status, func.count()).group_by(CandidatoArquivado.status).all())
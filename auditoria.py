@@ -0,0 +1,181 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from flask import has_request_context, request, session
+from sqlalchemy import event, insert, text
+from app import app, db
+from models import RegistroAuditoria
+
+logger = logging.getLogger(__name__)
+
+# Trilha de auditoria. registrar() só coloca o evento em um buffer em memória;
+# uma thread por processo grava os eventos em lotes (um executemany por lote),
+# então a requisição nunca espera por um commit extra.
+
+ACOES = [
+    'login', 'login_falhou', 'logout',
+    'usuario_criado', 'usuario_editado', 'usuario_excluido',
+    'vaga_criada', 'vaga_editada', 'vaga_excluida',
+    'status_alterado', 'candidatos_excluidos',
+    'download_curriculo', 'download_curriculos', 'exportacao',
+    'backup', 'importacao', 'extracao_textos', 'arquivamento'
+]
+
+# Registros só entram (e saem pela retenção); alteração é sempre bloqueada
+DDL_AUDITORIA = [
+    """CREATE TRIGGER IF NOT EXISTS auditoria_somente_inclusao BEFORE UPDATE ON auditoria BEGIN
+        SELECT RAISE(ABORT, 'auditoria: registros não podem ser alterados');
+    END""",
+]
+
+def criar_protecao_auditoria(conexao):
+    for comando in DDL_AUDITORIA:
+        conexao.exec_driver_sql(comando)
+
+event.listen(RegistroAuditoria.__table__, 'after_create',
+             lambda target, conexao, **kw: criar_protecao_auditoria(conexao))
+
+_buffer = deque()
+_buffer_lock = threading.Lock()
+_gravacao_lock = threading.Lock()
+_despertar = threading.Event()
+_gravador = None
+_gravador_lock = threading.Lock()
+
+def _evento(acao, entidade, entidade_id, detalhes, ator, ator_id):
+    if isinstance(detalhes, (dict, list)):
+        detalhes = json.dumps(detalhes, ensure_ascii=False, default=str)
+    evento = {
+        'data': datetime.utcnow(),
+        'acao': acao,
+        'entidade': entidade,
+        'entidade_id': entidade_id,
+        'detalhes': detalhes,
+        'ator': ator,
+        'ator_id': ator_id,
+        'ip': None
+    }
+    if has_request_context():
+        # Já resolvido pelo ProxyFix (PROXY_SALTOS): o X-Forwarded-For cru é do cliente
+        evento['ip'] = (request.remote_addr or '')[:45] or None
+        if ator is None:
+            evento['ator'] = session.get('usuario_email') or session.get('usuario_nome')
+        if ator_id is None:
+            evento['ator_id'] = session.get('usuario_id')
+    return evento
+
+def registrar(acao, entidade=None, entidade_id=None, detalhes=None, ator=None, ator_id=None):
+    """Enfileira um evento de auditoria. O ator vem da sessão quando não informado."""
+    _enfileirar([_evento(acao, entidade, entidade_id, detalhes, ator, ator_id)])
+
+def registrar_varios(acao, entidade, ids, detalhes=None):
+    """Um evento por entidade (ex.: ações em lote), enfileirados de uma vez"""
+    modelo = _evento(acao, entidade, None, detalhes, None, None)
+    eventos = [dict(modelo, entidade_id=id) for id in ids]
+    if eventos:
+        _enfileirar(eventos)
+
+def _enfileirar(eventos):
+    with _buffer_lock:
+        _buffer.extend(eventos)
+        tamanho = len(_buffer)
+    # Sem a thread (testes, comandos de CLI) grava na hora; com o buffer cheio
+    # a requisição ajuda a esvaziá-lo em vez de perder eventos
+    if not _thread_ativa() or tamanho >= app.config['AUDITORIA_BUFFER_MAX']:
+        try:
+            gravar_pendentes()
+        except Exception:
+            logger.exception('Erro ao gravar a auditoria')
+    elif tamanho >= app.config['AUDITORIA_LOTE']:
+        _despertar.set()
+
+def gravar_pendentes():
+    """Grava o buffer em lotes de AUDITORIA_LOTE, cada um em sua transação"""
+    gravados = 0
+    with _gravacao_lock:
+        while True:
+            with _buffer_lock:
+                lote = [_buffer.popleft() for _ in range(min(len(_buffer), app.config['AUDITORIA_LOTE']))]
+            if not lote:
+                return gravados
+            try:
+                with db.engine.begin() as conexao:
+                    conexao.execute(insert(RegistroAuditoria.__table__), lote)
+            except Exception:
+                # Devolve o lote ao início do buffer para a próxima tentativa
+                with _buffer_lock:
+                    _buffer.extendleft(reversed(lote))
+                raise
+            gravados += len(lote)
+
+def expurgar_antigos(dias=None):
+    """Remove registros mais antigos que a retenção, em lotes para não segurar o lock de escrita"""
+    dias = app.config['AUDITORIA_RETENCAO_DIAS'] if dias is None else dias
+    limite = datetime.utcnow() - timedelta(days=dias)
+    removidos = 0
+    while True:
+        with db.engine.begin() as conexao:
+            resultado = conexao.execute(text(
+                'DELETE FROM auditoria WHERE id IN '
+                '(SELECT id FROM auditoria WHERE data < :limite ORDER BY data LIMIT 5000)'
+            ), {'limite': limite})
+        removidos += resultado.rowcount
+        if resultado.rowcount < 5000:
+            return removidos
+
+class GravadorAuditoria(threading.Thread):
+    """Thread que grava o buffer periodicamente e aplica a retenção uma vez por hora"""
+
+    def __init__(self):
+        super().__init__(name='gravador-auditoria', daemon=True)
+        self.proximo_expurgo = 0
+
+    def run(self):
+        while True:
+            _despertar.wait(app.config['AUDITORIA_INTERVALO'])
+            _despertar.clear()
+            with app.app_context():
+                try:
+                    gravar_pendentes()
+                    if time.monotonic() >= self.proximo_expurgo:
+                        self.proximo_expurgo = time.monotonic() + 3600
+                        expurgar_antigos()
+                except Exception:
+                    logger.exception('Erro ao gravar a auditoria')
+
+def _thread_ativa():
+    return _gravador is not None and _gravador.is_alive()
+
+def iniciar_gravador():
+    """Inicia a thread de gravação uma única vez por processo"""
+    global _gravador
+    if _thread_ativa():
+        return
+    with _gravador_lock:
+        if not _thread_ativa():
+            _gravador = GravadorAuditoria()
+            _gravador.start()
+
+@app.before_request
+def _garantir_gravador():
+    if app.config['AUDITORIA_THREAD'] and not app.config.get('TESTING'):
+        iniciar_gravador()
+
+@atexit.register
+def _gravar_ao_sair():
+    # Worker encerrando (deploy, max_requests): não perde o que ainda está no buffer
+    if _buffer:
+        with app.app_context():
+            try:
+                gravar_pendentes()
+            except Exception:
+                logger.exception('Eventos de auditoria perdidos ao encerrar')
+
+@app.cli.command('expurgar-auditoria')
+def expurgar_auditoria_comando():
+    """Aplica a retenção da auditoria (AUDITORIA_RETENCAO_DIAS)"""
+    print(f'{expurgar_antigos()} registro(s) removido(s).')
@@ -0,0 +1,146 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from app import app, db
+
+# Backup online do SQLite pela API de backup, em passos curtos sobre um único
+# instantâneo de leitura, com compressão, verificação e retenção.
+
+NOME_BACKUP = re.compile(r'^backup_talentos_budel_(\d{8}_\d{6})\.db(\.gz)?$')
+
+def _caminho_banco():
+    return db.engine.url.database
+
+def copiar_banco(destino, tarefa=None):
+    """Copia o banco em passos de BACKUP_PAGINAS_POR_PASSO páginas, de um único instantâneo.
+
+    A origem mantém uma transação de leitura do começo ao fim. Sem ela, o SQLite
+    recomeça a cópia sempre que outra conexão escreve no banco, e com inscrições
+    chegando sem parar o backup nunca terminaria. Em WAL a leitura não bloqueia os writers.
+    """
+    pausa = app.config['BACKUP_PAUSA']
+
+    def progresso(status, restantes, total):
+        if tarefa and total:
+            tarefa.atualizar(progresso=70 * (total - restantes) / total,
+                             mensagem=f'Copiando páginas ({total - restantes}/{total})')
+        # Pausa entre os passos para não disputar o disco com as requisições
+        time.sleep(pausa)
+
+    origem = sqlite3.connect(_caminho_banco(), isolation_level=None)
+    copia = sqlite3.connect(destino)
+    try:
+        origem.execute('BEGIN')
+        origem.execute('SELECT count(*) FROM sqlite_master').fetchone()  # abre o instantâneo
+        origem.backup(copia, pages=app.config['BACKUP_PAGINAS_POR_PASSO'], progress=progresso)
+        resultado = copia.execute('PRAGMA integrity_check').fetchone()[0]
+        if resultado != 'ok':
+            raise RuntimeError(f'Falha na verificação de integridade: {resultado}')
+    finally:
+        copia.close()
+        origem.close()  # encerra a transação de leitura
+
+def comprimir(origem, destino):
+    """Comprime em fluxo e relê o resultado para validar o CRC do gzip"""
+    parcial = destino + '.part'
+    with open(origem, 'rb') as entrada, gzip.open(parcial, 'wb', compresslevel=6) as saida:
+        shutil.copyfileobj(entrada, saida, 1024 * 1024)
+    with gzip.open(parcial, 'rb') as verificacao:
+        while verificacao.read(1024 * 1024):
+            pass
+    os.replace(parcial, destino)
+
+def aplicar_retencao(pasta, diarios, semanais):
+    """Mantém o backup mais recente de cada um dos últimos N dias e M semanas"""
+    backups = []
+    for nome in os.listdir(pasta):
+        encontrado = NOME_BACKUP.match(nome)
+        if encontrado:
+            backups.append((datetime.strptime(encontrado.group(1), '%Y%m%d_%H%M%S'), nome))
+    backups.sort(reverse=True)
+
+    manter = set()
+    dias, semanas = [], []
+    for data, nome in backups:
+        dia = data.date()
+        semana = data.isocalendar()[:2]
+        if dia not in dias and len(dias) < diarios:
+            dias.append(dia)
+            manter.add(nome)
+        if semana not in semanas and len(semanas) < semanais:
+            semanas.append(semana)
+            manter.add(nome)
+
+    removidos = [nome for _, nome in backups if nome not in manter]
+    for nome in removidos:
+        os.remove(os.path.join(pasta, nome))
+    return removidos
+
+def copiar_uploads(pasta_backup, tarefa=None):
+    """Copia para backups/uploads apenas os currículos novos ou alterados desde o último backup"""
+    origem = app.config['UPLOAD_FOLDER']
+    destino = os.path.join(pasta_backup, 'uploads')
+    caminho_manifesto = os.path.join(pasta_backup, 'uploads_manifesto.json')
+
+    manifesto = {}
+    if os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+
+    copiados = 0
+    for raiz, pastas, arquivos in os.walk(origem):
+        pastas[:] = [p for p in pastas if p != 'tmp']
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.relpath(caminho, origem)
+            info = os.stat(caminho)
+            assinatura = [info.st_size, info.st_mtime_ns]
+            if manifesto.get(relativo) == assinatura:
+                continue
+            alvo = os.path.join(destino, relativo)
+            os.makedirs(os.path.dirname(alvo), exist_ok=True)
+            shutil.copy2(caminho, alvo + '.part')
+            os.replace(alvo + '.part', alvo)
+            manifesto[relativo] = assinatura
+            copiados += 1
+            if tarefa and copiados % 100 == 0:
+                tarefa.atualizar(mensagem=f'Copiando currículos ({copiados})')
+
+    temporario = caminho_manifesto + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo)
+    os.replace(temporario, caminho_manifesto)
+    return copiados
+
+def executar_backup(tarefa, incluir_uploads=False):
+    pasta = app.config['BACKUP_PASTA']
+    os.makedirs(pasta, exist_ok=True)
+
+    nome = f"backup_talentos_budel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db.gz"
+    temporario = os.path.join(pasta, f'.{nome}.tmp')
+    try:
+        copiar_banco(temporario, tarefa)
+        tarefa.atualizar(progresso=75, mensagem='Comprimindo')
+        comprimir(temporario, os.path.join(pasta, nome))
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    copiados = 0
+    if incluir_uploads:
+        tarefa.atualizar(progresso=85, mensagem='Copiando currículos')
+        copiados = copiar_uploads(pasta, tarefa)
+
+    removidos = aplicar_retencao(pasta, app.config['BACKUP_DIARIOS'], app.config['BACKUP_SEMANAIS'])
+    tarefa.atualizar(
+        mensagem=f'Backup realizado: {nome}',
+        arquivo=nome,
+        tamanho=os.path.getsize(os.path.join(pasta, nome)),
+        curriculos_copiados=copiados,
+        removidos=len(removidos)
+    )
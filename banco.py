@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from functools import wraps
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# Perfil de produção do SQLite: WAL, busy_timeout e pragmas aplicados em toda conexão,
+# pool dimensionado para as threads do gunicorn e repetição de escritas bloqueadas.
+
+def pragmas_sqlite(config):
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('cache_size', -config['SQLITE_CACHE_KB']),  # negativo = KiB
+        ('mmap_size', config['SQLITE_MMAP_BYTES']),
+        ('temp_store', 'MEMORY'),
+    ]
+
+def registrar_pragmas(config):
+    """Aplica os pragmas a cada nova conexão SQLite aberta pelo SQLAlchemy"""
+    pragmas = pragmas_sqlite(config)
+
+    @event.listens_for(Engine, 'connect')
+    def aplicar_pragmas(conexao_dbapi, registro):
+        if not isinstance(conexao_dbapi, sqlite3.Connection):
+            return
+        cursor = conexao_dbapi.cursor()
+        for nome, valor in pragmas:
+            cursor.execute(f'PRAGMA {nome} = {valor}')
+        cursor.close()
+
+def opcoes_engine(config):
+    """SQLALCHEMY_ENGINE_OPTIONS: uma conexão por thread do worker, mais folga"""
+    threads = config['SQLITE_POOL_SIZE']
+    return {
+        'pool_size': threads,
+        'max_overflow': threads,
+        'pool_timeout': 30,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000
+        }
+    }
+
+# Limite de valores por cláusula IN (o SQLite limita a quantidade de parâmetros)
+LIMITE_IN = 500
+
+def em_lotes(valores):
+    valores = list(valores)
+    for inicio in range(0, len(valores), LIMITE_IN):
+        yield valores[inicio:inicio + LIMITE_IN]
+
+def erro_de_bloqueio(erro):
+    mensagem = str(erro.orig if hasattr(erro, 'orig') else erro).lower()
+    return 'database is locked' in mensagem or 'database is busy' in mensagem
+
+@event.listens_for(Session, 'after_commit')
+def _contar_commit(sessao):
+    sessao.info['commits'] = sessao.info.get('commits', 0) + 1
+
+def repetir_se_bloqueado(funcao):
+    """Repete a view quando o SQLite devolve 'database is locked' mesmo após o busy_timeout.
+
+    A transação é desfeita antes de cada nova tentativa, então a view precisa ser
+    segura para reexecutar até o commit (o que vale para as rotas de escrita). Um
+    bloqueio depois de um commit da sessão não é repetido: a escrita já valeu. O que
+    a view faz depois do commit (ex.: coleta de órfãos) trata os próprios erros.
+    """
+    @wraps(funcao)
+    def decorada(*args, **kwargs):
+        from app import app, db
+        tentativas = app.config['SQLITE_TENTATIVAS_ESCRITA']
+        for tentativa in range(tentativas):
+            commits = db.session().info.get('commits', 0)
+            try:
+                return funcao(*args, **kwargs)
+            except OperationalError as erro:
+                db.session.rollback()
+                confirmada = db.session().info.get('commits', 0) != commits
+                if not erro_de_bloqueio(erro) or confirmada or tentativa == tentativas - 1:
+                    raise
+                app.logger.warning('Banco bloqueado em %s, tentativa %s', funcao.__name__, tentativa + 1)
+                time.sleep(0.05 * 2 ** tentativa + random.uniform(0, 0.05))
+    return decorada
+
+# ===== TESTE DE CARGA =====
+
+def _processo_estresse(caminho, config, segundos, escritor, fila):
+    """Um processo = um worker do gunicorn, com engine e pool próprios"""
+    registrar_pragmas(config)
+    engine = create_engine(f'sqlite:///{caminho}', **opcoes_engine(config))
+    leituras = escritas = erros = 0
+    fim = time.monotonic() + segundos
+    while time.monotonic() < fim:
+        try:
+            with engine.begin() as conexao:
+                if escritor:
+                    conexao.execute(text("INSERT INTO candidatos (nome, status) VALUES ('Teste', 'pendente')"))
+                    conexao.execute(text("UPDATE candidatos SET status = 'em_analise' WHERE id = "
+                                         "(SELECT max(id) FROM candidatos)"))
+                else:
+                    conexao.execute(text("SELECT status, count(*) FROM candidatos GROUP BY status")).all()
+        except OperationalError as erro:
+            if not erro_de_bloqueio(erro):
+                raise
+            erros += 1
+            continue
+        # Contadas só depois do commit, para conferir com as linhas gravadas
+        if escritor:
+            escritas += 1
+        else:
+            leituras += 1
+    engine.dispose()
+    fila.put((leituras, escritas, erros))
+
+def teste_estresse(config, leitores=8, escritores=4, segundos=10):
+    """Leitores e escritores concorrentes, em processos separados, sobre um banco temporário"""
+    pasta = tempfile.mkdtemp()
+    caminho = os.path.join(pasta, 'estresse.db')
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute('CREATE TABLE candidatos (id INTEGER PRIMARY KEY, nome TEXT, status TEXT)')
+
+    config = {chave: valor for chave, valor in config.items() if chave.startswith('SQLITE_')}
+    fila = multiprocessing.Queue()
+    processos = [
+        multiprocessing.Process(target=_processo_estresse,
+                                args=(caminho, config, segundos, i < escritores, fila))
+        for i in range(leitores + escritores)
+    ]
+    for processo in processos:
+        processo.start()
+    resultados = [fila.get() for _ in processos]
+    for processo in processos:
+        processo.join()
+    with sqlite3.connect(caminho) as conexao:
+        linhas = conexao.execute('SELECT count(*) FROM candidatos').fetchone()[0]
+
+    os.remove(caminho)
+    for sufixo in ('-wal', '-shm'):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+    os.rmdir(pasta)
+
+    return {
+        'leituras': sum(r[0] for r in resultados),
+        'escritas': sum(r[1] for r in resultados),
+        'erros_de_bloqueio': sum(r[2] for r in resultados),
+        'linhas': linhas  # igual a escritas: nenhuma escrita perdida ou aplicada duas vezes
+    }
+
+def registrar_comandos(app):
+    @app.cli.command('estresse-sqlite')
+    def estresse_sqlite():
+        """Mede leituras e escritas concorrentes com o perfil de produção do SQLite"""
+        resultado = teste_estresse(app.config)
+        print(f"{resultado['leituras']} leituras, {resultado['escritas']} escritas, "
+              f"{resultado['erros_de_bloqueio']} erros de bloqueio, {resultado['linhas']} linhas gravadas")
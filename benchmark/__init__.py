@@ -0,0 +1 @@
+# Benchmark das rotas com dados sintéticos (python -m benchmark.executar)
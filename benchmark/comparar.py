@@ -0,0 +1,52 @@
+"""Compara dois resultados do benchmark e aponta regressões de p95.
+
+    python -m benchmark.comparar antes.json depois.json --limite 20
+
+Sai com código 1 se alguma rota piorou mais que o limite (em %).
+"""
+import argparse
+import json
+import sys
+
+def carregar(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+def comparar(antes, depois, limite, minimo_ms):
+    """Lista (tamanho, rota, p95 antes, p95 depois, variação %, regressão?) das rotas presentes nos dois"""
+    linhas = []
+    for tamanho, resultado in depois['resultados'].items():
+        anteriores = antes['resultados'].get(tamanho, {}).get('rotas', {})
+        for nome, medida in resultado['rotas'].items():
+            anterior = anteriores.get(nome)
+            if not anterior:
+                continue
+            variacao = (medida['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] * 100 if anterior['p95_ms'] else 0
+            # Rotas de poucos milissegundos oscilam muito em termos relativos
+            regressao = variacao > limite and medida['p95_ms'] - anterior['p95_ms'] >= minimo_ms
+            linhas.append((tamanho, nome, anterior['p95_ms'], medida['p95_ms'], variacao, regressao))
+    return linhas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara o p95 de dois resultados do benchmark')
+    parser.add_argument('antes')
+    parser.add_argument('depois')
+    parser.add_argument('--limite', type=float, default=20.0, help='piora máxima aceita do p95, em %%')
+    parser.add_argument('--minimo-ms', type=float, default=2.0, help='diferença absoluta mínima para contar')
+    args = parser.parse_args(argv)
+
+    antes, depois = carregar(args.antes), carregar(args.depois)
+    if antes.get('modo') != depois.get('modo'):
+        print(f"Aviso: modos diferentes ({antes.get('modo')} x {depois.get('modo')})")
+    print(f"{antes.get('commit')} -> {depois.get('commit')}")
+
+    regressoes = 0
+    for tamanho, nome, anterior, atual, variacao, regressao in comparar(antes, depois, args.limite, args.minimo_ms):
+        marca = 'PIOROU' if regressao else ''
+        print(f'{tamanho:>7} {nome:<32} {anterior:>9.2f} -> {atual:>9.2f} ms  {variacao:+7.1f}%  {marca}')
+        regressoes += regressao
+    print(f'{regressoes} regressão(ões) acima de {args.limite:g}%.')
+    sys.exit(1 if regressoes else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import io
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from werkzeug.datastructures import FileStorage
+from app import db
+from models import Usuario, Vaga, Candidato
+from armazenamento import salvar_curriculo
+from afinidade import reconstruir_afinidade
+
+# Gerador de dados sintéticos com semente fixa: a mesma semente e os mesmos
+# tamanhos produzem sempre o mesmo banco, então os resultados são comparáveis.
+
+EMAIL_MASTER = 'bench@budel.com.br'
+SENHA_MASTER = 'bench'
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+         'Karina', 'Lucas', 'Mariana', 'Nicolas', 'Otávio', 'Patrícia', 'Rafael', 'Sabrina', 'Thiago', 'Vitória']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Melo', 'Barbosa', 'Rocha']
+CARGOS = ['Desenvolvedor Python', 'Analista de RH', 'Assistente Administrativo', 'Vendedor Externo',
+          'Analista Financeiro', 'Designer Gráfico', 'Auxiliar de Logística', 'Engenheiro de Dados',
+          'Técnico de Suporte', 'Coordenador Comercial', 'Operador de Produção', 'Recepcionista']
+CIDADES = ['São Paulo - SP', 'Curitiba - PR', 'Belo Horizonte - MG', 'Porto Alegre - RS', 'Remoto']
+REQUISITOS = ['Python, Flask e SQL', 'Excel avançado', 'CNH categoria B', 'Inglês intermediário',
+              'Experiência com atendimento', 'Pacote Office', 'Power BI', 'Photoshop e Illustrator']
+
+# Distribuição observada em produção: a maioria fica pendente ou é reprovada
+DISTRIBUICAO_STATUS = [('pendente', 45), ('em_analise', 20), ('reprovado', 25), ('aprovado', 5), ('banco_talentos', 5)]
+DISTRIBUICAO_VAGAS = [('ativa', 70), ('inativa', 15), ('encerrada', 15)]
+
+LOTE = 5000
+
+def _pdf(rng, indice):
+    """PDF mínimo com conteúdo único (cada um vira um arquivo distinto no armazenamento)"""
+    texto = f'Curriculo sintetico {indice} {rng.random()}'.encode()
+    return b'%PDF-1.4\n' + texto + b'\n' + rng.randbytes(rng.randint(2048, 16384)) + b'\n%%EOF\n'
+
+def _escolher(rng, distribuicao, quantidade):
+    valores, pesos = zip(*distribuicao)
+    return rng.choices(valores, weights=pesos, k=quantidade)
+
+def gerar_dados(vagas=50, candidatos=1000, usuarios=10, curriculos=200, semente=42):
+    """Popula o banco configurado no app. Retorna um resumo com ids úteis para o benchmark."""
+    rng = random.Random(semente)
+    inicio = time.monotonic()
+    agora = datetime.utcnow()
+
+    master = Usuario(nome='Benchmark', email=EMAIL_MASTER, tipo='master')
+    master.set_senha(SENHA_MASTER)
+    db.session.add(master)
+    for indice in range(usuarios):
+        usuario = Usuario(nome=f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}',
+                          email=f'usuario{indice}@budel.com.br', tipo=rng.choice(['rh', 'admin']))
+        usuario.set_senha(uuid.uuid4().hex)
+        usuario.data_criacao = agora - timedelta(days=rng.randint(0, 720))
+        db.session.add(usuario)
+    db.session.commit()
+
+    status_vagas = _escolher(rng, DISTRIBUICAO_VAGAS, vagas)
+    linhas_vagas = []
+    for indice in range(vagas):
+        criacao = agora - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+        linhas_vagas.append({
+            'titulo': f'{rng.choice(CARGOS)} {indice}',
+            'descricao': 'Vaga gerada para benchmark. ' * rng.randint(3, 20),
+            'requisitos': ', '.join(rng.sample(REQUISITOS, 3)),
+            'localizacao': rng.choice(CIDADES),
+            'status': status_vagas[indice],
+            'link_inscricao': f'bench{indice:05d}',
+            'data_criacao': criacao,
+            'data_atualizacao': criacao
+        })
+    db.session.execute(insert(Vaga.__table__), linhas_vagas)
+    db.session.commit()
+    ids_vagas = [id for id, in db.session.query(Vaga.id).order_by(Vaga.id)]
+    # Poucas vagas concentram a maior parte das inscrições
+    pesos_vagas = [1 / (posicao + 1) for posicao in range(len(ids_vagas))]
+
+    armazenados = []
+    for indice in range(curriculos):
+        arquivo = FileStorage(stream=io.BytesIO(_pdf(rng, indice)), filename=f'cv{indice}.pdf')
+        armazenados.append(salvar_curriculo(arquivo, 'pdf'))
+    db.session.commit()
+
+    restantes = candidatos
+    numero = 0
+    while restantes > 0:
+        quantidade = min(LOTE, restantes)
+        status = _escolher(rng, DISTRIBUICAO_STATUS, quantidade)
+        destinos = rng.choices(ids_vagas, weights=pesos_vagas, k=quantidade)
+        linhas = []
+        for indice in range(quantidade):
+            nome = f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}'
+            candidatura = agora - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+            arquivo = rng.choice(armazenados) if armazenados and rng.random() < 0.9 else None
+            linhas.append({
+                'nome': nome,
+                'email': f'candidato{numero}@exemplo.com.br',
+                'telefone': f'(41) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}',
+                'linkedin': f'https://linkedin.com/in/candidato{numero}' if rng.random() < 0.6 else '',
+                'arquivo_curriculo': arquivo['nome'] if arquivo else '',
+                'arquivo_hash': arquivo['hash'] if arquivo else None,
+                'arquivo_tamanho': arquivo['tamanho'] if arquivo else None,
+                'arquivo_mime': arquivo['mime'] if arquivo else None,
+                'expectativa_salario': f'R$ {rng.randint(15, 150) * 100}',
+                'vaga_id': destinos[indice],
+                'status': status[indice],
+                'observacoes': f'Experiência com {rng.choice(REQUISITOS)}. {rng.choice(CARGOS)}.' if rng.random() < 0.4 else '',
+                'data_candidatura': candidatura,
+                'data_atualizacao': candidatura
+            })
+            numero += 1
+        db.session.execute(insert(Candidato.__table__), linhas)
+        db.session.commit()
+        restantes -= quantidade
+
+    # Cada currículo do conjunto é compartilhado por vários candidatos
+    db.session.execute(text(
+        'UPDATE arquivos SET referencias = (SELECT count(*) FROM candidatos WHERE arquivo_hash = arquivos.hash)'
+    ))
+    db.session.commit()
+    with db.engine.begin() as conexao:
+        reconstruir_afinidade(conexao)
+
+    maior_vaga = db.session.query(Vaga.id, Vaga.link_inscricao).order_by(Vaga.candidatos_count.desc()).first()
+    candidato = db.session.query(Candidato.id, Candidato.arquivo_curriculo).filter(
+        Candidato.vaga_id == maior_vaga.id, Candidato.arquivo_curriculo != ''
+    ).first()
+    vaga_ativa = db.session.query(Vaga.link_inscricao).filter(Vaga.status == 'ativa').order_by(Vaga.id).first()
+    menor_vaga = db.session.query(Vaga.id).filter(Vaga.candidatos_count > 0).order_by(Vaga.candidatos_count).first()
+    return {
+        'segundos': round(time.monotonic() - inicio, 2),
+        'vaga_id': maior_vaga.id,
+        'vaga_pequena_id': menor_vaga.id if menor_vaga else maior_vaga.id,
+        'link_ativo': vaga_ativa.link_inscricao if vaga_ativa else maior_vaga.link_inscricao,
+        'candidato_id': candidato.id if candidato else None,
+        'arquivo': candidato.arquivo_curriculo if candidato else None,
+        'ids_lote': [id for id, in db.session.query(Candidato.id).filter(
+            Candidato.vaga_id == maior_vaga.id).order_by(Candidato.id).limit(50)],
+        'usuario_id': db.session.query(Usuario.id).filter(Usuario.email != EMAIL_MASTER).order_by(Usuario.id).limit(1).scalar()
+    }
@@ -0,0 +1,337 @@
+"""Benchmark de todas as rotas com dados sintéticos.
+
+    python -m benchmark.executar --candidatos 1000 10000 100000 --saida bench.json
+    python -m benchmark.executar --modo gunicorn --threads 8 --workers 2
+
+Cada tamanho roda em um processo separado, com banco, uploads e pastas
+temporárias próprios, para que o pico de memória (RSS) seja medido por tamanho.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ===== ESTATÍSTICAS =====
+
+def percentil(ordenados, fracao):
+    """Percentil pelo posto mais próximo (sem interpolação)"""
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+def resumir(tempos, consultas=None, status=None):
+    ordenados = sorted(tempos)
+    resumo = {
+        'amostras': len(ordenados),
+        'p50_ms': round(percentil(ordenados, 0.50) * 1000, 2),
+        'p95_ms': round(percentil(ordenados, 0.95) * 1000, 2),
+        'p99_ms': round(percentil(ordenados, 0.99) * 1000, 2),
+        'media_ms': round(sum(ordenados) / len(ordenados) * 1000, 2),
+        'max_ms': round(ordenados[-1] * 1000, 2),
+        'consultas_por_requisicao': round(sum(consultas) / len(consultas), 1) if consultas else None,
+    }
+    if status:
+        resumo['status'] = sorted(set(status))
+    return resumo
+
+def rss_pico_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB no Linux
+
+# ===== PREPARAÇÃO (processo filho) =====
+
+def _configurar_ambiente(pasta):
+    """Aponta banco, uploads e pastas de trabalho para `pasta` antes de importar o app"""
+    os.makedirs(pasta, exist_ok=True)
+    os.environ.update({
+        'DATABASE_PATH': os.path.join(pasta, 'bench.db'),
+        'UPLOAD_FOLDER': os.path.join(pasta, 'uploads'),
+        'TAREFAS_PASTA': os.path.join(pasta, 'tarefas'),
+        'BACKUP_PASTA': os.path.join(pasta, 'backups'),
+        'CACHE_PAGINAS_ARQUIVO': os.path.join(pasta, 'cache_paginas.db'),
+        'METRICAS_PASTA': os.path.join(pasta, 'metricas'),
+        'OUTBOX_THREAD': 'False',  # sem servidor SMTP: os emails ficam na outbox
+    })
+
+def _preparar(args, pasta):
+    _configurar_ambiente(pasta)
+    sys.path.insert(0, RAIZ)
+    from app import app
+    from benchmark.dados import gerar_dados
+    with app.app_context():
+        contexto = gerar_dados(vagas=args.vagas, candidatos=args.tamanho, usuarios=args.usuarios,
+                               curriculos=args.curriculos, semente=args.semente)
+    contexto['rodada'] = uuid.uuid4().hex[:6]
+    return app, contexto
+
+# ===== MODO CLIENTE (Flask test client, um processo) =====
+
+def _corpo_cliente(rota, contexto, indice):
+    if rota.dados is None:
+        return None
+    dados = rota.dados(contexto, indice)
+    return {chave: (io.BytesIO(valor[0]), valor[1]) if isinstance(valor, tuple) else valor
+            for chave, valor in dados.items()}
+
+def medir_cliente(args, pasta):
+    app, contexto = _preparar(args, pasta)
+    from sqlalchemy import event
+    from app import db
+    from benchmark.dados import EMAIL_MASTER, SENHA_MASTER
+    from benchmark.rotas import ROTAS
+
+    consultas = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a, **kw: consultas.__setitem__(0, consultas[0] + 1))
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'email': EMAIL_MASTER, 'senha': SENHA_MASTER})
+    rss_apos_dados = rss_pico_kb()
+    contador = itertools.count()
+
+    rotas = {}
+    for rota in ROTAS:
+        repeticoes = rota.repeticoes or args.repeticoes
+        tempos, por_requisicao, status = [], [], []
+        for rodada in range(args.aquecimento + repeticoes):
+            indice = next(contador)
+            url = rota.url(contexto)
+            consultas[0] = 0
+            inicio = time.perf_counter()
+            resposta = cliente.open(url, method=rota.metodo, data=_corpo_cliente(rota, contexto, indice))
+            resposta.get_data()  # respostas em fluxo só terminam quando lidas
+            duracao = time.perf_counter() - inicio
+            resposta.close()
+            if rodada >= args.aquecimento:
+                tempos.append(duracao)
+                por_requisicao.append(consultas[0])
+                status.append(resposta.status_code)
+        rotas[rota.nome] = dict(resumir(tempos, por_requisicao, status), endpoint=rota.endpoint)
+    return {'geracao_s': contexto['segundos'], 'rss_apos_dados_kb': rss_apos_dados,
+            'rss_pico_kb': rss_pico_kb(), 'rotas_sem_medicao': _rotas_sem_medicao(app), 'rotas': rotas}
+
+# ===== MODO GUNICORN (HTTP real, várias threads) =====
+
+def _porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _multipart(dados):
+    limite = uuid.uuid4().hex
+    partes = []
+    for chave, valor in dados.items():
+        valores = valor if isinstance(valor, list) else [valor]
+        for item in valores:
+            if isinstance(item, tuple):
+                cabecalho = (f'--{limite}\r\nContent-Disposition: form-data; name="{chave}"; '
+                             f'filename="{item[1]}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+                partes.append(cabecalho.encode() + item[0] + b'\r\n')
+            else:
+                partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{chave}"\r\n\r\n{item}\r\n'.encode())
+    partes.append(f'--{limite}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+_abridor = urllib.request.build_opener(_SemRedirecionar)
+
+SERVER_TIMING_SQL = re.compile(r'sql;dur=[\d.]+;desc="(\d+) consultas"')
+
+def _requisitar(base, url, metodo='GET', dados=None, cookie=None):
+    corpo, tipo = _multipart(dados) if dados else (None, None)
+    requisicao = urllib.request.Request(base + url, data=corpo, method=metodo)
+    if tipo:
+        requisicao.add_header('Content-Type', tipo)
+    if cookie:
+        requisicao.add_header('Cookie', cookie)
+    try:
+        with _abridor.open(requisicao, timeout=300) as resposta:
+            resposta.read()
+            return resposta.status, resposta.headers
+    except urllib.error.HTTPError as erro:
+        erro.read()
+        return erro.code, erro.headers
+
+def _rss_processos(pid_mestre):
+    """Pico de RSS (VmHWM) do mestre e de cada worker do gunicorn"""
+    picos = {}
+    for nome in os.listdir('/proc'):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f'/proc/{nome}/status') as arquivo:
+                campos = dict(linha.split(':', 1) for linha in arquivo if ':' in linha)
+        except OSError:
+            continue
+        if int(nome) == pid_mestre or int(campos.get('PPid', '0')) == pid_mestre:
+            picos[nome] = int(campos.get('VmHWM', '0 kB').split()[0])
+    return picos
+
+def medir_gunicorn(args, pasta):
+    app, contexto = _preparar(args, pasta)
+    from benchmark.dados import EMAIL_MASTER, SENHA_MASTER
+    from benchmark.rotas import ROTAS
+
+    porta = _porta_livre()
+    base = f'http://127.0.0.1:{porta}'
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{porta}',
+         '--worker-class', 'gthread', '--workers', str(args.workers), '--threads', str(args.threads)],
+        cwd=RAIZ, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                _requisitar(base, '/login')
+                break
+            except OSError:
+                if time.monotonic() > limite or processo.poll() is not None:
+                    raise RuntimeError('gunicorn não respondeu')
+                time.sleep(0.2)
+
+        _, cabecalhos = _requisitar(base, '/login', 'POST', {'email': EMAIL_MASTER, 'senha': SENHA_MASTER})
+        cookie = cabecalhos.get('Set-Cookie', '').split(';', 1)[0]
+        contador = itertools.count()
+        trava = threading.Lock()
+
+        def uma_requisicao(rota):
+            with trava:
+                indice = next(contador)
+            dados = rota.dados(contexto, indice) if rota.dados else None
+            inicio = time.perf_counter()
+            status, cabecalhos = _requisitar(base, rota.url(contexto), rota.metodo, dados, cookie)
+            duracao = time.perf_counter() - inicio
+            # Sem acesso ao engine do worker: as consultas vêm do header Server-Timing
+            consultas = SERVER_TIMING_SQL.search(cabecalhos.get('Server-Timing', ''))
+            return duracao, status, int(consultas.group(1)) if consultas else None
+
+        rotas = {}
+        with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+            for rota in ROTAS:
+                if rota.endpoint == 'login':
+                    continue  # um novo login trocaria o cookie compartilhado pelas threads
+                repeticoes = rota.repeticoes or args.repeticoes
+                list(executor.map(uma_requisicao, [rota] * args.aquecimento))
+                inicio = time.perf_counter()
+                medidas = list(executor.map(uma_requisicao, [rota] * repeticoes))
+                decorrido = time.perf_counter() - inicio
+                rotas[rota.nome] = dict(
+                    resumir([tempo for tempo, _, _ in medidas],
+                            [consultas for _, _, consultas in medidas if consultas is not None],
+                            [status for _, status, _ in medidas]),
+                    endpoint=rota.endpoint,
+                    requisicoes_por_segundo=round(repeticoes / decorrido, 1)
+                )
+        picos = _rss_processos(processo.pid)
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+    return {'geracao_s': contexto['segundos'], 'rss_pico_kb': max(picos.values(), default=None),
+            'rss_por_processo_kb': picos, 'rotas_sem_medicao': _rotas_sem_medicao(app), 'rotas': rotas}
+
+# ===== ORQUESTRAÇÃO =====
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _rotas_sem_medicao(app):
+    """Rotas registradas no app que não estão no roteiro nem em IGNORADAS"""
+    from benchmark.rotas import ROTAS, IGNORADAS
+    medidas = {rota.endpoint for rota in ROTAS}
+    return sorted(regra.endpoint for regra in app.url_map.iter_rules()
+                  if regra.endpoint not in medidas and regra.endpoint not in IGNORADAS)
+
+def _executar_tamanho(args, tamanho):
+    """Roda um tamanho em um processo filho e devolve o resultado dele"""
+    with tempfile.TemporaryDirectory(prefix='bench_') as pasta:
+        saida = os.path.join(pasta, 'resultado.json')
+        comando = [sys.executable, '-m', 'benchmark.executar', '--interno', saida, '--tamanho', str(tamanho)]
+        for opcao in ('modo', 'vagas', 'usuarios', 'curriculos', 'semente', 'repeticoes', 'aquecimento',
+                      'workers', 'threads', 'concorrencia'):
+            comando += [f'--{opcao}', str(getattr(args, opcao))]
+        subprocess.run(comando, cwd=RAIZ, check=True)
+        with open(saida, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das rotas com dados sintéticos')
+    parser.add_argument('--candidatos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--modo', choices=['cliente', 'gunicorn'], default='cliente')
+    parser.add_argument('--vagas', type=int, default=200)
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--curriculos', type=int, default=200)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=30)
+    parser.add_argument('--aquecimento', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concorrencia', type=int, default=8, help='threads de cliente no modo gunicorn')
+    parser.add_argument('--saida', default=None, help='arquivo JSON (padrão: benchmark_<commit>_<modo>.json)')
+    parser.add_argument('--interno', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--tamanho', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        pasta = os.path.dirname(args.interno)
+        medir = medir_gunicorn if args.modo == 'gunicorn' else medir_cliente
+        resultado = medir(args, os.path.join(pasta, 'dados'))
+        with open(args.interno, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False)
+        return
+
+    commit = _commit()
+    relatorio = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'modo': args.modo,
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {opcao: getattr(args, opcao) for opcao in (
+            'vagas', 'usuarios', 'curriculos', 'semente', 'repeticoes', 'aquecimento',
+            'workers', 'threads', 'concorrencia')},
+        'rotas_sem_medicao': [],
+        'resultados': {}
+    }
+    for tamanho in args.candidatos:
+        print(f'== {tamanho} candidatos ({args.modo})', flush=True)
+        resultado = _executar_tamanho(args, tamanho)
+        relatorio['resultados'][str(tamanho)] = resultado
+        relatorio['rotas_sem_medicao'] = resultado.pop('rotas_sem_medicao')
+        for nome, medida in resultado['rotas'].items():
+            print(f"  {nome:<32} p50 {medida['p50_ms']:>9.2f}  p95 {medida['p95_ms']:>9.2f}  "
+                  f"p99 {medida['p99_ms']:>9.2f} ms  consultas {medida['consultas_por_requisicao']}", flush=True)
+        print(f"  RSS pico: {resultado['rss_pico_kb']} KiB", flush=True)
+    if relatorio['rotas_sem_medicao']:
+        print(f"Rotas sem medição: {', '.join(relatorio['rotas_sem_medicao'])}")
+
+    saida = args.saida or os.path.join(RAIZ, f"benchmark_{commit or 'local'}_{args.modo}.json")
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f'Resultados gravados em {saida}')
+
+if __name__ == '__main__':
+    main()
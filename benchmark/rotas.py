@@ -0,0 +1,94 @@
+from benchmark.dados import EMAIL_MASTER, SENHA_MASTER
+
+# Roteiro do benchmark: uma entrada por rota de routes.py. Cada entrada recebe o
+# contexto gerado (ids, links, arquivo) e o número da repetição, para que as rotas
+# de escrita não colidam (emails e títulos únicos).
+
+class Rota:
+    def __init__(self, nome, endpoint, url, metodo='GET', dados=None, repeticoes=None):
+        self.nome = nome
+        self.endpoint = endpoint
+        self.url = url
+        self.metodo = metodo
+        self.dados = dados
+        self.repeticoes = repeticoes  # None = padrão do harness; rotas pesadas rodam menos vezes
+
+PDF = b'%PDF-1.4\nbenchmark\n%%EOF\n'
+
+ROTAS = [
+    Rota('index', 'index', lambda ctx: '/'),
+    Rota('login (GET)', 'login', lambda ctx: '/login'),
+    Rota('login (POST)', 'login', lambda ctx: '/login', 'POST',
+         lambda ctx, i: {'email': EMAIL_MASTER, 'senha': SENHA_MASTER}),
+    Rota('dashboard', 'dashboard', lambda ctx: '/dashboard'),
+    Rota('usuários', 'listar_usuarios', lambda ctx: '/usuarios'),
+    Rota('cadastrar usuário (GET)', 'cadastrar_usuario', lambda ctx: '/usuarios/cadastrar'),
+    Rota('cadastrar usuário (POST)', 'cadastrar_usuario', lambda ctx: '/usuarios/cadastrar', 'POST',
+         lambda ctx, i: {'nome': f'Usuário Bench {i}', 'email': f'bench{ctx["rodada"]}_{i}@budel.com.br',
+                         'senha': 'bench', 'tipo': 'rh'}),
+    Rota('editar usuário (GET)', 'editar_usuario', lambda ctx: f'/usuarios/editar/{ctx["usuario_id"]}'),
+    Rota('editar usuário (POST)', 'editar_usuario', lambda ctx: f'/usuarios/editar/{ctx["usuario_id"]}', 'POST',
+         lambda ctx, i: {'nome': f'Usuário Editado {i}', 'email': f'editado{ctx["usuario_id"]}@budel.com.br',
+                         'tipo': 'rh', 'ativo': 'on', 'senha': ''}),
+    Rota('vagas', 'listar_vagas', lambda ctx: '/vagas'),
+    Rota('vagas (com arquivo)', 'listar_vagas', lambda ctx: '/vagas?arquivo=1'),
+    Rota('criar vaga (GET)', 'criar_vaga', lambda ctx: '/vagas/criar'),
+    Rota('criar vaga (POST)', 'criar_vaga', lambda ctx: '/vagas/criar', 'POST',
+         lambda ctx, i: {'titulo': f'Vaga Bench {i}', 'descricao': 'Criada pelo benchmark',
+                         'requisitos': 'Python', 'localizacao': 'Remoto'}),
+    Rota('editar vaga (GET)', 'editar_vaga', lambda ctx: f'/vagas/editar/{ctx["vaga_id"]}'),
+    Rota('editar vaga (POST)', 'editar_vaga', lambda ctx: f'/vagas/editar/{ctx["vaga_pequena_id"]}', 'POST',
+         lambda ctx, i: {'titulo': f'Vaga Editada {i}', 'descricao': 'Editada pelo benchmark',
+                         'requisitos': 'SQL', 'localizacao': 'Remoto', 'status': 'ativa'}),
+    Rota('página de inscrição', 'pagina_inscricao', lambda ctx: f'/inscrever/{ctx["link_ativo"]}'),
+    Rota('inscrição (POST)', 'processar_inscricao', lambda ctx: f'/inscrever/{ctx["link_ativo"]}', 'POST',
+         lambda ctx, i: {'nome': f'Candidato Bench {i}', 'email': f'inscrito{ctx["rodada"]}_{i}@exemplo.com.br',
+                         'telefone': '(41) 99999-0000', 'curriculo': (PDF, 'cv.pdf')}),
+    Rota('candidatos da vaga', 'candidatos_por_vaga', lambda ctx: f'/candidatos/vaga/{ctx["vaga_id"]}'),
+    Rota('candidatos da vaga (afinidade)', 'candidatos_por_vaga',
+         lambda ctx: f'/candidatos/vaga/{ctx["vaga_id"]}?ordem=afinidade'),
+    Rota('alterar status', 'atualizar_status_candidato', lambda ctx: f'/candidatos/status/{ctx["candidato_id"]}',
+         'POST', lambda ctx, i: {'status': ['em_analise', 'aprovado'][i % 2], 'observacoes': ''}),
+    Rota('ação em lote (50)', 'acao_lote_candidatos', lambda ctx: '/candidatos/lote', 'POST',
+         lambda ctx, i: {'acao': 'status', 'status': ['em_analise', 'pendente'][i % 2],
+                         'ids': [str(id) for id in ctx['ids_lote']]}),
+    Rota('banco de talentos', 'banco_talentos', lambda ctx: '/banco-talentos'),
+    Rota('banco de talentos (status)', 'banco_talentos', lambda ctx: '/banco-talentos?status=aprovado'),
+    Rota('banco de talentos (busca)', 'banco_talentos', lambda ctx: '/banco-talentos?busca=silva+python'),
+    Rota('banco de talentos (com arquivo)', 'banco_talentos', lambda ctx: '/banco-talentos?arquivo=1'),
+    Rota('ver candidato', 'ver_candidato', lambda ctx: f'/candidatos/ver/{ctx["candidato_id"]}'),
+    Rota('download currículo', 'download_curriculo', lambda ctx: f'/download/{ctx["arquivo"]}'),
+    Rota('zip de currículos', 'download_curriculos_vaga',
+         lambda ctx: f'/candidatos/vaga/{ctx["vaga_pequena_id"]}/curriculos.zip', repeticoes=3),
+    Rota('exportar banco (csv)', 'exportar_banco_talentos', lambda ctx: '/banco-talentos/exportar?formato=csv',
+         repeticoes=3),
+    Rota('exportar vaga (xlsx)', 'exportar_candidatos_vaga',
+         lambda ctx: f'/candidatos/vaga/{ctx["vaga_id"]}/exportar?formato=xlsx', repeticoes=3),
+    Rota('api vagas', 'api_vagas', lambda ctx: '/api/vagas'),
+    Rota('api candidatos da vaga', 'api_candidatos_vaga', lambda ctx: f'/api/vagas/{ctx["vaga_id"]}/candidatos'),
+    Rota('api candidatos', 'api_candidatos', lambda ctx: '/api/candidatos?status=pendente'),
+    Rota('manutenção', 'manutencao', lambda ctx: '/manutencao'),
+    Rota('status do backup', 'backup_status', lambda ctx: '/manutencao/backup/status'),
+    Rota('status da importação', 'importacao_status', lambda ctx: '/manutencao/importar/status'),
+    Rota('status da extração', 'extracao_status', lambda ctx: '/manutencao/extrair-textos/status'),
+    Rota('status do arquivamento', 'arquivamento_status', lambda ctx: '/manutencao/arquivar-vagas/status'),
+    Rota('reindexar busca', 'reindexar_busca', lambda ctx: '/manutencao/reindexar-busca', repeticoes=3),
+    Rota('recalcular contagens', 'recalcular_contagens_status', lambda ctx: '/manutencao/recalcular-contagens',
+         repeticoes=3),
+    Rota('logs', 'ver_logs', lambda ctx: '/manutencao/logs'),
+]
+
+# Rotas que não entram na medição, e por quê
+IGNORADAS = {
+    'logout': 'encerra a sessão do próprio benchmark',
+    'excluir_usuario': 'destrutiva',
+    'excluir_vaga': 'destrutiva',
+    'backup_banco': 'só dispara uma tarefa em segundo plano',
+    'importar_csv': 'só dispara uma tarefa em segundo plano',
+    'extrair_textos': 'só dispara uma tarefa em segundo plano',
+    'arquivar_vagas': 'só dispara uma tarefa em segundo plano',
+    'ver_vaga_arquivada': 'depende de vagas arquivadas',
+    'ver_candidato_arquivado': 'depende de candidatos arquivados',
+    'importacao_erros': 'depende de uma importação com erros',
+    'static': 'arquivos estáticos',
+}
@@ -0,0 +1,117 @@
+import re
+from sqlalchemy import event, text, select, literal_column, table
+from app import db
+from models import Candidato, CandidatoArquivado
+
+# Índice de busca textual (SQLite FTS5) do banco de talentos.
+# Sem acentos e sem diferença de maiúsculas: "joao" encontra "João".
+
+DDL_INDICE_BUSCA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS candidatos_fts USING fts5(
+        nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS candidatos_fts_ai AFTER INSERT ON candidatos BEGIN
+        INSERT INTO candidatos_fts (rowid, nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos)
+        SELECT new.id, new.nome, new.email, new.observacoes, new.expectativa_salario, v.titulo, v.requisitos
+        FROM (SELECT 1) LEFT JOIN vagas v ON v.id = new.vaga_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS candidatos_fts_ad AFTER DELETE ON candidatos BEGIN
+        DELETE FROM candidatos_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS candidatos_fts_au
+    AFTER UPDATE OF nome, email, observacoes, expectativa_salario, vaga_id ON candidatos BEGIN
+        DELETE FROM candidatos_fts WHERE rowid = old.id;
+        INSERT INTO candidatos_fts (rowid, nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos)
+        SELECT new.id, new.nome, new.email, new.observacoes, new.expectativa_salario, v.titulo, v.requisitos
+        FROM (SELECT 1) LEFT JOIN vagas v ON v.id = new.vaga_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vagas_fts_au AFTER UPDATE OF titulo, requisitos ON vagas BEGIN
+        UPDATE candidatos_fts SET vaga_titulo = new.titulo, vaga_requisitos = new.requisitos
+        WHERE rowid IN (SELECT id FROM candidatos WHERE vaga_id = new.id);
+    END""",
+]
+
+# Candidatos arquivados: mesmo formato, preenchido por arquivamento.py (o arquivo não muda)
+DDL_INDICE_BUSCA_ARQUIVO = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS candidatos_arquivo_fts USING fts5(
+        nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+]
+
+# Pesos do bm25 na ordem das colunas: nome e título da vaga valem mais
+PESOS_BM25 = '10.0, 2.0, 1.0, 1.0, 5.0, 1.0'
+
+_indice_pronto = False
+
+def criar_indice_busca(conexao):
+    for comando in DDL_INDICE_BUSCA:
+        conexao.exec_driver_sql(comando)
+
+def criar_indice_busca_arquivo(conexao):
+    for comando in DDL_INDICE_BUSCA_ARQUIVO:
+        conexao.exec_driver_sql(comando)
+
+def reconstruir_indice_busca(conexao):
+    """Repopula os índices a partir das tabelas de candidatos e vagas (quentes e arquivadas)"""
+    conexao.exec_driver_sql("DELETE FROM candidatos_fts")
+    conexao.exec_driver_sql(
+        """INSERT INTO candidatos_fts (rowid, nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos)
+        SELECT c.id, c.nome, c.email, c.observacoes, c.expectativa_salario, v.titulo, v.requisitos
+        FROM candidatos c LEFT JOIN vagas v ON v.id = c.vaga_id"""
+    )
+    conexao.exec_driver_sql("INSERT INTO candidatos_fts (candidatos_fts) VALUES ('optimize')")
+    conexao.exec_driver_sql("DELETE FROM candidatos_arquivo_fts")
+    conexao.exec_driver_sql(
+        """INSERT INTO candidatos_arquivo_fts (rowid, nome, email, observacoes, expectativa_salario, vaga_titulo, vaga_requisitos)
+        SELECT c.id, c.nome, c.email, c.observacoes, c.expectativa_salario,
+               coalesce(va.titulo, v.titulo), coalesce(va.requisitos, v.requisitos)
+        FROM candidatos_arquivo c
+        LEFT JOIN vagas_arquivo va ON va.id = c.vaga_id LEFT JOIN vagas v ON v.id = c.vaga_id"""
+    )
+
+# Bancos novos recebem o índice junto com a tabela de candidatos
+event.listen(Candidato.__table__, 'after_create',
+             lambda target, conexao, **kw: criar_indice_busca(conexao))
+event.listen(CandidatoArquivado.__table__, 'after_create',
+             lambda target, conexao, **kw: criar_indice_busca_arquivo(conexao))
+
+def garantir_indice_busca():
+    """Cria e popula o índice em bancos que ainda não o possuem"""
+    global _indice_pronto
+    if _indice_pronto:
+        return
+    with db.engine.begin() as conexao:
+        existe = conexao.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candidatos_fts'"
+        ).first()
+        criar_indice_busca(conexao)
+        if not existe:
+            reconstruir_indice_busca(conexao)
+    _indice_pronto = True
+
+def montar_consulta_fts(busca):
+    """Converte o texto digitado em uma consulta FTS5 por prefixo ("jo sil" -> "jo"* "sil"*)"""
+    termos = re.findall(r'\w+', busca or '')
+    return ' '.join(f'"{termo}"*' for termo in termos)
+
+def subconsulta_busca(busca, indice='candidatos_fts'):
+    """Subconsulta (id, rank) dos candidatos que casam com a busca, ou None se não há termos.
+
+    O rank é o bm25 do FTS5: quanto menor, mais relevante. Com indice='candidatos_arquivo_fts'
+    a busca é feita nos candidatos arquivados.
+    """
+    consulta = montar_consulta_fts(busca)
+    if not consulta:
+        return None
+    garantir_indice_busca()
+    return (
+        select(literal_column('rowid').label('id'),
+               literal_column(f'bm25({indice}, {PESOS_BM25})').label('rank'))
+        .select_from(table(indice))
+        .where(text(f'{indice} MATCH :consulta_fts').bindparams(consulta_fts=consulta))
+        .subquery('busca')
+    )
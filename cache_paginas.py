@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from flask import request, Response
+from flask.sessions import SecureCookieSessionInterface
+from app import app
+
+# Cache de páginas públicas renderizadas, compartilhado entre os workers do
+# gunicorn por um arquivo SQLite próprio (separado do banco principal).
+
+# Endpoints servidos a qualquer visitante com Cache-Control: public
+ENDPOINTS_PUBLICOS = {'pagina_inscricao'}
+
+class SessaoForaDasPaginasPublicas(SecureCookieSessionInterface):
+    """Não grava, não renova e não varia pelo cookie de sessão nas páginas públicas.
+
+    Com a sessão permanente, o Flask reenviaria o cookie de um recrutador logado a cada
+    requisição, e uma CDN guardaria esse Set-Cookie junto com a página pública.
+    """
+    def save_session(self, app, session, response):
+        if request.endpoint in ENDPOINTS_PUBLICOS:
+            return
+        super().save_session(app, session, response)
+
+app.session_interface = SessaoForaDasPaginasPublicas()
+
+_local = threading.local()
+_gravacoes = [0]
+
+def _conexao():
+    conexao = getattr(_local, 'conexao', None)
+    if conexao is None:
+        arquivo = app.config['CACHE_PAGINAS_ARQUIVO']
+        os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+        conexao = sqlite3.connect(arquivo, timeout=5, isolation_level=None)
+        conexao.execute('PRAGMA journal_mode = WAL')
+        conexao.execute('PRAGMA synchronous = OFF')
+        conexao.execute(
+            'CREATE TABLE IF NOT EXISTS paginas ('
+            'chave TEXT PRIMARY KEY, status INTEGER, corpo BLOB, etag TEXT, expira REAL)'
+        )
+        _local.conexao = conexao
+    return conexao
+
+class PaginaCache:
+    def __init__(self, status, corpo, etag, expira):
+        self.status = status
+        self.corpo = corpo
+        self.etag = etag
+        self.expira = expira  # time.time() em que sai do cache compartilhado
+
+def obter_pagina(chave):
+    """Página em cache ainda válida, ou None"""
+    try:
+        linha = _conexao().execute(
+            'SELECT status, corpo, etag, expira FROM paginas WHERE chave = ? AND expira > ?',
+            (chave, time.time())
+        ).fetchone()
+    except sqlite3.Error:
+        # Cache indisponível não derruba a página: renderiza normalmente
+        return None
+    return PaginaCache(*linha) if linha else None
+
+def gravar_pagina(chave, status, html, ttl):
+    corpo = html.encode('utf-8')
+    pagina = PaginaCache(status, corpo, hashlib.sha1(corpo).hexdigest(), time.time() + ttl)
+    try:
+        conexao = _conexao()
+        conexao.execute(
+            'INSERT OR REPLACE INTO paginas (chave, status, corpo, etag, expira) VALUES (?, ?, ?, ?, ?)',
+            (chave, status, corpo, pagina.etag, pagina.expira)
+        )
+        # Limpeza periódica das entradas vencidas (ex.: links inexistentes)
+        _gravacoes[0] += 1
+        if _gravacoes[0] % 100 == 0:
+            conexao.execute('DELETE FROM paginas WHERE expira <= ?', (time.time(),))
+    except sqlite3.Error:
+        pass
+    return pagina
+
+def chave_inscricao(link):
+    return f'inscricao:{link}'
+
+def invalidar_pagina(chave):
+    try:
+        _conexao().execute('DELETE FROM paginas WHERE chave = ?', (chave,))
+    except sqlite3.Error:
+        app.logger.warning('Não foi possível invalidar a página %s do cache', chave)
+
+def resposta_pagina(pagina):
+    """Resposta pública, com ETag e Cache-Control seguros para CDN (sem cookie de sessão).
+
+    Navegador e CDN não guardam a página além do que resta dela no cache compartilhado,
+    então o formulário de uma vaga com data de encerramento não fica na CDN depois dela;
+    a página de vaga encerrada (404) fica no máximo CACHE_PAGINAS_TTL_ENCERRADA.
+    """
+    restante = max(0, int(pagina.expira - time.time()))
+    limite_cdn = app.config['CACHE_PAGINAS_TTL' if pagina.status == 200 else 'CACHE_PAGINAS_TTL_ENCERRADA']
+    resposta = Response(pagina.corpo, status=pagina.status, mimetype='text/html')
+    resposta.set_etag(pagina.etag)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = min(app.config['CACHE_PAGINAS_MAX_AGE'], restante)
+    resposta.cache_control.s_maxage = min(limite_cdn, restante)
+    if pagina.status == 200:
+        resposta = resposta.make_conditional(request)
+    return resposta
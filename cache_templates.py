@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from app import app
+from metricas import incrementar
+
+# Cache dos templates em dois níveis:
+# - bytecode: os templates compilados ficam em TEMPLATES_BYTECODE_PASTA, compartilhada
+#   pelos workers; um worker novo carrega o bytecode em vez de compilar de novo
+#   (o Jinja confere o checksum do fonte, então template alterado é recompilado);
+# - fragmentos: {% cache 'nome', chave1, chave2 %}...{% endcache %} guarda o HTML do
+#   bloco em memória (por worker, LRU). As chaves devem mudar sempre que o conteúdo
+#   muda (id + data_atualizacao), por isso não há invalidação.
+# Acertos e faltas vão para budel_cache_templates_total em /manutencao/metrics.
+
+class BytecodeCacheMedido(FileSystemBytecodeCache):
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        incrementar('budel_cache_templates_total', tipo='bytecode',
+                    resultado='acerto' if bucket.code is not None else 'falta')
+
+class CacheFragmentos:
+    """LRU de HTML renderizado, limitado a `maximo` entradas"""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            html = self._itens.get(chave)
+            if html is not None:
+                self._itens.move_to_end(chave)
+            return html
+
+    def gravar(self, chave, html):
+        with self._lock:
+            self._itens[chave] = html
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+class FragmentoExtension(Extension):
+    """Tag {% cache %}: renderiza o bloco uma vez por combinação de chaves.
+
+    A chave também leva o template e uma impressão do corpo do bloco, para que
+    uma alteração no template não reaproveite HTML antigo. Tudo o que o bloco usa
+    e pode mudar (inclusive dados de outras entidades) precisa estar nas chaves.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        chaves = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            chaves.append(parser.parse_expression())
+        corpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        impressao = hashlib.sha1(repr(corpo).encode('utf-8')).hexdigest()[:12]
+        prefixo = nodes.Const((parser.name, impressao))
+        return nodes.CallBlock(self.call_method('_renderizar', [prefixo, nodes.Tuple(chaves, 'load')]),
+                               [], [], corpo).set_lineno(lineno)
+
+    def _renderizar(self, prefixo, chaves, caller):
+        if not app.config['TEMPLATES_FRAGMENTOS']:
+            return caller()
+        chave = (*prefixo, *chaves)
+        html = fragmentos.obter(chave)
+        if html is None:
+            incrementar('budel_cache_templates_total', tipo='fragmento', resultado='falta')
+            html = caller()
+            fragmentos.gravar(chave, html)
+        else:
+            incrementar('budel_cache_templates_total', tipo='fragmento', resultado='acerto')
+        return html  # Markup quando o template tem autoescape
+
+fragmentos = CacheFragmentos(app.config['TEMPLATES_FRAGMENTOS_MAX'])
+
+pasta = app.config['TEMPLATES_BYTECODE_PASTA']
+if pasta:
+    os.makedirs(pasta, exist_ok=True)
+    app.jinja_env.bytecode_cache = BytecodeCacheMedido(pasta)
+app.jinja_env.add_extension(FragmentoExtension)
+
+@app.cli.command('compilar-templates')
+def compilar_templates_comando():
+    """Compila todos os templates para a pasta de bytecode (ex.: no deploy, antes dos workers)"""
+    nomes = app.jinja_env.list_templates()
+    for nome in nomes:
+        app.jinja_env.get_template(nome)
+    print(f'{len(nomes)} template(s) compilado(s) em {pasta or "memória (sem pasta de bytecode)"}')
@@ -0,0 +1,57 @@
+import time
+import zipfile
+
+# Geração de ZIP em fluxo: cada bloco escrito é repassado ao cliente na hora,
+# sem arquivo temporário e com memória constante.
+
+TAMANHO_BLOCO = 64 * 1024
+
+class _BufferSaida:
+    """Destino sem seek para o ZipFile; acumula só o que ainda não foi enviado"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+def ler_em_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    with open(caminho, 'rb') as arquivo:
+        while True:
+            bloco = arquivo.read(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+
+def gerar_zip(entradas, compressao=zipfile.ZIP_STORED):
+    """Gera os bytes de um ZIP a partir de (nome, iterável de blocos de bytes).
+
+    PDFs e DOCX já são comprimidos, então o padrão é armazenar sem compressão.
+    """
+    buffer = _BufferSaida()
+    data_hora = time.localtime()[:6]
+    with zipfile.ZipFile(buffer, 'w', compression=compressao) as zip_saida:
+        for nome, conteudo in entradas:
+            info = zipfile.ZipInfo(nome, date_time=data_hora)
+            info.compress_type = compressao
+            with zip_saida.open(info, 'w') as destino:
+                for bloco in conteudo:
+                    destino.write(bloco)
+                    dados = buffer.esvaziar()
+                    if dados:
+                        yield dados
+            dados = buffer.esvaziar()
+            if dados:
+                yield dados
+    dados = buffer.esvaziar()
+    if dados:
+        yield dados
@@ -0,0 +1,133 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+from app import db
+from models import Vaga, Candidato
+from compactacao import gerar_zip
+
+# Exportação de candidatos em CSV/XLSX lida do banco em blocos (yield_per)
+# e enviada em fluxo: memória constante qualquer que seja a quantidade de linhas.
+
+LINHAS_POR_BLOCO = 1000
+
+COLUNAS_EXPORTACAO = [
+    ('ID', Candidato.id),
+    ('Nome', Candidato.nome),
+    ('Email', Candidato.email),
+    ('Telefone', Candidato.telefone),
+    ('LinkedIn', Candidato.linkedin),
+    ('Expectativa Salarial', Candidato.expectativa_salario),
+    ('Vaga', Vaga.titulo),
+    ('Status', Candidato.status),
+    ('Observações', Candidato.observacoes),
+    ('Data Candidatura', Candidato.data_candidatura),
+    ('Data Atualização', Candidato.data_atualizacao)
+]
+
+CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def consulta_exportacao(*filtros):
+    """SELECT só com as colunas exportadas, sem carregar objetos nem relacionamentos"""
+    return db.session.query(*[coluna for _, coluna in COLUNAS_EXPORTACAO]).outerjoin(
+        Vaga, Vaga.id == Candidato.vaga_id
+    ).filter(*filtros)
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    return str(valor)
+
+def _texto_planilha(valor):
+    # Evita que o Excel interprete o conteúdo do candidato como fórmula
+    texto = _texto(valor)
+    if texto[:1] in ('=', '+', '-', '@'):
+        return "'" + texto
+    return texto
+
+class _Linha:
+    """Destino do csv.writer que só guarda a linha corrente"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, texto):
+        self.partes.append(texto)
+
+    def esvaziar(self):
+        texto = ''.join(self.partes)
+        self.partes.clear()
+        return texto
+
+def gerar_csv(query):
+    buffer = _Linha()
+    escritor = csv.writer(buffer, delimiter=';')
+    # BOM para o Excel abrir com acentuação correta
+    yield '\ufeff'.encode('utf-8')
+    escritor.writerow([titulo for titulo, _ in COLUNAS_EXPORTACAO])
+    for contador, linha in enumerate(query.yield_per(LINHAS_POR_BLOCO), start=1):
+        escritor.writerow([_texto_planilha(valor) for valor in linha])
+        if contador % LINHAS_POR_BLOCO == 0:
+            yield buffer.esvaziar().encode('utf-8')
+    yield buffer.esvaziar().encode('utf-8')
+
+def _celula(valor):
+    if isinstance(valor, int):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(CARACTERES_INVALIDOS_XML.sub('', _texto(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def _linha_xml(valores):
+    return '<row>' + ''.join(_celula(valor) for valor in valores) + '</row>'
+
+def _planilha(query):
+    yield ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+           + _linha_xml([titulo for titulo, _ in COLUNAS_EXPORTACAO])).encode('utf-8')
+    bloco = []
+    for linha in query.yield_per(LINHAS_POR_BLOCO):
+        bloco.append(_linha_xml(linha))
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield ''.join(bloco).encode('utf-8')
+            bloco.clear()
+    bloco.append('</sheetData></worksheet>')
+    yield ''.join(bloco).encode('utf-8')
+
+_ARQUIVOS_FIXOS_XLSX = [
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Candidatos" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+]
+
+def gerar_xlsx(query):
+    """Planilha XLSX mínima montada em fluxo (ZIP com a planilha em XML)"""
+    entradas = [(nome, [conteudo.encode('utf-8')]) for nome, conteudo in _ARQUIVOS_FIXOS_XLSX]
+    entradas.append(('xl/worksheets/sheet1.xml', _planilha(query)))
+    return gerar_zip(entradas, compressao=zipfile.ZIP_DEFLATED)
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (gerar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
@@ -0,0 +1,233 @@
+import click
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import CancelledError, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from sqlalchemy import event, select, or_
+from sqlalchemy.dialects.sqlite import insert
+from app import app, db
+from models import ArquivoCurriculo, Candidato, TextoCurriculo
+from armazenamento import caminho_relativo
+from afinidade import indexar_candidatos
+from leitura_curriculo import extrair_limitado, limitar_memoria
+from metricas import observar
+from tarefas import executar_tarefa
+
+logger = logging.getLogger(__name__)
+
+# Extração do texto dos currículos fora da requisição. Cada upload novo vai para um
+# pool de processos pequeno por worker (enfileirar_extracao); o preenchimento dos
+# arquivos já armazenados usa um pool com todos os núcleos (executar_extracao).
+# O resultado fica em curriculos_texto pelo hash do arquivo: conteúdo repetido é
+# extraído uma única vez, e o texto entra no vetor de afinidade dos candidatos.
+
+TAREFAS_POR_PROCESSO = 200  # recicla os processos extratores de tempos em tempos
+LOTE_GRAVACAO = 50
+
+DDL_EXTRACAO = [
+    """CREATE TRIGGER IF NOT EXISTS curriculos_texto_ad AFTER DELETE ON arquivos BEGIN
+        DELETE FROM curriculos_texto WHERE hash = old.hash;
+    END""",
+]
+
+def criar_limpeza_textos(conexao):
+    for comando in DDL_EXTRACAO:
+        conexao.exec_driver_sql(comando)
+
+event.listen(db.metadata, 'after_create',
+             lambda target, conexao, **kw: criar_limpeza_textos(conexao))
+
+def criar_pool(processos):
+    """Pool de extratores com teto de memória por processo.
+
+    Os processos vêm de um forkserver com leitura_curriculo pré-carregado, e não de
+    um fork do worker (com threads e conexões abertas). Como no spawn, cada processo
+    reimporta o módulo __main__ (o gunicorn, ou o app.py no servidor de desenvolvimento).
+    """
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload(['leitura_curriculo'])
+    return ProcessPoolExecutor(max_workers=processos, mp_context=contexto,
+                               initializer=limitar_memoria, initargs=(app.config['EXTRACAO_MEMORIA_MB'],),
+                               max_tasks_per_child=TAREFAS_POR_PROCESSO)
+
+def _agendar(pool, hash_arquivo, extensao):
+    caminho = os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], caminho_relativo(hash_arquivo, extensao)))
+    return pool.submit(extrair_limitado, hash_arquivo, caminho, extensao,
+                       app.config['EXTRACAO_TEMPO_MAX'], app.config['EXTRACAO_MAX_CARACTERES'])
+
+def _resultado_interrompido(hash_arquivo, erro='Processo de extração interrompido'):
+    # Sem resultado do extrator: o processo morreu (ex.: sinal do kernel), a tarefa foi
+    # cancelada com o pool ou falhou fora de extrair_limitado; --refazer tenta de novo
+    return {'hash': hash_arquivo, 'status': 'erro', 'texto': None, 'caracteres': 0,
+            'erro': erro, 'duracao_ms': None}
+
+def _resultado(hash_arquivo, futuro):
+    """Resultado do futuro; (resultado, pool_quebrado), sem deixar exceção escapar"""
+    try:
+        return futuro.result(), False
+    except BrokenProcessPool:
+        return _resultado_interrompido(hash_arquivo), True
+    except CancelledError:
+        return _resultado_interrompido(hash_arquivo, 'Extração cancelada com o pool de processos'), False
+    except Exception as erro:
+        logger.exception('Falha na extração do currículo %s', hash_arquivo)
+        return _resultado_interrompido(hash_arquivo, f'Falha na extração: {erro}'[:500]), False
+
+def gravar_textos(resultados, conexao):
+    """Grava os resultados e recalcula a afinidade dos candidatos com esses currículos"""
+    agora = datetime.utcnow()
+    colunas = ('status', 'texto', 'caracteres', 'erro', 'duracao_ms')
+    comando = insert(TextoCurriculo.__table__)
+    conexao.execute(
+        comando.on_conflict_do_update(index_elements=['hash'],
+                                      set_={coluna: comando.excluded[coluna] for coluna in (*colunas, 'data_extracao')}),
+        [{'hash': r['hash'], 'data_extracao': agora, **{coluna: r[coluna] for coluna in colunas}} for r in resultados]
+    )
+    ids = conexao.execute(
+        select(Candidato.id).where(Candidato.arquivo_hash.in_([r['hash'] for r in resultados]))
+    ).scalars().all()
+    indexar_candidatos(ids, conexao)
+    for r in resultados:
+        if r['duracao_ms'] is not None:
+            observar('budel_operacao_segundos', r['duracao_ms'] / 1000, operacao='extracao')
+
+# ===== UPLOADS NOVOS =====
+
+_pool = None
+_pool_lock = threading.Lock()
+_em_andamento = set()
+
+def _ao_concluir(hash_arquivo, futuro):
+    resultado, quebrado = _resultado(hash_arquivo, futuro)
+    if quebrado:
+        _descartar_pool()
+    with _pool_lock:
+        _em_andamento.discard(hash_arquivo)
+    try:
+        with app.app_context(), db.engine.begin() as conexao:
+            gravar_textos([resultado], conexao)
+    except Exception:
+        logger.exception('Erro ao gravar o texto do currículo %s', hash_arquivo)
+
+def _descartar_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def enfileirar_extracao(hash_arquivo, extensao):
+    """Agenda a extração de um currículo recém-armazenado, se o texto ainda não existe.
+
+    Chamar depois do commit: o resultado é gravado em outra transação, por outra thread.
+    """
+    global _pool
+    if not hash_arquivo or not app.config['EXTRACAO_AUTOMATICA'] or app.config.get('TESTING'):
+        return
+    if db.session.execute(select(TextoCurriculo.hash).where(TextoCurriculo.hash == hash_arquivo)).first():
+        return
+    with _pool_lock:
+        if hash_arquivo in _em_andamento:
+            return
+        for tentativa in range(2):
+            if _pool is None:
+                _pool = criar_pool(app.config['EXTRACAO_PROCESSOS'])
+            try:
+                futuro = _agendar(_pool, hash_arquivo, extensao)
+                break
+            except BrokenProcessPool:
+                _pool = None
+        else:
+            logger.error('Pool de extração indisponível; %s fica para o preenchimento', hash_arquivo)
+            return
+        _em_andamento.add(hash_arquivo)
+    futuro.add_done_callback(partial(_ao_concluir, hash_arquivo))
+
+# ===== PREENCHIMENTO DOS ARQUIVOS EXISTENTES =====
+
+def arquivos_pendentes(refazer=False):
+    """(hash, extensao) dos currículos em uso sem texto; com refazer, também os que falharam"""
+    sem_texto = TextoCurriculo.hash.is_(None)
+    return db.session.execute(
+        select(ArquivoCurriculo.hash, ArquivoCurriculo.extensao)
+        .outerjoin(TextoCurriculo, TextoCurriculo.hash == ArquivoCurriculo.hash)
+        .where(ArquivoCurriculo.referencias > 0,
+               or_(sem_texto, TextoCurriculo.status == 'erro') if refazer else sem_texto)
+        .order_by(ArquivoCurriculo.hash)
+    ).all()
+
+def executar_extracao(tarefa, refazer=False):
+    """Extrai em paralelo, com um processo por núcleo, o texto dos currículos pendentes"""
+    pendentes = arquivos_pendentes(refazer)
+    db.session.remove()
+    total = len(pendentes)
+    processos = os.cpu_count() or 1
+    contagem = Counter()
+    resultados = []
+    tarefa.atualizar(progresso=0, mensagem=f'{total} currículo(s) pendente(s), {processos} processo(s)')
+
+    def gravar():
+        with db.engine.begin() as conexao:
+            gravar_textos(resultados, conexao)
+        resultados.clear()
+        feitos = sum(contagem.values())
+        tarefa.atualizar(progresso=100 * feitos / max(total, 1), mensagem=f'Extraindo textos ({feitos}/{total})',
+                         **contagem)
+
+    fila = iter(pendentes)
+    em_execucao = {}  # futuro -> hash
+    pool = criar_pool(processos)
+    try:
+        while True:
+            # Janela limitada: a fila inteira não fica em memória no pool
+            while len(em_execucao) < processos * 2:
+                proximo = next(fila, None)
+                if proximo is None:
+                    break
+                em_execucao[_agendar(pool, *proximo)] = proximo.hash
+            if not em_execucao:
+                break
+            prontos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            quebrado = False
+            for futuro in prontos:
+                resultado, pool_quebrado = _resultado(em_execucao.pop(futuro), futuro)
+                quebrado = quebrado or pool_quebrado
+                contagem[resultado['status']] += 1
+                resultados.append(resultado)
+            if quebrado:
+                # Os demais em execução também falham; um novo pool segue com o restante da fila
+                for futuro, hash_arquivo in em_execucao.items():
+                    contagem['erro'] += 1
+                    resultados.append(_resultado_interrompido(hash_arquivo))
+                em_execucao.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = criar_pool(processos)
+            if len(resultados) >= LOTE_GRAVACAO:
+                gravar()
+        if resultados:
+            gravar()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    tarefa.atualizar(
+        mensagem=f"Extração concluída: {contagem['ok']} com texto, {contagem['vazio']} sem texto, "
+                 f"{contagem['erro']} com erro",
+        total=total, **contagem
+    )
+
+@app.cli.command('extrair-textos')
+@click.option('--refazer', is_flag=True, help='Tenta de novo os currículos que falharam')
+def extrair_textos_comando(refazer):
+    """Extrai o texto de todos os currículos armazenados que ainda não o têm"""
+    tarefa = executar_tarefa('extracao', executar_extracao, refazer=refazer)
+    if tarefa.status == 'executando':
+        raise click.ClickException(f'Já há uma extração em execução (tarefa {tarefa.id})')
+    print(tarefa.mensagem)
+    if tarefa.status == 'erro':
+        sys.exit(1)
@@ -0,0 +1,277 @@
+import codecs
+import csv
+import io
+import os
+import unicodedata
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import insert
+from app import app, db
+from models import Vaga, Candidato
+from indicadores import invalidar_kpis, STATUS_CANDIDATO
+from validacao import sanitize_input, validar_candidato
+from afinidade import indexar_candidatos, indexar_vagas
+from banco import em_lotes
+
+# Importação em lote de vagas e candidatos a partir de CSV. O arquivo é lido em
+# fluxo, validado com as regras da inscrição e gravado em transações de
+# IMPORTACAO_LOTE linhas (um executemany por lote). Duplicidade (email, vaga)
+# é verificada por lote, com cláusulas IN de até LIMITE_IN emails (banco.py) no
+# índice ix_candidatos_email_vaga.
+
+STATUS_VAGA = ['ativa', 'inativa', 'encerrada']
+
+FORMATOS_DATA = ['%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d']
+
+def _normalizar_coluna(nome):
+    nome = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode()
+    return nome.strip().lower().replace(' ', '_')
+
+def _detectar_codificacao(caminho):
+    """UTF-8 quando o início do arquivo decodifica; senão o padrão do Excel no Windows"""
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    with open(caminho, 'rb') as arquivo:
+        try:
+            decodificador.decode(arquivo.read(1024 * 1024))
+            return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'cp1252'
+
+class LeitorCsv:
+    """DictReader com colunas normalizadas, separador detectado e progresso pelo bytes lidos"""
+
+    def __init__(self, caminho):
+        self.tamanho = os.path.getsize(caminho) or 1
+        self.bruto = open(caminho, 'rb')
+        self.texto = io.TextIOWrapper(self.bruto, encoding=_detectar_codificacao(caminho),
+                                      errors='replace', newline='')
+        primeira = self.texto.readline()
+        separador = ';' if primeira.count(';') > primeira.count(',') else ','
+        self.colunas = [_normalizar_coluna(nome) for nome in next(csv.reader([primeira], delimiter=separador), [])]
+        self.leitor = csv.DictReader(self.texto, fieldnames=self.colunas, delimiter=separador)
+
+    def __iter__(self):
+        # Número da linha no arquivo (o cabeçalho é a linha 1)
+        for registro in self.leitor:
+            yield self.leitor.line_num + 1, registro
+
+    @property
+    def progresso(self):
+        return self.bruto.tell() * 100 / self.tamanho
+
+    def exigir(self, *colunas):
+        faltando = [coluna for coluna in colunas if coluna not in self.colunas]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.texto.close()
+
+def caminho_relatorio(tarefa_id):
+    return os.path.join(app.config['TAREFAS_PASTA'], f'importacao_{os.path.basename(tarefa_id)}_erros.csv')
+
+class RelatorioErros:
+    """CSV com as linhas rejeitadas, criado só se houver erro"""
+
+    def __init__(self, tarefa):
+        self.caminho = caminho_relatorio(tarefa.id)
+        self.arquivo = None
+        self.total = 0
+
+    def registrar(self, linha, motivo):
+        if self.arquivo is None:
+            self.arquivo = open(self.caminho, 'w', encoding='utf-8-sig', newline='')
+            self.escritor = csv.writer(self.arquivo, delimiter=';')
+            self.escritor.writerow(['Linha', 'Motivo'])
+        self.escritor.writerow([linha, motivo])
+        self.total += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        if self.arquivo is not None:
+            self.arquivo.close()
+
+@lru_cache(maxsize=4096)  # planilhas repetem muito as mesmas datas
+def _data(valor):
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            continue
+    return None
+
+def _mapa_vagas():
+    """Vagas por id, link de inscrição e título (só títulos sem repetição)"""
+    mapa = {}
+    titulos = {}
+    for id, link, titulo in db.session.query(Vaga.id, Vaga.link_inscricao, Vaga.titulo):
+        mapa[str(id)] = id
+        if link:
+            mapa[link.lower()] = id
+        chave = (titulo or '').strip().lower()
+        titulos[chave] = None if chave in titulos else id
+    for titulo, id in titulos.items():
+        if id is not None:
+            mapa.setdefault(titulo, id)
+    return mapa
+
+def _registro_candidato(campos, vaga_padrao, vagas, agora):
+    """Dicionário pronto para o insert, ou (None, motivo)"""
+    nome = sanitize_input(campos.get('nome'))
+    email = sanitize_input(campos.get('email'))
+    erro = validar_candidato(nome, email)
+    if erro:
+        return None, erro
+
+    vaga_id = vaga_padrao
+    referencia = sanitize_input(campos.get('vaga')).lower()
+    if referencia:
+        vaga_id = vagas.get(referencia)
+        if vaga_id is None:
+            return None, f'Vaga não encontrada: {referencia}'
+
+    status = sanitize_input(campos.get('status')).lower() or 'pendente'
+    if status not in STATUS_CANDIDATO:
+        return None, f'Status inválido: {status}'
+
+    data_candidatura = agora
+    if campos.get('data_candidatura'):
+        data_candidatura = _data(campos['data_candidatura'].strip())
+        if data_candidatura is None:
+            return None, 'Data de candidatura inválida.'
+
+    return {
+        'nome': nome,
+        'email': email,
+        'telefone': sanitize_input(campos.get('telefone')),
+        'linkedin': sanitize_input(campos.get('linkedin')),
+        'expectativa_salario': sanitize_input(campos.get('expectativa_salario')),
+        'vaga_id': vaga_id,
+        'status': status,
+        'observacoes': sanitize_input(campos.get('observacoes')),
+        'data_candidatura': data_candidatura,
+        'data_atualizacao': agora
+    }, None
+
+def _gravar_candidatos(pendentes, relatorio, totais):
+    """Um lote: uma consulta de duplicidade, um executemany e um commit"""
+    existentes = set()
+    for emails in em_lotes({registro['email'] for _, registro in pendentes}):
+        existentes.update(db.session.query(Candidato.email, Candidato.vaga_id).filter(Candidato.email.in_(emails)))
+    novos = []
+    for linha, registro in pendentes:
+        chave = (registro['email'], registro['vaga_id'])
+        if chave in existentes:
+            relatorio.registrar(linha, 'Candidato já cadastrado nesta vaga.')
+            totais['duplicados'] += 1
+            continue
+        existentes.add(chave)
+        novos.append(registro)
+    if novos:
+        ids = db.session.execute(insert(Candidato.__table__).returning(Candidato.__table__.c.id), novos).scalars().all()
+        indexar_candidatos(ids)
+    db.session.commit()
+    totais['importados'] += len(novos)
+
+def _atualizar(tarefa, leitor, totais, relatorio):
+    tarefa.atualizar(
+        leitor.progresso,
+        f"{totais['importados']} importados, {totais['duplicados']} duplicados, {totais['erros']} com erro",
+        relatorio=relatorio.total > 0, **totais
+    )
+
+def importar_candidatos(tarefa, caminho, vaga_id=None):
+    lote = app.config['IMPORTACAO_LOTE']
+    totais = {'importados': 0, 'duplicados': 0, 'erros': 0}
+    try:
+        vagas = _mapa_vagas()
+        agora = datetime.utcnow()
+        with LeitorCsv(caminho) as leitor, RelatorioErros(tarefa) as relatorio:
+            leitor.exigir('nome', 'email')
+            pendentes = []
+            for linha, campos in leitor:
+                registro, erro = _registro_candidato(campos, vaga_id, vagas, agora)
+                if erro:
+                    relatorio.registrar(linha, erro)
+                    totais['erros'] += 1
+                    continue
+                pendentes.append((linha, registro))
+                if len(pendentes) >= lote:
+                    _gravar_candidatos(pendentes, relatorio, totais)
+                    pendentes = []
+                    _atualizar(tarefa, leitor, totais, relatorio)
+            if pendentes:
+                _gravar_candidatos(pendentes, relatorio, totais)
+            _atualizar(tarefa, leitor, totais, relatorio)
+    finally:
+        os.remove(caminho)
+        invalidar_kpis()
+
+def _gravar_vagas(novas):
+    ids = db.session.execute(insert(Vaga.__table__).returning(Vaga.__table__.c.id), novas).scalars().all()
+    indexar_vagas(ids)
+    db.session.commit()
+
+def importar_vagas(tarefa, caminho):
+    lote = app.config['IMPORTACAO_LOTE']
+    totais = {'importados': 0, 'duplicados': 0, 'erros': 0}
+    try:
+        links = {link for link, in db.session.query(Vaga.link_inscricao) if link}
+        agora = datetime.utcnow()
+        with LeitorCsv(caminho) as leitor, RelatorioErros(tarefa) as relatorio:
+            leitor.exigir('titulo', 'descricao')
+            novas = []
+            for linha, campos in leitor:
+                titulo = sanitize_input(campos.get('titulo'))
+                descricao = sanitize_input(campos.get('descricao'))
+                status = sanitize_input(campos.get('status')).lower() or 'ativa'
+                if not titulo or not descricao:
+                    erro = 'Título e descrição são obrigatórios.'
+                elif status not in STATUS_VAGA:
+                    erro = f'Status inválido: {status}'
+                else:
+                    erro = None
+                if erro:
+                    relatorio.registrar(linha, erro)
+                    totais['erros'] += 1
+                    continue
+
+                # Mesmo formato de link do cadastro manual, sem colisão com os existentes
+                link = str(uuid.uuid4())[:8]
+                while link in links:
+                    link = str(uuid.uuid4())[:8]
+                links.add(link)
+
+                novas.append({
+                    'titulo': titulo,
+                    'descricao': descricao,
+                    'requisitos': sanitize_input(campos.get('requisitos')),
+                    'localizacao': sanitize_input(campos.get('localizacao')),
+                    'status': status,
+                    'link_inscricao': link,
+                    'data_criacao': agora,
+                    'data_atualizacao': agora
+                })
+                if len(novas) >= lote:
+                    _gravar_vagas(novas)
+                    totais['importados'] += len(novas)
+                    novas = []
+                    _atualizar(tarefa, leitor, totais, relatorio)
+            if novas:
+                _gravar_vagas(novas)
+                totais['importados'] += len(novas)
+            _atualizar(tarefa, leitor, totais, relatorio)
+    finally:
+        os.remove(caminho)
+        invalidar_kpis()
+
+IMPORTADORES = {
+    'candidatos': importar_candidatos,
+    'vagas': importar_vagas
+}
@@ -0,0 +1,99 @@
+import threading
+import time
+from sqlalchemy import func, text
+from app import app, db
+from models import Vaga, ContagemStatus, recalcular_contagem_candidatos
+
+# Cache em memória dos indicadores do dashboard (por worker)
+_cache = {'valor': None, 'expira': 0.0, 'geracao': 0}
+_lock = threading.Lock()
+
+STATUS_CANDIDATO = ['pendente', 'em_analise', 'aprovado', 'reprovado', 'banco_talentos']
+
+def _contar_por_status(coluna_status, coluna_id):
+    linhas = db.session.query(coluna_status, func.count(coluna_id)).group_by(coluna_status).all()
+    return {status: total for status, total in linhas}
+
+def calcular_kpis():
+    """Calcula os indicadores com um GROUP BY status por tabela"""
+    vagas = _contar_por_status(Vaga.status, Vaga.id)
+    candidatos = contagem_por_status()
+
+    return {
+        'total_vagas': sum(vagas.values()),
+        'vagas_ativas': vagas.get('ativa', 0),
+        'total_candidatos': sum(candidatos.values()),
+        'candidatos_pendentes': candidatos.get('pendente', 0),
+        'banco_talentos': candidatos.get('banco_talentos', 0)
+    }
+
+def obter_kpis():
+    """Retorna os indicadores do cache, recalculando quando o TTL expira"""
+    agora = time.monotonic()
+    with _lock:
+        if _cache['valor'] is not None and agora < _cache['expira']:
+            return _cache['valor']
+        geracao = _cache['geracao']
+
+    valor = calcular_kpis()
+
+    with _lock:
+        # Não grava se houve invalidação durante o cálculo
+        if _cache['geracao'] == geracao:
+            _cache['valor'] = valor
+            _cache['expira'] = agora + app.config['KPI_CACHE_TTL']
+    return valor
+
+def invalidar_kpis():
+    """Descarta os indicadores em cache após alterações em vagas ou candidatos"""
+    with _lock:
+        _cache['valor'] = None
+        _cache['expira'] = 0.0
+        _cache['geracao'] += 1
+
+def contagem_por_status(vaga_id=None):
+    """Totais de candidatos por status lidos do histograma materializado (status_counts)"""
+    query = db.session.query(ContagemStatus.status, func.sum(ContagemStatus.total))
+    if vaga_id is not None:
+        query = query.filter(ContagemStatus.vaga_id == vaga_id)
+    contagem = dict.fromkeys(STATUS_CANDIDATO, 0)
+    for status, total in query.group_by(ContagemStatus.status).all():
+        if total:
+            contagem[status] = total
+    return contagem
+
+def recalcular_contagens():
+    """Reconstrói status_counts e vagas.candidatos_count e retorna as divergências encontradas"""
+    conexao = db.session.connection()
+    # UPDATE sem efeito só para pegar o lock de escrita antes de ler:
+    # nenhuma inscrição entra entre a contagem e a regravação
+    conexao.execute(text("UPDATE status_counts SET total = total WHERE 0"))
+
+    atual = {(v, s): t for v, s, t in conexao.execute(text(
+        "SELECT vaga_id, status, total FROM status_counts")).all()}
+    real = {(v, s): t for v, s, t in conexao.execute(text(
+        "SELECT coalesce(vaga_id, 0), coalesce(status, ''), count(*) FROM candidatos GROUP BY 1, 2")).all()}
+
+    divergencias = [
+        {'vaga_id': v, 'status': s, 'registrado': atual.get((v, s), 0), 'real': real.get((v, s), 0)}
+        for v, s in sorted(set(atual) | set(real))
+        if atual.get((v, s), 0) != real.get((v, s), 0)
+    ]
+    divergencias += [
+        {'vaga_id': v, 'status': '(total da vaga)', 'registrado': registrado, 'real': contado}
+        for v, registrado, contado in conexao.execute(text(
+            "SELECT id, candidatos_count, (SELECT count(*) FROM candidatos WHERE vaga_id = vagas.id) "
+            "FROM vagas")).all()
+        if registrado != contado
+    ]
+
+    conexao.execute(text("DELETE FROM status_counts"))
+    if real:
+        conexao.execute(
+            ContagemStatus.__table__.insert(),
+            [{'vaga_id': v, 'status': s, 'total': t} for (v, s), t in real.items()]
+        )
+    recalcular_contagem_candidatos(conexao)
+    db.session.commit()
+    invalidar_kpis()
+    return divergencias
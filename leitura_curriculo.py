@@ -0,0 +1,259 @@
+import re
+import resource
+import signal
+import time
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+# Extração de texto puro de currículos PDF, DOCX e DOC, só com a biblioteca padrão
+# e sem acesso à rede. Roda nos processos do pool de extracao.py: este módulo não
+# importa o app, então os processos filhos sobem rápido e sem abrir o banco.
+
+TAMANHO_MAX_ARQUIVO = 16 * 1024 * 1024  # o mesmo MAX_CONTENT_LENGTH do upload
+TAMANHO_MAX_DESCOMPACTADO = 64 * 1024 * 1024  # contra PDFs e DOCX "bomba"
+
+class TempoEsgotado(Exception):
+    pass
+
+class ArquivoInvalido(Exception):
+    pass
+
+def comprimir_texto(texto):
+    return zlib.compress(texto.encode('utf-8'), 6)
+
+def descomprimir_texto(dados):
+    return zlib.decompress(dados).decode('utf-8') if dados else ''
+
+def _espacos(texto):
+    texto = re.sub(r'[ \t\f\v]+', ' ', texto)
+    return re.sub(r'\s*\n\s*', '\n', texto).strip()
+
+# ===== PDF =====
+
+# Dicionários de streams que nunca têm texto da página
+STREAMS_SEM_TEXTO = (b'/Image', b'/ObjStm', b'/XRef', b'/FontFile', b'/Length1', b'/Metadata',
+                     b'/EmbeddedFile', b'/ICCBased', b'/Type1C', b'/CIDFontType0C', b'/OpenType')
+INICIO_STREAM = re.compile(rb'stream\r?\n')
+OPERADORES_TEXTO = {b'Tj', b'TJ', b"'", b'"'}
+OPERADORES_LINHA = {b'Td', b'TD', b'T*', b"'", b'"', b'ET'}
+ESCAPES = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f'}
+
+def _streams_pdf(dados):
+    """Conteúdo (já descompactado) de cada stream que pode conter texto"""
+    restante = TAMANHO_MAX_DESCOMPACTADO
+    for encontrado in INICIO_STREAM.finditer(dados):
+        inicio = encontrado.end()
+        fim = dados.find(b'endstream', inicio)
+        if fim < 0:
+            break
+        dicionario = dados[max(0, encontrado.start() - 512):encontrado.start()]
+        dicionario = dicionario[dicionario.rfind(b'obj') + 1:]
+        if any(marca in dicionario for marca in STREAMS_SEM_TEXTO):
+            continue
+        bruto = dados[inicio:fim]
+        if b'/FlateDecode' in dicionario:
+            try:
+                descompactador = zlib.decompressobj()
+                bruto = descompactador.decompress(bruto, restante)
+            except zlib.error:
+                continue
+        elif b'/Filter' in dicionario:
+            continue  # outros filtros (DCT, LZW, ...) não trazem texto legível
+        restante -= len(bruto)
+        if restante <= 0:
+            raise ArquivoInvalido('Conteúdo descompactado acima do limite')
+        if b'BT' in bruto:
+            yield bruto
+
+def _string_literal(dados, i):
+    """Lê uma string (...) a partir de dados[i] == '('; retorna (bytes, próxima posição)"""
+    saida = bytearray()
+    nivel = 1
+    i += 1
+    tamanho = len(dados)
+    while i < tamanho:
+        c = dados[i]
+        if c == 0x5C:  # barra invertida
+            i += 1
+            if i >= tamanho:
+                break
+            c = dados[i]
+            if c in ESCAPES:
+                saida += ESCAPES[c]
+            elif 0x30 <= c <= 0x37:  # octal \ddd
+                fim = i
+                while fim < min(i + 3, tamanho) and 0x30 <= dados[fim] <= 0x37:
+                    fim += 1
+                saida.append(int(dados[i:fim], 8) & 0xFF)
+                i = fim - 1
+            elif c not in (0x0A, 0x0D):
+                saida.append(c)
+        elif c == 0x28:
+            nivel += 1
+            saida.append(c)
+        elif c == 0x29:
+            nivel -= 1
+            if nivel == 0:
+                return bytes(saida), i + 1
+            saida.append(c)
+        else:
+            saida.append(c)
+        i += 1
+    return bytes(saida), i
+
+def _decodificar_pdf(trecho):
+    if trecho.startswith(b'\xfe\xff'):
+        return trecho[2:].decode('utf-16-be', 'ignore')
+    return trecho.decode('latin-1')
+
+def _texto_conteudo(dados):
+    """Texto dos operadores Tj, TJ, ' e " de um content stream"""
+    partes = []
+    pendentes = []
+    i = 0
+    tamanho = len(dados)
+    while i < tamanho:
+        c = dados[i]
+        if c == 0x28:
+            trecho, i = _string_literal(dados, i)
+            pendentes.append(_decodificar_pdf(trecho))
+            continue
+        if c == 0x3C and dados[i + 1:i + 2] != b'<':  # <hex>
+            fim = dados.find(b'>', i)
+            if fim < 0:
+                break
+            hexa = re.sub(rb'\s', b'', dados[i + 1:fim])
+            try:
+                pendentes.append(_decodificar_pdf(bytes.fromhex((hexa + b'0' * (len(hexa) % 2)).decode())))
+            except ValueError:
+                pass
+            i = fim + 1
+            continue
+        if c == 0x25:  # comentário
+            fim = dados.find(b'\n', i)
+            i = tamanho if fim < 0 else fim + 1
+            continue
+        if c in b'-+.0123456789':
+            fim = i + 1
+            while fim < tamanho and dados[fim] in b'.0123456789':
+                fim += 1
+            try:
+                # Deslocamento grande dentro de um TJ costuma separar palavras
+                if pendentes and float(dados[i:fim]) < -200:
+                    pendentes.append(' ')
+            except ValueError:
+                pass
+            i = fim
+            continue
+        if (0x41 <= c <= 0x5A) or (0x61 <= c <= 0x7A) or c in (0x27, 0x22, 0x2A):
+            fim = i + 1
+            while fim < tamanho and ((0x41 <= dados[fim] <= 0x5A) or (0x61 <= dados[fim] <= 0x7A) or dados[fim] == 0x2A):
+                fim += 1
+            operador = dados[i:fim] if c not in (0x27, 0x22) else dados[i:i + 1]
+            if operador in OPERADORES_TEXTO:
+                partes.append(''.join(pendentes))
+            if operador in OPERADORES_LINHA:
+                partes.append('\n')
+            pendentes = []
+            i = fim if c not in (0x27, 0x22) else i + 1
+            continue
+        i += 1
+    return ''.join(partes)
+
+def texto_pdf(dados):
+    if not dados.startswith(b'%PDF'):
+        raise ArquivoInvalido('Não é um PDF')
+    texto = '\n'.join(_texto_conteudo(stream) for stream in _streams_pdf(dados))
+    # Fontes com codificação própria (CID) viram lixo binário: fica só o que é legível
+    return ''.join(caractere for caractere in texto if caractere.isprintable() or caractere == '\n')
+
+# ===== DOCX =====
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+def texto_docx(caminho):
+    try:
+        pacote = zipfile.ZipFile(caminho)
+    except zipfile.BadZipFile as erro:
+        raise ArquivoInvalido('DOCX inválido') from erro
+    with pacote:
+        try:
+            info = pacote.getinfo('word/document.xml')
+        except KeyError as erro:
+            raise ArquivoInvalido('DOCX sem word/document.xml') from erro
+        if info.file_size > TAMANHO_MAX_DESCOMPACTADO:
+            raise ArquivoInvalido('Conteúdo descompactado acima do limite')
+        partes = []
+        with pacote.open(info) as documento:
+            for evento, elemento in ElementTree.iterparse(documento, events=('end',)):
+                if elemento.tag == W + 't' and elemento.text:
+                    partes.append(elemento.text)
+                elif elemento.tag == W + 'tab':
+                    partes.append('\t')
+                elif elemento.tag in (W + 'p', W + 'br'):
+                    partes.append('\n')
+                    if elemento.tag == W + 'p':
+                        elemento.clear()
+        return ''.join(partes)
+
+# ===== DOC (Word 97-2003) =====
+
+# Sem ler a tabela de peças do formato binário: o texto do corpo fica no stream
+# WordDocument em trechos UTF-16LE ou cp1252, que são recuperados por padrão de bytes.
+TRECHO_UTF16 = re.compile(rb'(?:[\x20-\x7e\xa0-\xff\r\t]\x00){4,}')
+TRECHO_CP1252 = re.compile(rb'[\x20-\x7e\xa0-\xff\r\t]{8,}')
+
+def texto_doc(dados):
+    if not dados.startswith(b'\xd0\xcf\x11\xe0'):
+        raise ArquivoInvalido('Não é um DOC')
+    trechos = [trecho.decode('utf-16-le') for trecho in TRECHO_UTF16.findall(dados)]
+    if sum(map(len, trechos)) < 200:
+        trechos += [trecho.decode('cp1252', 'ignore') for trecho in TRECHO_CP1252.findall(dados)]
+    return '\n'.join(trecho.replace('\r', '\n') for trecho in trechos)
+
+# ===== EXECUÇÃO NO POOL =====
+
+def limitar_memoria(megabytes):
+    """Initializer do pool: teto de memória virtual de cada processo extrator"""
+    if megabytes:
+        limite = megabytes * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+def _alarme(sinal, quadro):
+    raise TempoEsgotado()
+
+def extrair_texto(caminho, extensao):
+    if extensao == 'docx':
+        return texto_docx(caminho)
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read(TAMANHO_MAX_ARQUIVO + 1)
+    if len(dados) > TAMANHO_MAX_ARQUIVO:
+        raise ArquivoInvalido('Arquivo acima do tamanho máximo')
+    if extensao == 'pdf':
+        return texto_pdf(dados)
+    if extensao == 'doc':
+        return texto_doc(dados)
+    raise ArquivoInvalido(f'Extensão não suportada: {extensao}')
+
+def extrair_limitado(hash_arquivo, caminho, extensao, tempo_max, max_caracteres):
+    """Executado no processo do pool. Nunca levanta exceção: o erro vai no resultado."""
+    inicio = time.monotonic()
+    resultado = {'hash': hash_arquivo, 'status': 'erro', 'texto': None, 'caracteres': 0, 'erro': None}
+    signal.signal(signal.SIGALRM, _alarme)
+    signal.alarm(tempo_max)
+    try:
+        texto = _espacos(extrair_texto(caminho, extensao))[:max_caracteres]
+        resultado.update(status='ok' if texto else 'vazio', texto=comprimir_texto(texto), caracteres=len(texto))
+    except TempoEsgotado:
+        resultado['erro'] = f'Tempo limite de {tempo_max}s excedido'
+    except MemoryError:
+        resultado['erro'] = 'Limite de memória excedido'
+    except (ArquivoInvalido, OSError, ElementTree.ParseError, zipfile.BadZipFile) as erro:
+        resultado['erro'] = str(erro)[:500]
+    except Exception as erro:
+        resultado['erro'] = f'{type(erro).__name__}: {erro}'[:500]
+    finally:
+        signal.alarm(0)
+    resultado['duracao_ms'] = int((time.monotonic() - inicio) * 1000)
+    return resultado
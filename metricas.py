@@ -0,0 +1,238 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import (g, has_request_context, request, session, request_started, request_finished,
+                   before_render_template, template_rendered)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app
+
+logger = logging.getLogger(__name__)
+
+# Instrumentação das requisições: consultas e tempo de SQL (eventos do cursor),
+# renderização de templates e latência total (sinais do Flask), mais operações
+# medidas com medir() (SMTP, gravação de arquivos). As requisições de usuários logados
+# recebem um header Server-Timing (o público não vê os tempos internos); os agregados
+# vão para /manutencao/metrics em formato Prometheus.
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICAS = {
+    'budel_requisicao_segundos': ('histogram', 'Latência total da requisição', BUCKETS_SEGUNDOS),
+    'budel_sql_segundos': ('histogram', 'Tempo em SQL por requisição', BUCKETS_SEGUNDOS),
+    'budel_consultas_por_requisicao': ('histogram', 'Consultas SQL por requisição', BUCKETS_CONSULTAS),
+    'budel_template_segundos': ('histogram', 'Tempo de renderização de templates por requisição', BUCKETS_SEGUNDOS),
+    'budel_operacao_segundos': ('histogram', 'Duração de operações medidas (smtp, arquivo)', BUCKETS_SEGUNDOS),
+    'budel_consultas_lentas_total': ('counter', 'Consultas acima de METRICAS_CONSULTA_LENTA_MS', None),
+    'budel_cache_templates_total': ('counter', 'Acertos e faltas do cache de templates (bytecode e fragmentos)', None),
+}
+
+_valores = {}  # (nome, rótulos) -> [contagens por bucket (+Inf no fim), soma] ou [total]
+_lock = threading.Lock()
+_ultimo_snapshot = [0.0]
+
+def observar(nome, valor, **rotulos):
+    """Registra um valor em um histograma de METRICAS"""
+    limites = METRICAS[nome][2]
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _lock:
+        serie = _valores.get(chave)
+        if serie is None:
+            serie = _valores[chave] = [[0] * (len(limites) + 1), 0.0]
+        serie[0][bisect_left(limites, valor)] += 1
+        serie[1] += valor
+
+def incrementar(nome, valor=1, **rotulos):
+    """Soma `valor` a um contador de METRICAS"""
+    chave = (nome, tuple(sorted(rotulos.items())))
+    with _lock:
+        serie = _valores.setdefault(chave, [0])
+        serie[0] += valor
+
+@contextmanager
+def medir(operacao):
+    """Mede um trecho (ex.: envio SMTP); dentro de uma requisição também entra no Server-Timing"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        observar('budel_operacao_segundos', duracao, operacao=operacao)
+        if has_request_context() and 'metricas' in g:
+            operacoes = g.metricas['operacoes']
+            operacoes[operacao] = operacoes.get(operacao, 0.0) + duracao
+
+# ===== SQL =====
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    conexao.info['metricas_inicio'] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    duracao = time.perf_counter() - conexao.info.pop('metricas_inicio', time.perf_counter())
+    endpoint = None
+    if has_request_context():
+        endpoint = request.endpoint
+        if 'metricas' in g:
+            g.metricas['consultas'] += 1
+            g.metricas['sql'] += duracao
+    limite = app.config['METRICAS_CONSULTA_LENTA_MS']
+    if limite and duracao * 1000 >= limite:
+        origem = endpoint or threading.current_thread().name
+        incrementar('budel_consultas_lentas_total', origem=origem)
+        # Só o SQL com os placeholders: os parâmetros podem conter dados pessoais
+        logger.warning('Consulta lenta (%.1f ms) em %s: %s', duracao * 1000, origem, ' '.join(sql.split())[:2000])
+
+# ===== REQUISIÇÕES E TEMPLATES =====
+
+def _iniciar(sender, **extra):
+    g.metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'sql': 0.0, 'template': 0.0,
+                  'template_inicio': None, 'operacoes': {}}
+
+def _antes_template(sender, template, context, **extra):
+    if 'metricas' in g:
+        g.metricas['template_inicio'] = time.perf_counter()
+
+def _depois_template(sender, template, context, **extra):
+    if 'metricas' in g and g.metricas['template_inicio'] is not None:
+        g.metricas['template'] += time.perf_counter() - g.metricas['template_inicio']
+        g.metricas['template_inicio'] = None
+
+def _finalizar(sender, response, **extra):
+    """Fecha as medidas da requisição. Respostas em fluxo contam só até o início do envio."""
+    metricas = g.pop('metricas', None)
+    if metricas is None:
+        return
+    total = time.perf_counter() - metricas['inicio']
+    endpoint = request.endpoint or 'desconhecido'
+    observar('budel_requisicao_segundos', total, endpoint=endpoint, metodo=request.method,
+             status=str(response.status_code))
+    observar('budel_sql_segundos', metricas['sql'], endpoint=endpoint)
+    observar('budel_consultas_por_requisicao', metricas['consultas'], endpoint=endpoint)
+    if metricas['template']:
+        observar('budel_template_segundos', metricas['template'], endpoint=endpoint)
+
+    if app.config['METRICAS_SERVER_TIMING'] and 'usuario_id' in session:
+        partes = [f'sql;dur={metricas["sql"] * 1000:.2f};desc="{metricas["consultas"]} consultas"']
+        if metricas['template']:
+            partes.append(f'template;dur={metricas["template"] * 1000:.2f}')
+        for operacao, duracao in metricas['operacoes'].items():
+            partes.append(f'{operacao};dur={duracao * 1000:.2f}')
+        partes.append(f'total;dur={total * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(partes)
+
+    if time.monotonic() - _ultimo_snapshot[0] >= app.config['METRICAS_INTERVALO']:
+        try:
+            gravar_snapshot()
+        except OSError:
+            logger.exception('Erro ao gravar o snapshot de métricas')
+
+request_started.connect(_iniciar, app)
+request_finished.connect(_finalizar, app)
+before_render_template.connect(_antes_template, app)
+template_rendered.connect(_depois_template, app)
+
+# ===== AGREGAÇÃO ENTRE WORKERS =====
+# Cada worker grava periodicamente seus valores em METRICAS_PASTA/<pid>.json;
+# o endpoint soma os arquivos dos processos vivos. Um worker reiniciado zera a
+# sua parte, o que o Prometheus trata como reinício de contador.
+
+def _pasta():
+    pasta = app.config['METRICAS_PASTA']
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+def _exportar():
+    with _lock:
+        return [[nome, list(rotulos), copy.deepcopy(serie)] for (nome, rotulos), serie in _valores.items()]
+
+def gravar_snapshot():
+    _ultimo_snapshot[0] = time.monotonic()
+    caminho = os.path.join(_pasta(), f'{os.getpid()}.json')
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(_exportar(), arquivo)
+    os.replace(temporario, caminho)
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _somar(total, series):
+    for nome, rotulos, serie in series:
+        if nome not in METRICAS:
+            continue  # snapshot de uma versão anterior
+        chave = (nome, tuple(tuple(par) for par in rotulos))
+        atual = total.get(chave)
+        if atual is None:
+            total[chave] = serie
+        elif METRICAS[nome][0] == 'histogram':
+            atual[0] = [a + b for a, b in zip(atual[0], serie[0])]
+            atual[1] += serie[1]
+        else:
+            atual[0] += serie[0]
+
+def valores_agregados():
+    """Valores deste processo somados aos snapshots dos demais workers vivos"""
+    total = {}
+    _somar(total, _exportar())
+    pasta = _pasta()
+    for nome in os.listdir(pasta):
+        pid = nome[:-5]
+        if not nome.endswith('.json') or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        caminho = os.path.join(pasta, nome)
+        if not _processo_vivo(int(pid)):
+            os.remove(caminho)
+            continue
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                _somar(total, json.load(arquivo))
+        except (OSError, ValueError):
+            continue  # arquivo sendo substituído; entra na próxima coleta
+    return total
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + '}'
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def gerar_texto_prometheus():
+    """Formato de exposição em texto do Prometheus (version=0.0.4)"""
+    por_metrica = {}
+    for (nome, rotulos), serie in valores_agregados().items():
+        por_metrica.setdefault(nome, []).append((rotulos, serie))
+
+    linhas = []
+    for nome, (tipo, ajuda, limites) in METRICAS.items():
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        for rotulos, serie in sorted(por_metrica.get(nome, [])):
+            if tipo == 'counter':
+                linhas.append(f'{nome}{_rotulos(rotulos)} {_numero(serie[0])}')
+                continue
+            acumulado = 0
+            for limite, contagem in zip(list(limites) + ['+Inf'], serie[0]):
+                acumulado += contagem
+                linhas.append(f'{nome}_bucket{_rotulos(rotulos + (("le", limite),))} {acumulado}')
+            linhas.append(f'{nome}_sum{_rotulos(rotulos)} {_numero(serie[1])}')
+            linhas.append(f'{nome}_count{_rotulos(rotulos)} {acumulado}')
+    return '\n'.join(linhas) + '\n'
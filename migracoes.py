@@ -0,0 +1,326 @@
+import click
+import html
+import logging
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event, MetaData
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import OperationalError
+from app import app, db
+from models import (Usuario, Vaga, Candidato, ArquivoCurriculo, VagaArquivada, CandidatoArquivado,
+                    criar_contagem_candidatos, recalcular_contagem_candidatos, criar_contagem_status)
+from busca import criar_indice_busca, criar_indice_busca_arquivo, reconstruir_indice_busca
+from auditoria import criar_protecao_auditoria
+from afinidade import criar_afinidade, reconstruir_afinidade
+from extracao import criar_limpeza_textos
+from banco import erro_de_bloqueio
+from cache_paginas import invalidar_pagina, chave_inscricao
+
+logger = logging.getLogger(__name__)
+
+# Migrações versionadas aplicadas na inicialização de cada worker. Cada passo roda
+# em uma transação com o lock de escrita do SQLite, então só um worker o executa;
+# os demais esperam e encontram a versão já gravada em schema_versao.
+# Todos os passos são idempotentes: também servem para bancos criados por create_all.
+
+def adicionar_coluna(conexao, tabela, definicao):
+    """ALTER TABLE ADD COLUMN se a coluna ainda não existe; retorna se foi adicionada"""
+    coluna = definicao.split()[0]
+    if coluna in {linha[1] for linha in conexao.exec_driver_sql(f'PRAGMA table_info({tabela})')}:
+        return False
+    conexao.exec_driver_sql(f'ALTER TABLE {tabela} ADD COLUMN {definicao}')
+    logger.info('Coluna %s.%s adicionada', tabela, coluna)
+    return True
+
+def criar_indices(conexao):
+    """Cria os índices declarados nos modelos que ainda não existem"""
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=conexao, checkfirst=True)
+
+def _criar_tabelas(conexao):
+    db.metadata.create_all(bind=conexao)
+
+def _curriculos_por_conteudo(conexao):
+    """Currículo armazenado por hash: tabela arquivos e colunas do candidato"""
+    ArquivoCurriculo.__table__.create(bind=conexao, checkfirst=True)
+    adicionar_coluna(conexao, 'candidatos', 'arquivo_hash VARCHAR(64)')
+    adicionar_coluna(conexao, 'candidatos', 'arquivo_tamanho INTEGER')
+    adicionar_coluna(conexao, 'candidatos', 'arquivo_mime VARCHAR(100)')
+    conexao.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_candidatos_arquivo_hash ON candidatos (arquivo_hash)')
+
+def _atualizacao_vagas(conexao):
+    """vagas.data_atualizacao (Last-Modified/ETag da API), preenchida com a data de criação"""
+    adicionar_coluna(conexao, 'vagas', 'data_atualizacao DATETIME')
+    conexao.exec_driver_sql('UPDATE vagas SET data_atualizacao = data_criacao WHERE data_atualizacao IS NULL')
+    conexao.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_vagas_data_atualizacao ON vagas (data_atualizacao)')
+
+def _colunas_novas(conexao):
+    _curriculos_por_conteudo(conexao)
+    _atualizacao_vagas(conexao)
+
+def _contadores(conexao):
+    # Contador de candidatos por vaga: coluna, triggers e recontagem (bancos anteriores a ele)
+    adicionar_coluna(conexao, 'vagas', 'candidatos_count INTEGER NOT NULL DEFAULT 0')
+    criar_contagem_candidatos(conexao)
+    criar_contagem_status(conexao)
+    conexao.exec_driver_sql('DELETE FROM status_counts')
+    conexao.exec_driver_sql(
+        "INSERT INTO status_counts (vaga_id, status, total) "
+        "SELECT coalesce(vaga_id, 0), coalesce(status, ''), count(*) FROM candidatos GROUP BY 1, 2"
+    )
+    recalcular_contagem_candidatos(conexao)
+
+def _indice_busca(conexao):
+    criar_indice_busca(conexao)
+    reconstruir_indice_busca(conexao)
+
+def _afinidade(conexao):
+    _criar_tabelas(conexao)
+    criar_afinidade(conexao)
+    reconstruir_afinidade(conexao)
+
+def _textos_curriculos(conexao):
+    _criar_tabelas(conexao)
+    criar_limpeza_textos(conexao)
+
+def _arquivo(conexao):
+    _criar_tabelas(conexao)
+    criar_indice_busca_arquivo(conexao)
+
+def recriar_com_autoincremento(conexao, tabela):
+    """Recria a tabela com AUTOINCREMENT (o SQLite não o adiciona por ALTER TABLE).
+
+    Os triggers do banco são removidos antes e recriados depois: eles citam as
+    tabelas pelo nome, e o RENAME recusa triggers que apontam para tabela inexistente.
+    """
+    ddl = conexao.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela.name,)
+    ).scalar()
+    if 'AUTOINCREMENT' in ddl.upper():
+        return
+    triggers = conexao.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").all()
+    indices = conexao.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (tabela.name,)
+    ).scalars().all()
+    for nome, _ in triggers:
+        conexao.exec_driver_sql(f'DROP TRIGGER {nome}')
+
+    destino = MetaData()
+    for chave in tabela.foreign_keys:  # o CREATE TABLE precisa das tabelas referenciadas
+        chave.column.table.to_metadata(destino)
+    nova = tabela.to_metadata(destino, name=f'{tabela.name}_nova')
+    conexao.execute(CreateTable(nova))
+    colunas = ', '.join(coluna.name for coluna in tabela.columns)
+    conexao.exec_driver_sql(f'INSERT INTO {nova.name} ({colunas}) SELECT {colunas} FROM {tabela.name}')
+    conexao.exec_driver_sql(f'DROP TABLE {tabela.name}')
+    conexao.exec_driver_sql(f'ALTER TABLE {nova.name} RENAME TO {tabela.name}')
+    for comando in indices:
+        conexao.exec_driver_sql(comando)
+    for _, comando in triggers:
+        conexao.exec_driver_sql(comando)
+    logger.info('Tabela %s recriada com AUTOINCREMENT', tabela.name)
+
+def _ids_sem_reuso(conexao):
+    # Ids arquivados saem das tabelas quentes: sem AUTOINCREMENT, e com a sequência
+    # acima do arquivo, o SQLite os entregaria de novo a vagas e candidatos novos
+    for modelo, arquivo in ((Vaga, VagaArquivada), (Candidato, CandidatoArquivado)):
+        recriar_com_autoincremento(conexao, modelo.__table__)
+        nome = modelo.__tablename__
+        maior = conexao.exec_driver_sql(
+            f'SELECT max(coalesce((SELECT max(id) FROM {nome}), 0), '
+            f'coalesce((SELECT max(id) FROM {arquivo.__tablename__}), 0), '
+            f"coalesce((SELECT seq FROM sqlite_sequence WHERE name = '{nome}'), 0))"
+        ).scalar()
+        conexao.exec_driver_sql('DELETE FROM sqlite_sequence WHERE name = ?', (nome,))
+        conexao.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (nome, maior))
+
+MIGRACOES = [
+    (1, 'Tabelas novas', _criar_tabelas),
+    (2, 'Colunas novas em tabelas existentes', _colunas_novas),
+    (3, 'Triggers de contagem e recontagem', _contadores),
+    (4, 'Índice de busca textual', _indice_busca),
+    (5, 'Proteção da auditoria', criar_protecao_auditoria),
+    (6, 'Índices das consultas das listagens', criar_indices),
+    (7, 'Vetores de afinidade entre vagas e candidatos', _afinidade),
+    (8, 'Texto extraído dos currículos', _textos_curriculos),
+    (9, 'Arquivo de vagas e candidatos', _arquivo),
+    (10, 'Ids de vagas e candidatos sem reuso', _ids_sem_reuso),
+    (11, 'Índice da impressão digital das vagas', criar_indices),
+]
+
+def versao_atual(conexao):
+    conexao.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS schema_versao ('
+        'versao INTEGER PRIMARY KEY, descricao TEXT, aplicada_em TIMESTAMP)'
+    )
+    return conexao.exec_driver_sql('SELECT coalesce(max(versao), 0) FROM schema_versao').scalar()
+
+def _aplicar(versao, descricao, passo):
+    """Aplica um passo se ainda pendente; retorna False se outro worker já o aplicou"""
+    with db.engine.begin() as conexao:
+        # Escrita sem efeito só para pegar o lock antes de reler a versão
+        conexao.exec_driver_sql('UPDATE schema_versao SET versao = versao WHERE 0')
+        if versao_atual(conexao) >= versao:
+            return False
+        inicio = time.monotonic()
+        passo(conexao)
+        conexao.exec_driver_sql(
+            'INSERT INTO schema_versao (versao, descricao, aplicada_em) VALUES (?, ?, ?)',
+            (versao, descricao, datetime.utcnow())
+        )
+    logger.info('Migração %s (%s) aplicada em %.1fs', versao, descricao, time.monotonic() - inicio)
+    return True
+
+def aplicar_migracoes():
+    """Leva o banco à última versão. Sem pendências, custa uma única leitura."""
+    with db.engine.begin() as conexao:
+        atual = versao_atual(conexao)
+    aplicadas = []
+    for versao, descricao, passo in MIGRACOES:
+        if versao <= atual:
+            continue
+        limite = time.monotonic() + app.config['MIGRACOES_ESPERA']
+        while True:
+            try:
+                if _aplicar(versao, descricao, passo):
+                    aplicadas.append(versao)
+                break
+            except OperationalError as erro:
+                # Outro worker está migrando (ex.: reconstruindo o índice de busca)
+                if not erro_de_bloqueio(erro) or time.monotonic() > limite:
+                    raise
+                time.sleep(0.5)
+    return aplicadas
+
+# ===== VERIFICAÇÃO DOS PLANOS DE CONSULTA =====
+# As listagens são requisitadas pelo cliente de teste do Flask e o SQL que elas de fato
+# emitem (joins, busca, afinidade, união com o arquivo) passa pelo EXPLAIN QUERY PLAN.
+# Usado por tests/test_planos.py e pelo comando verificar-indices.
+
+# Tabelas lidas por inteiro de propósito: poucas linhas por construção (o catálogo do
+# SQLite é consultado para saber se o índice de busca existe)
+TABELAS_PEQUENAS = {'status_counts', 'sqlite_master'}
+
+PROXIMA_PAGINA = re.compile(r'href="([^"]*[?&]amp;apos=[^"]*|[^"]*\?apos=[^"]*)"')
+
+def urls_das_listagens(vaga_id, link_inscricao):
+    """Rotas de listagem e consulta a verificar, com os ids de uma vaga existente"""
+    return {
+        'dashboard': '/dashboard',
+        'usuários': '/usuarios',
+        'vagas': '/vagas',
+        'vagas (com arquivo)': '/vagas?arquivo=1',
+        'candidatos da vaga': f'/candidatos/vaga/{vaga_id}',
+        'candidatos da vaga (afinidade)': f'/candidatos/vaga/{vaga_id}?ordem=afinidade',
+        'banco de talentos': '/banco-talentos',
+        'banco de talentos (status)': '/banco-talentos?status=pendente',
+        'banco de talentos (busca)': '/banco-talentos?busca=silva',
+        'banco de talentos (com arquivo)': '/banco-talentos?arquivo=1',
+        'banco de talentos (com arquivo, busca)': '/banco-talentos?arquivo=1&busca=silva',
+        'auditoria': '/manutencao/logs',
+        'inscrição': f'/inscrever/{link_inscricao}',
+        'api: vagas': '/api/vagas',
+        'api: candidatos da vaga': f'/api/vagas/{vaga_id}/candidatos',
+        'api: candidatos': '/api/candidatos?status=pendente',
+    }
+
+@contextmanager
+def capturar_consultas():
+    """Lista (sql, parâmetros) dos SELECTs emitidos nesta thread enquanto o bloco roda"""
+    capturadas = []
+    thread = threading.get_ident()
+
+    def registrar(conexao, cursor, sql, parametros, contexto, executemany):
+        if threading.get_ident() == thread and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            capturadas.append((sql, parametros))
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        yield capturadas
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+
+def _proxima_pagina(resposta):
+    if resposta.is_json:
+        return (resposta.get_json().get('paginacao') or {}).get('proximo')
+    encontrado = PROXIMA_PAGINA.search(resposta.get_data(as_text=True))
+    return html.unescape(encontrado.group(1)) if encontrado else None
+
+def problemas_do_plano(plano):
+    """Passos com varredura sem índice ou ordenação em B-tree temporária.
+
+    Exceções aceitas:
+    - agrupamento em B-tree temporária: na afinidade ele soma só as linhas já
+      encontradas pela chave primária;
+    - ordenação quando a consulta parte do FTS (ordem por relevância) ou da afinidade
+      materializada (ordem pela pontuação): valores calculados, sem índice possível,
+      e só as linhas encontradas (casadas pela busca ou da vaga) são ordenadas.
+    """
+    ordem_calculada = any('VIRTUAL TABLE INDEX' in passo or passo == 'MATERIALIZE afinidade' for passo in plano)
+    return [
+        passo for passo in plano
+        if ('TEMP B-TREE' in passo and 'GROUP BY' not in passo
+            and not ('ORDER BY' in passo and ordem_calculada))
+        or (passo.startswith('SCAN') and 'INDEX' not in passo
+            and passo.split()[1] not in TABELAS_PEQUENAS)
+    ]
+
+def verificar_planos(cliente, urls):
+    """Requisita cada url (e a página seguinte, se houver) e explica cada SELECT emitido.
+
+    Retorna [(nome, status, [(sql, plano, problemas)])]; `cliente` já deve estar autenticado.
+    """
+    resultado = []
+    for nome, url in urls.items():
+        consultas = {}
+        status = []
+        for pagina, endereco in enumerate((url, None)):
+            if pagina:
+                endereco = _proxima_pagina(resposta)
+                if not endereco:
+                    break
+            with capturar_consultas() as capturadas:
+                resposta = cliente.get(endereco, query_string={'por_pagina': 5} if pagina == 0 and '?' not in url
+                                       else None)
+            status.append(resposta.status_code)
+            for sql, parametros in capturadas:
+                consultas.setdefault(sql, parametros)
+        explicadas = []
+        with db.engine.connect() as conexao:
+            for sql, parametros in consultas.items():
+                plano = [linha[3] for linha in conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros)]
+                explicadas.append((sql, plano, problemas_do_plano(plano)))
+        resultado.append((nome, status, explicadas))
+    return resultado
+
+@app.cli.command('migrar')
+def migrar_comando():
+    """Aplica as migrações pendentes (também roda na inicialização)"""
+    aplicadas = aplicar_migracoes()
+    print(f"Migrações aplicadas: {', '.join(map(str, aplicadas))}" if aplicadas else 'Banco já atualizado.')
+
+@app.cli.command('verificar-indices')
+def verificar_indices_comando():
+    """Confere com EXPLAIN QUERY PLAN que as consultas das listagens usam índice (no banco configurado)"""
+    master = Usuario.query.filter_by(tipo='master', ativo=True).first()
+    vaga = Vaga.query.order_by(Vaga.candidatos_count.desc()).first()
+    if master is None or vaga is None:
+        raise click.ClickException('O banco precisa de um usuário master ativo e de ao menos uma vaga.')
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao.update(usuario_id=master.id, usuario_nome=master.nome, tipo=master.tipo, usuario_email=master.email)
+    invalidar_pagina(chave_inscricao(vaga.link_inscricao))  # a inscrição consulta o banco só na falta
+    falhas = 0
+    for nome, status, explicadas in verificar_planos(cliente, urls_das_listagens(vaga.id, vaga.link_inscricao)):
+        erro = any(problemas for _, _, problemas in explicadas) or any(codigo >= 400 for codigo in status)
+        print(f"{'ERRO' if erro else 'ok  '} {nome} ({len(explicadas)} consulta(s), status {status})")
+        for sql, plano, problemas in explicadas:
+            if problemas:
+                print(f"     {' '.join(sql.split())[:160]}\n     -> {' | '.join(plano)}")
+        falhas += erro
+    sys.exit(1 if falhas else 0)
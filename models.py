@@ -1,4 +1,5 @@
 from app import db
+from sqlalchemy import event
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -30,9 +31,14 @@ class Usuario(db.Model):
             'data_criacao': self.data_criacao.strftime('%Y-%m-%d %H:%M')
         }
 
+# Listagem paginada por (data_criacao, id)
+db.Index('ix_usuarios_data', Usuario.data_criacao.desc(), Usuario.id.desc())
+
 # Modelo de Vaga
 class Vaga(db.Model):
     __tablename__ = 'vagas'
+    # Ids nunca reutilizados: vagas arquivadas mantêm o id (ver arquivamento.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
@@ -43,6 +49,10 @@ class Vaga(db.Model):
     link_inscricao = db.Column(db.String(200), unique=True)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     data_encerramento = db.Column(db.DateTime)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    candidatos_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # mantido por triggers
+    
+    arquivado = False  # ver VagaArquivada
     
     def to_dict(self):
         return {
@@ -54,12 +64,23 @@ class Vaga(db.Model):
             'status': self.status,
             'link_inscricao': self.link_inscricao,
             'data_criacao': self.data_criacao.strftime('%Y-%m-%d'),
-            'candidatos_count': len(self.candidatos)
+            'data_atualizacao': self.data_atualizacao.strftime('%Y-%m-%d %H:%M') if self.data_atualizacao else None,
+            'candidatos_count': self.candidatos_count
         }
 
+# Listagem e dashboard por (data_criacao, id); API pública filtra por status
+db.Index('ix_vagas_data', Vaga.data_criacao.desc(), Vaga.id.desc())
+db.Index('ix_vagas_status_data', Vaga.status, Vaga.data_criacao.desc(), Vaga.id.desc())
+# Impressão digital (ETag) da API de vagas sem filtro: lê o índice em vez das linhas largas
+db.Index('ix_vagas_impressao', Vaga.data_atualizacao, Vaga.candidatos_count)
+
 # Modelo de Candidato
 class Candidato(db.Model):
     __tablename__ = 'candidatos'
+    __table_args__ = (
+        db.Index('ix_candidatos_email_vaga', 'email', 'vaga_id'),  # duplicidade na importação
+        {'sqlite_autoincrement': True},  # ids nunca reutilizados, como em vagas
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -67,14 +88,22 @@ class Candidato(db.Model):
     telefone = db.Column(db.String(20))
     linkedin = db.Column(db.String(200))
     arquivo_curriculo = db.Column(db.String(200))  # Nome do arquivo
+    arquivo_hash = db.Column(db.String(64), index=True)  # SHA-256 do currículo armazenado
+    arquivo_tamanho = db.Column(db.Integer)
+    arquivo_mime = db.Column(db.String(100))
     expectativa_salario = db.Column(db.String(50))  # Expectativa salarial
     vaga_id = db.Column(db.Integer, db.ForeignKey('vagas.id'))
     status = db.Column(db.String(30), default='pendente')  # pendente, em_analise, aprovado, reprovado, banco_talentos
     observacoes = db.Column(db.Text)
     data_candidatura = db.Column(db.DateTime, default=datetime.utcnow)
-    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     vaga = db.relationship('Vaga', backref='candidatos')
+    # Vaga já movida para o arquivo (candidatos do banco de talentos continuam aqui)
+    vaga_arquivada = db.relationship('VagaArquivada', primaryjoin='foreign(Candidato.vaga_id) == VagaArquivada.id',
+                                     viewonly=True)
+    
+    arquivado = False  # ver CandidatoArquivado
     
     def to_dict(self):
         return {
@@ -84,6 +113,9 @@ class Candidato(db.Model):
             'telefone': self.telefone,
             'linkedin': self.linkedin,
             'arquivo_curriculo': self.arquivo_curriculo,
+            'arquivo_hash': self.arquivo_hash,
+            'arquivo_tamanho': self.arquivo_tamanho,
+            'arquivo_mime': self.arquivo_mime,
             'expectativa_salario': self.expectativa_salario,
             'vaga_id': self.vaga_id,
             'vaga_titulo': self.vaga.titulo if self.vaga else '',
@@ -92,3 +124,312 @@ class Candidato(db.Model):
             'data_candidatura': self.data_candidatura.strftime('%Y-%m-%d %H:%M'),
             'data_atualizacao': self.data_atualizacao.strftime('%Y-%m-%d %H:%M')
         }
+
+# Filtro de igualdade seguido da ordenação (data_candidatura, id) das listagens e da paginação
+db.Index('ix_candidatos_vaga_data', Candidato.vaga_id, Candidato.data_candidatura.desc(), Candidato.id.desc())
+db.Index('ix_candidatos_status_data', Candidato.status, Candidato.data_candidatura.desc(), Candidato.id.desc())
+db.Index('ix_candidatos_data', Candidato.data_candidatura.desc(), Candidato.id.desc())
+
+# Contador de candidatos por vaga mantido pelo próprio SQLite, em qualquer caminho de escrita
+DDL_CONTAGEM_CANDIDATOS = [
+    """CREATE TRIGGER IF NOT EXISTS vagas_contagem_ai AFTER INSERT ON candidatos
+    WHEN new.vaga_id IS NOT NULL BEGIN
+        UPDATE vagas SET candidatos_count = candidatos_count + 1 WHERE id = new.vaga_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vagas_contagem_ad AFTER DELETE ON candidatos
+    WHEN old.vaga_id IS NOT NULL BEGIN
+        UPDATE vagas SET candidatos_count = candidatos_count - 1 WHERE id = old.vaga_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vagas_contagem_au AFTER UPDATE OF vaga_id ON candidatos
+    WHEN old.vaga_id IS NOT new.vaga_id BEGIN
+        UPDATE vagas SET candidatos_count = candidatos_count - 1 WHERE id = old.vaga_id;
+        UPDATE vagas SET candidatos_count = candidatos_count + 1 WHERE id = new.vaga_id;
+    END""",
+]
+
+def criar_contagem_candidatos(conexao):
+    for comando in DDL_CONTAGEM_CANDIDATOS:
+        conexao.exec_driver_sql(comando)
+
+def recalcular_contagem_candidatos(conexao):
+    """Recalcula o contador a partir da tabela de candidatos"""
+    conexao.exec_driver_sql(
+        "UPDATE vagas SET candidatos_count = "
+        "(SELECT count(*) FROM candidatos WHERE candidatos.vaga_id = vagas.id)"
+    )
+
+event.listen(Candidato.__table__, 'after_create',
+             lambda target, conexao, **kw: criar_contagem_candidatos(conexao))
+
+# Histograma materializado de status por vaga (vaga_id 0 = candidato sem vaga)
+class ContagemStatus(db.Model):
+    __tablename__ = 'status_counts'
+    
+    vaga_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(30), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'vaga_id': self.vaga_id,
+            'status': self.status,
+            'total': self.total
+        }
+
+DDL_CONTAGEM_STATUS = [
+    """CREATE TRIGGER IF NOT EXISTS status_counts_ai AFTER INSERT ON candidatos BEGIN
+        INSERT INTO status_counts (vaga_id, status, total)
+        VALUES (coalesce(new.vaga_id, 0), coalesce(new.status, ''), 1)
+        ON CONFLICT (vaga_id, status) DO UPDATE SET total = total + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS status_counts_ad AFTER DELETE ON candidatos BEGIN
+        UPDATE status_counts SET total = total - 1
+        WHERE vaga_id = coalesce(old.vaga_id, 0) AND status = coalesce(old.status, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS status_counts_au AFTER UPDATE OF status, vaga_id ON candidatos
+    WHEN old.status IS NOT new.status OR old.vaga_id IS NOT new.vaga_id BEGIN
+        UPDATE status_counts SET total = total - 1
+        WHERE vaga_id = coalesce(old.vaga_id, 0) AND status = coalesce(old.status, '');
+        INSERT INTO status_counts (vaga_id, status, total)
+        VALUES (coalesce(new.vaga_id, 0), coalesce(new.status, ''), 1)
+        ON CONFLICT (vaga_id, status) DO UPDATE SET total = total + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS status_counts_vaga_ad AFTER DELETE ON vagas BEGIN
+        DELETE FROM status_counts WHERE vaga_id = old.id;
+    END""",
+]
+
+def criar_contagem_status(conexao):
+    for comando in DDL_CONTAGEM_STATUS:
+        conexao.exec_driver_sql(comando)
+
+# Criado depois de todas as tabelas, pois os triggers dependem de candidatos e vagas
+event.listen(db.metadata, 'after_create',
+             lambda target, conexao, **kw: criar_contagem_status(conexao))
+
+# Currículo armazenado por conteúdo (um arquivo por SHA-256, com contagem de referências)
+class ArquivoCurriculo(db.Model):
+    __tablename__ = 'arquivos'
+    
+    hash = db.Column(db.String(64), primary_key=True)
+    extensao = db.Column(db.String(10), nullable=False)
+    tamanho = db.Column(db.Integer, nullable=False)
+    mime = db.Column(db.String(100))
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'hash': self.hash,
+            'extensao': self.extensao,
+            'tamanho': self.tamanho,
+            'mime': self.mime,
+            'referencias': self.referencias,
+            'data_criacao': self.data_criacao.strftime('%Y-%m-%d %H:%M')
+        }
+
+# Texto extraído de cada currículo, pelo mesmo hash de arquivos (ver extracao.py)
+class TextoCurriculo(db.Model):
+    __tablename__ = 'curriculos_texto'
+    
+    hash = db.Column(db.String(64), primary_key=True)
+    status = db.Column(db.String(10), nullable=False)  # ok, vazio, erro
+    texto = db.Column(db.LargeBinary)  # UTF-8 comprimido com zlib
+    caracteres = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.String(500))
+    duracao_ms = db.Column(db.Integer)
+    data_extracao = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'hash': self.hash,
+            'status': self.status,
+            'caracteres': self.caracteres,
+            'erro': self.erro,
+            'duracao_ms': self.duracao_ms,
+            'data_extracao': self.data_extracao.strftime('%Y-%m-%d %H:%M')
+        }
+
+# Fila de emails (outbox) gravada na mesma transação da operação de origem
+class EmailOutbox(db.Model):
+    __tablename__ = 'outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(120), nullable=False)
+    assunto = db.Column(db.String(200), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pendente', index=True)  # pendente, enviando, enviado, falhou
+    tentativas = db.Column(db.Integer, default=0)
+    proxima_tentativa = db.Column(db.DateTime, default=datetime.utcnow)
+    ultimo_erro = db.Column(db.Text)
+    lote = db.Column(db.String(32), index=True)
+    reservado_em = db.Column(db.DateTime)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_envio = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'destinatario': self.destinatario,
+            'assunto': self.assunto,
+            'status': self.status,
+            'tentativas': self.tentativas,
+            'ultimo_erro': self.ultimo_erro,
+            'data_criacao': self.data_criacao.strftime('%Y-%m-%d %H:%M'),
+            'data_envio': self.data_envio.strftime('%Y-%m-%d %H:%M') if self.data_envio else None
+        }
+
+# Trilha de auditoria (somente inclusão; gravada em lotes pelo módulo auditoria)
+class RegistroAuditoria(db.Model):
+    __tablename__ = 'auditoria'
+    __table_args__ = (
+        db.Index('ix_auditoria_data', 'data', 'id'),
+        db.Index('ix_auditoria_ator', 'ator', 'data', 'id'),
+        db.Index('ix_auditoria_entidade', 'entidade', 'entidade_id', 'data', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ator_id = db.Column(db.Integer)
+    ator = db.Column(db.String(120))  # email do usuário, ou do visitante na inscrição
+    acao = db.Column(db.String(50), nullable=False)
+    entidade = db.Column(db.String(30))  # usuario, vaga, candidato, arquivo, backup
+    entidade_id = db.Column(db.Integer)
+    detalhes = db.Column(db.Text)
+    ip = db.Column(db.String(45))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'data': self.data.strftime('%Y-%m-%d %H:%M:%S'),
+            'ator_id': self.ator_id,
+            'ator': self.ator,
+            'acao': self.acao,
+            'entidade': self.entidade,
+            'entidade_id': self.entidade_id,
+            'detalhes': self.detalhes,
+            'ip': self.ip
+        }
+
+# Vetores TF-IDF esparsos (um termo por linha) de vagas e candidatos; ver afinidade.py
+class TermoVetor(db.Model):
+    __tablename__ = 'vetores_termos'
+    __table_args__ = (
+        db.Index('ix_vetores_dono', 'tipo', 'dono_id'),
+        {'sqlite_with_rowid': False},
+    )
+    
+    tipo = db.Column(db.String(10), primary_key=True)  # candidato, vaga
+    grupo = db.Column(db.Integer, primary_key=True, autoincrement=False)  # vaga do candidato; 0 para vagas
+    termo = db.Column(db.Integer, primary_key=True, autoincrement=False)  # crc32 do termo; 0 = documento
+    dono_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    peso = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'tipo': self.tipo,
+            'grupo': self.grupo,
+            'termo': self.termo,
+            'dono_id': self.dono_id,
+            'peso': self.peso
+        }
+
+# Frequência de documentos por termo (mantida por triggers sobre vetores_termos)
+class FrequenciaTermo(db.Model):
+    __tablename__ = 'vetores_frequencia'
+    
+    tipo = db.Column(db.String(10), primary_key=True)
+    termo = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    documentos = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'tipo': self.tipo,
+            'termo': self.termo,
+            'documentos': self.documentos
+        }
+
+# ===== ARQUIVO =====
+# Vagas encerradas há mais de ARQUIVAMENTO_DIAS e seus candidatos (menos os do banco
+# de talentos) saem das tabelas quentes para estas, com os mesmos ids; ver arquivamento.py
+
+class VagaArquivada(db.Model):
+    __tablename__ = 'vagas_arquivo'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    titulo = db.Column(db.String(200), nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    requisitos = db.Column(db.Text)
+    localizacao = db.Column(db.String(100))
+    status = db.Column(db.String(20))
+    link_inscricao = db.Column(db.String(200))
+    data_criacao = db.Column(db.DateTime)
+    data_encerramento = db.Column(db.DateTime)
+    data_atualizacao = db.Column(db.DateTime)
+    candidatos_count = db.Column(db.Integer, nullable=False, default=0)  # arquivados + os do banco de talentos
+    data_arquivamento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    arquivado = True
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'titulo': self.titulo,
+            'descricao': self.descricao,
+            'requisitos': self.requisitos,
+            'localizacao': self.localizacao,
+            'status': self.status,
+            'data_criacao': self.data_criacao.strftime('%Y-%m-%d'),
+            'data_encerramento': self.data_encerramento.strftime('%Y-%m-%d') if self.data_encerramento else None,
+            'candidatos_count': self.candidatos_count,
+            'data_arquivamento': self.data_arquivamento.strftime('%Y-%m-%d %H:%M')
+        }
+
+db.Index('ix_vagas_arquivo_data', VagaArquivada.data_criacao.desc(), VagaArquivada.id.desc())
+
+class CandidatoArquivado(db.Model):
+    __tablename__ = 'candidatos_arquivo'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nome = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    telefone = db.Column(db.String(20))
+    linkedin = db.Column(db.String(200))
+    arquivo_curriculo = db.Column(db.String(200))
+    arquivo_hash = db.Column(db.String(64), index=True)  # a referência em arquivos é mantida
+    arquivo_tamanho = db.Column(db.Integer)
+    arquivo_mime = db.Column(db.String(100))
+    expectativa_salario = db.Column(db.String(50))
+    vaga_id = db.Column(db.Integer)
+    status = db.Column(db.String(30))
+    observacoes = db.Column(db.Text)
+    data_candidatura = db.Column(db.DateTime)
+    data_atualizacao = db.Column(db.DateTime)
+    data_arquivamento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    vaga = db.relationship('VagaArquivada', primaryjoin='foreign(CandidatoArquivado.vaga_id) == VagaArquivada.id',
+                           viewonly=True)
+    
+    arquivado = True
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'email': self.email,
+            'telefone': self.telefone,
+            'linkedin': self.linkedin,
+            'arquivo_curriculo': self.arquivo_curriculo,
+            'expectativa_salario': self.expectativa_salario,
+            'vaga_id': self.vaga_id,
+            'status': self.status,
+            'observacoes': self.observacoes,
+            'data_candidatura': self.data_candidatura.strftime('%Y-%m-%d %H:%M'),
+            'data_arquivamento': self.data_arquivamento.strftime('%Y-%m-%d %H:%M')
+        }
+
+db.Index('ix_candidatos_arquivo_vaga_data', CandidatoArquivado.vaga_id,
+         CandidatoArquivado.data_candidatura.desc(), CandidatoArquivado.id.desc())
+db.Index('ix_candidatos_arquivo_status_data', CandidatoArquivado.status,
+         CandidatoArquivado.data_candidatura.desc(), CandidatoArquivado.id.desc())
+db.Index('ix_candidatos_arquivo_data', CandidatoArquivado.data_candidatura.desc(), CandidatoArquivado.id.desc())
@@ -0,0 +1,170 @@
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask_mail import Message
+from app import app, db, mail
+from models import EmailOutbox
+from metricas import medir
+
+logger = logging.getLogger(__name__)
+
+# Itens reservados há mais tempo que isso voltam para a fila (worker que morreu no meio do envio)
+TEMPO_RESERVA = timedelta(minutes=10)
+
+_despertar = threading.Event()
+_enviador = None
+_enviador_lock = threading.Lock()
+
+def enfileirar_email(destinatario, assunto, corpo):
+    """Adiciona o email à sessão atual; ele é gravado no commit de quem chamou"""
+    item = EmailOutbox(destinatario=destinatario, assunto=assunto, corpo=corpo)
+    db.session.add(item)
+    return item
+
+def notificar_enviador():
+    """Acorda o enviador em segundo plano após um commit com emails novos"""
+    _despertar.set()
+
+def _reservar_lote():
+    """Marca um lote de emails pendentes como 'enviando' para este processo.
+
+    O UPDATE é atômico no SQLite, então dois workers nunca reservam o mesmo item.
+    """
+    agora = datetime.utcnow()
+    lote = uuid.uuid4().hex
+
+    EmailOutbox.query.filter(
+        EmailOutbox.status == 'enviando',
+        EmailOutbox.reservado_em < agora - TEMPO_RESERVA
+    ).update({'status': 'pendente', 'lote': None}, synchronize_session=False)
+
+    pendentes = db.select(EmailOutbox.id).where(
+        EmailOutbox.status == 'pendente',
+        EmailOutbox.proxima_tentativa <= agora
+    ).order_by(EmailOutbox.id).limit(app.config['OUTBOX_LOTE'])
+
+    EmailOutbox.query.filter(EmailOutbox.id.in_(pendentes)).update(
+        {'status': 'enviando', 'lote': lote, 'reservado_em': agora},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    return EmailOutbox.query.filter_by(lote=lote, status='enviando').order_by(EmailOutbox.id).all()
+
+def _registrar_falha(item, erro):
+    item.tentativas = (item.tentativas or 0) + 1
+    item.ultimo_erro = str(erro)[:1000]
+    item.lote = None
+    if item.tentativas >= app.config['OUTBOX_MAX_TENTATIVAS']:
+        # Dead-letter: fica registrado para análise e não é mais tentado
+        item.status = 'falhou'
+        logger.error('Email %s descartado após %s tentativas: %s', item.id, item.tentativas, erro)
+    else:
+        espera = min(app.config['OUTBOX_BACKOFF_BASE'] * 2 ** (item.tentativas - 1), 6 * 3600)
+        item.status = 'pendente'
+        item.proxima_tentativa = datetime.utcnow() + timedelta(seconds=espera)
+
+def _devolver(itens):
+    """Devolve à fila, sem contar tentativa, itens que não chegaram a ser enviados"""
+    for item in itens:
+        if item.status == 'enviando':
+            item.status = 'pendente'
+            item.lote = None
+
+def _montar_mensagem(item):
+    return Message(
+        subject=item.assunto,
+        recipients=[item.destinatario],
+        body=item.corpo,
+        sender=app.config['MAIL_DEFAULT_SENDER']
+    )
+
+def processar_fila():
+    """Envia todos os emails pendentes reutilizando uma única conexão SMTP.
+
+    Retorna a quantidade de emails processados (enviados ou com falha).
+    """
+    itens = _reservar_lote()
+    if not itens:
+        return 0
+
+    intervalo = 1.0 / app.config['OUTBOX_LIMITE_POR_SEGUNDO']
+    processados = 0
+    try:
+        with mail.connect() as conexao:
+            while itens:
+                for indice, item in enumerate(itens):
+                    inicio = time.monotonic()
+                    try:
+                        with medir('smtp'):
+                            conexao.send(_montar_mensagem(item))
+                        item.status = 'enviado'
+                        item.lote = None
+                        item.data_envio = datetime.utcnow()
+                    except smtplib.SMTPServerDisconnected:
+                        # Conexão caiu: o restante volta para a fila e tenta na próxima rodada
+                        _devolver(itens[indice:])
+                        db.session.commit()
+                        return processados
+                    except Exception as erro:
+                        _registrar_falha(item, erro)
+                    processados += 1
+
+                    # Limite de envio por segundo
+                    espera = intervalo - (time.monotonic() - inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+                db.session.commit()
+                itens = _reservar_lote()
+    except Exception as erro:
+        # Falha ao conectar no servidor SMTP: conta como tentativa para todo o lote
+        logger.warning('Falha na conexão SMTP: %s', erro)
+        for item in itens:
+            if item.status == 'enviando':
+                _registrar_falha(item, erro)
+                processados += 1
+        db.session.commit()
+    return processados
+
+class EnviadorOutbox(threading.Thread):
+    """Thread que drena a outbox em segundo plano"""
+
+    def __init__(self):
+        super().__init__(name='enviador-outbox', daemon=True)
+
+    def run(self):
+        while True:
+            _despertar.wait(app.config['OUTBOX_INTERVALO'])
+            _despertar.clear()
+            with app.app_context():
+                try:
+                    processar_fila()
+                except Exception:
+                    logger.exception('Erro ao processar a outbox')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+def iniciar_enviador():
+    """Inicia a thread de envio uma única vez por processo"""
+    global _enviador
+    if _enviador is not None and _enviador.is_alive():
+        return
+    with _enviador_lock:
+        if _enviador is None or not _enviador.is_alive():
+            _enviador = EnviadorOutbox()
+            _enviador.start()
+
+@app.before_request
+def _garantir_enviador():
+    if app.config['OUTBOX_THREAD'] and not app.config.get('TESTING'):
+        iniciar_enviador()
+
+@app.cli.command('enviar-emails')
+def enviar_emails_comando():
+    """Drena a outbox uma vez (para rodar como processo separado ou via cron)"""
+    total = processar_fila()
+    print(f'{total} email(s) processado(s).')
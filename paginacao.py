@@ -0,0 +1,128 @@
+import base64
+import json
+from datetime import datetime
+from flask import request, url_for, abort
+from sqlalchemy import tuple_, DateTime, Float, Integer, Numeric, String
+from app import app
+
+# Paginação por cursor (keyset): a página N custa o mesmo que a página 1
+
+class Pagina:
+    """Resultado de uma consulta paginada com os cursores de navegação"""
+
+    def __init__(self, itens, proximo_cursor, anterior_cursor, tamanho):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.anterior_cursor = anterior_cursor
+        self.tamanho = tamanho
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def to_dict(self):
+        return {
+            'proximo_cursor': self.proximo_cursor,
+            'anterior_cursor': self.anterior_cursor,
+            'tamanho': self.tamanho
+        }
+
+def codificar_cursor(valores):
+    dados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip('=')
+
+def _valor_cursor(coluna, valor):
+    """Valor do cursor conferido com o tipo da coluna (o cursor vem do cliente)"""
+    if valor is None:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise TypeError(valor)
+    if isinstance(coluna.type, DateTime):
+        return datetime.fromisoformat(valor)
+    if isinstance(coluna.type, Integer):
+        tipos = int
+    elif isinstance(coluna.type, (Numeric, Float)):
+        tipos = (int, float)
+    elif isinstance(coluna.type, String):
+        tipos = str
+    else:  # expressões sem tipo, como o bm25 da busca
+        tipos = (int, float, str)
+    if not isinstance(valor, tipos):
+        raise TypeError(valor)
+    return valor
+
+def decodificar_cursor(cursor, colunas):
+    """Converte o cursor de volta para os valores das colunas; None se inválido"""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(dados, list) or len(dados) != len(colunas):
+            return None
+        return [_valor_cursor(coluna, valor) for coluna, valor in zip(colunas, dados)]
+    except (ValueError, TypeError):
+        return None
+
+def tamanho_pagina():
+    """Tamanho da página pedido em ?por_pagina=, limitado pela configuração"""
+    padrao = app.config['ITENS_POR_PAGINA']
+    tamanho = request.args.get('por_pagina', padrao, type=int)
+    return max(1, min(tamanho, app.config['ITENS_POR_PAGINA_MAX']))
+
+def paginar(query, colunas, apos=None, antes=None, tamanho=None, descendente=True, chave=None):
+    """Aplica ordenação e filtro por cursor em `query` e retorna uma Pagina.
+
+    `colunas` é a chave de ordenação única, ex.: (Candidato.data_candidatura, Candidato.id).
+    `chave` extrai esses valores de cada item quando o item não é uma entidade simples.
+    """
+    tamanho = tamanho or tamanho_pagina()
+    if chave is None:
+        chave = lambda item: tuple(getattr(item, c.key) for c in colunas)
+
+    valores = None
+    voltando = False
+    if antes:
+        valores = decodificar_cursor(antes, colunas)
+        voltando = valores is not None
+    if valores is None and apos:
+        valores = decodificar_cursor(apos, colunas)
+
+    # Voltando uma página, percorre no sentido inverso e desfaz a inversão no final
+    decrescente = descendente != voltando
+    if valores is not None:
+        if decrescente:
+            query = query.filter(tuple_(*colunas) < tuple_(*valores))
+        else:
+            query = query.filter(tuple_(*colunas) > tuple_(*valores))
+    ordem = [c.desc() if decrescente else c.asc() for c in colunas]
+
+    itens = query.order_by(*ordem).limit(tamanho + 1).all()
+    tem_mais = len(itens) > tamanho
+    itens = itens[:tamanho]
+    if voltando:
+        itens.reverse()
+
+    proximo = anterior = None
+    if itens:
+        # Voltando, sempre existe a página de onde viemos; avançando, só se sobrou item
+        if voltando or tem_mais:
+            proximo = codificar_cursor(chave(itens[-1]))
+        if (tem_mais if voltando else valores is not None):
+            anterior = codificar_cursor(chave(itens[0]))
+    return Pagina(itens, proximo, anterior, tamanho)
+
+def paginar_requisicao(query, colunas, **kwargs):
+    """Atalho que lê os cursores ?apos= e ?antes= da requisição atual (400 se inválidos)"""
+    cursores = {nome: request.args.get(nome) for nome in ('apos', 'antes')}
+    if any(cursor and decodificar_cursor(cursor, colunas) is None for cursor in cursores.values()):
+        abort(400)
+    return paginar(query, colunas, **cursores, **kwargs)
+
+@app.template_global()
+def url_pagina(**cursores):
+    """URL da rota atual preservando os filtros e trocando apenas o cursor"""
+    args = request.args.to_dict()
+    args.pop('apos', None)
+    args.pop('antes', None)
+    args.update({k: v for k, v in cursores.items() if v})
+    return url_for(request.endpoint, **dict(request.view_args or {}, **args))
@@ -1,14 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_from_directory, jsonify
-from app import app, db, mail
-from models import Usuario, Vaga, Candidato
-from flask_mail import Message
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify, abort, Response, stream_with_context
+from werkzeug.security import safe_join
+from urllib.parse import quote
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app import app, db
+from models import Usuario, Vaga, Candidato, RegistroAuditoria, VagaArquivada, CandidatoArquivado
+from indicadores import obter_kpis, invalidar_kpis, contagem_por_status, recalcular_contagens, STATUS_CANDIDATO
+from paginacao import paginar_requisicao, url_pagina
+from busca import subconsulta_busca, garantir_indice_busca, reconstruir_indice_busca
+from afinidade import indexar_candidatos, indexar_vagas, subconsulta_afinidade, vagas_por_afinidade
+from extracao import enfileirar_extracao, executar_extracao
+from arquivamento import executar_ciclo, vagas_com_arquivo, candidatos_com_arquivo, contagem_arquivo_por_status
+from outbox import enfileirar_email, notificar_enviador
+from armazenamento import salvar_curriculo, liberar_curriculos, coletar_orfaos_apos_commit, caminho_arquivo, NOME_ARMAZENADO, MIME_POR_EXTENSAO
+from compactacao import gerar_zip, ler_em_blocos
+from exportacao import consulta_exportacao, FORMATOS
+from validacao import sanitize_input, validar_candidato, ler_data_encerramento, caminho_local
+from importacao import IMPORTADORES, caminho_relatorio
+from auditoria import registrar, registrar_varios, ACOES
+from metricas import gerar_texto_prometheus
+import cache_templates  # cache de bytecode e tag {% cache %} nos templates
+from tarefas import iniciar_tarefa, ultima_tarefa
+from backup import executar_backup
+from banco import repetir_se_bloqueado, em_lotes
+from cache_paginas import obter_pagina, gravar_pagina, invalidar_pagina, resposta_pagina, chave_inscricao
+from api import (CAMPOS_VAGA, CAMPOS_VAGA_PUBLICOS, CAMPOS_CANDIDATO, CampoInvalido, escolher_campos,
+                 colunas_consulta, chave_linha, serializar, impressao_vagas, impressao_candidatos,
+                 resposta_condicional)
 from functools import wraps
+import hmac
 import os
 import uuid
 import re
+from collections import Counter
+from datetime import datetime, timedelta
 
 # Configuração de upload
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
@@ -37,15 +65,6 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Sanitização de entrada
-def sanitize_input(text):
-    """Remove caracteres perigosos de entrada"""
-    if not text:
-        return ''
-    # Remove tags HTML/JS
-    text = re.sub(r'<[^>]+>', '', str(text))
-    return text.strip()
-
 # Página inicial
 @app.route('/')
 def index():
@@ -70,9 +89,12 @@ def login():
             session['usuario_id'] = usuario.id
             session['usuario_nome'] = usuario.nome
             session['tipo'] = usuario.tipo
+            session['usuario_email'] = usuario.email
+            registrar('login', 'usuario', usuario.id)
             flash('Login realizado com sucesso!', 'success')
             return redirect(url_for('dashboard'))
         else:
+            registrar('login_falhou', 'usuario', usuario.id if usuario else None, ator=email)
             flash('Email ou senha incorretos.', 'error')
     
     return render_template('login.html')
@@ -80,6 +102,8 @@ def login():
 # Logout
 @app.route('/logout')
 def logout():
+    if 'usuario_id' in session:
+        registrar('logout', 'usuario', session['usuario_id'])
     session.clear()
     flash('Logout realizado com sucesso!', 'success')
     return redirect(url_for('login'))
@@ -88,37 +112,29 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    vagas = Vaga.query.order_by(Vaga.data_criacao.desc()).all()
-    candidatos = Candidato.query.order_by(Candidato.data_candidatura.desc()).all()
-    usuarios = Usuario.query.all()
+    vagas = Vaga.query.order_by(Vaga.data_criacao.desc()).limit(5).all()
+    candidatos = Candidato.query.options(joinedload(Candidato.vaga)).order_by(
+        Candidato.data_candidatura.desc()).limit(5).all()
     
-    # Estatísticas
-    total_vagas = len(vagas)
-    vagas_ativas = len([v for v in vagas if v.status == 'ativa'])
-    total_candidatos = len(candidatos)
-    candidatos_pendentes = len([c for c in candidatos if c.status == 'pendente'])
-    banco_talentos = len([c for c in candidatos if c.status == 'banco_talentos'])
+    # Estatísticas (agregadas no banco e mantidas em cache)
+    kpis = obter_kpis()
     
     return render_template('dashboard.html', 
                          vagas=vagas, 
                          candidatos=candidatos,
-                         usuarios=usuarios,
-                         total_vagas=total_vagas,
-                         vagas_ativas=vagas_ativas,
-                         total_candidatos=total_candidatos,
-                         candidatos_pendentes=candidatos_pendentes,
-                         banco_talentos=banco_talentos)
+                         **kpis)
 
 # ===== GESTÃO DE USUÁRIOS =====
 
 @app.route('/usuarios')
 @login_required
 def listar_usuarios():
-    usuarios = Usuario.query.order_by(Usuario.data_criacao.desc()).all()
+    usuarios = paginar_requisicao(Usuario.query, (Usuario.data_criacao, Usuario.id))
     return render_template('usuarios.html', usuarios=usuarios)
 
 @app.route('/usuarios/cadastrar', methods=['GET', 'POST'])
 @login_required
+@repetir_se_bloqueado
 def cadastrar_usuario():
     if request.method == 'POST':
         nome = sanitize_input(request.form['nome'])
@@ -135,6 +151,7 @@ def cadastrar_usuario():
         
         db.session.add(usuario)
         db.session.commit()
+        registrar('usuario_criado', 'usuario', usuario.id, {'email': email, 'tipo': tipo})
         
         flash('Usuário cadastrado com sucesso!', 'success')
         return redirect(url_for('listar_usuarios'))
@@ -143,6 +160,7 @@ def cadastrar_usuario():
 
 @app.route('/usuarios/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
+@repetir_se_bloqueado
 def editar_usuario(id):
     usuario = Usuario.query.get_or_404(id)
     
@@ -156,6 +174,10 @@ def editar_usuario(id):
             usuario.set_senha(request.form['senha'])
         
         db.session.commit()
+        registrar('usuario_editado', 'usuario', usuario.id, {
+            'email': usuario.email, 'tipo': usuario.tipo, 'ativo': usuario.ativo,
+            'senha_alterada': bool(request.form['senha'])
+        })
         flash('Usuário atualizado com sucesso!', 'success')
         return redirect(url_for('listar_usuarios'))
     
@@ -163,6 +185,7 @@ def editar_usuario(id):
 
 @app.route('/usuarios/excluir/<int:id>')
 @login_required
+@repetir_se_bloqueado
 def excluir_usuario(id):
     if not verificar_master():
         flash('Acesso restrito ao usuário master.', 'error')
@@ -174,8 +197,10 @@ def excluir_usuario(id):
         flash('Não é possível excluir seu próprio usuário.', 'error')
         return redirect(url_for('listar_usuarios'))
     
+    email = usuario.email
     db.session.delete(usuario)
     db.session.commit()
+    registrar('usuario_excluido', 'usuario', id, {'email': email})
     flash('Usuário excluído com sucesso!', 'success')
     return redirect(url_for('listar_usuarios'))
 
@@ -184,11 +209,17 @@ def excluir_usuario(id):
 @app.route('/vagas')
 @login_required
 def listar_vagas():
-    vagas = Vaga.query.order_by(Vaga.data_criacao.desc()).all()
-    return render_template('vagas.html', vagas=vagas)
+    # ?arquivo=1 inclui as vagas arquivadas (consulta mais cara, só sob demanda)
+    arquivo = request.args.get('arquivo') == '1'
+    if arquivo:
+        vagas = vagas_com_arquivo()
+    else:
+        vagas = paginar_requisicao(Vaga.query, (Vaga.data_criacao, Vaga.id))
+    return render_template('vagas.html', vagas=vagas, arquivo=arquivo)
 
 @app.route('/vagas/criar', methods=['GET', 'POST'])
 @login_required
+@repetir_se_bloqueado
 def criar_vaga():
     if request.method == 'POST':
         titulo = sanitize_input(request.form['titulo'])
@@ -204,11 +235,16 @@ def criar_vaga():
             descricao=descricao,
             requisitos=requisitos,
             localizacao=localizacao,
-            link_inscricao=link
+            link_inscricao=link,
+            data_encerramento=ler_data_encerramento(request.form.get('data_encerramento'))
         )
         
         db.session.add(vaga)
+        db.session.flush()
+        indexar_vagas([vaga.id])
         db.session.commit()
+        invalidar_kpis()
+        registrar('vaga_criada', 'vaga', vaga.id, {'titulo': titulo})
         
         flash('Vaga criada com sucesso!', 'success')
         return redirect(url_for('listar_vagas'))
@@ -217,17 +253,27 @@ def criar_vaga():
 
 @app.route('/vagas/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
+@repetir_se_bloqueado
 def editar_vaga(id):
     vaga = Vaga.query.get_or_404(id)
     
     if request.method == 'POST':
+        link_anterior = vaga.link_inscricao
         vaga.titulo = sanitize_input(request.form['titulo'])
         vaga.descricao = sanitize_input(request.form['descricao'])
         vaga.requisitos = sanitize_input(request.form.get('requisitos', ''))
         vaga.localizacao = sanitize_input(request.form.get('localizacao', ''))
         vaga.status = request.form['status']
+        vaga.data_encerramento = ler_data_encerramento(request.form.get('data_encerramento'))
+        if vaga.status == 'encerrada' and vaga.data_encerramento is None:
+            # O prazo de arquivamento conta a partir do encerramento
+            vaga.data_encerramento = datetime.utcnow()
+        indexar_vagas([vaga.id])
         
         db.session.commit()
+        invalidar_kpis()
+        invalidar_pagina(chave_inscricao(link_anterior))
+        registrar('vaga_editada', 'vaga', vaga.id, {'titulo': vaga.titulo, 'status': vaga.status})
         flash('Vaga atualizada com sucesso!', 'success')
         return redirect(url_for('listar_vagas'))
     
@@ -235,13 +281,24 @@ def editar_vaga(id):
 
 @app.route('/vagas/excluir/<int:id>')
 @login_required
+@repetir_se_bloqueado
 def excluir_vaga(id):
     vaga = Vaga.query.get_or_404(id)
     
-    # Excluir candidatos relacionados
-    Candidato.query.filter_by(vaga_id=id).delete()
+    # Liberar os currículos e excluir candidatos relacionados
+    hashes = db.session.query(Candidato.arquivo_hash).filter(
+        Candidato.vaga_id == id, Candidato.arquivo_hash.isnot(None)
+    ).all()
+    liberar_curriculos(h for (h,) in hashes)
+    removidos = Candidato.query.filter_by(vaga_id=id).delete()
+    link = vaga.link_inscricao
+    titulo = vaga.titulo
     db.session.delete(vaga)
     db.session.commit()
+    invalidar_kpis()
+    invalidar_pagina(chave_inscricao(link))
+    coletar_orfaos_apos_commit()
+    registrar('vaga_excluida', 'vaga', id, {'titulo': titulo, 'candidatos_removidos': removidos})
     
     flash('Vaga excluída com sucesso!', 'success')
     return redirect(url_for('listar_vagas'))
@@ -250,19 +307,32 @@ def excluir_vaga(id):
 
 @app.route('/inscrever/<link>')
 def pagina_inscricao(link):
-    vaga = Vaga.query.filter_by(link_inscricao=link, status='ativa').first()
-    
-    if not vaga:
-        flash('Vaga não encontrada ou encerrada.', 'error')
-        return redirect(url_for('index'))
+    # Página pública servida do cache compartilhado; o banco só é consultado na falta
+    pagina = obter_pagina(chave_inscricao(link))
+    
+    if pagina is None:
+        vaga = Vaga.query.filter_by(link_inscricao=link).first()
+        agora = datetime.utcnow()
+        # Renderizada sem mensagens flash: o HTML é o mesmo para qualquer visitante
+        if vaga and vaga.status == 'ativa' and not (vaga.data_encerramento and vaga.data_encerramento <= agora):
+            html = render_template('inscricao.html', vaga=vaga, pagina_publica=True)
+            ttl = app.config['CACHE_PAGINAS_TTL']
+            if vaga.data_encerramento:
+                # O formulário sai do cache quando a vaga vence, mesmo antes do ciclo encerrá-la
+                ttl = max(1, min(ttl, int((vaga.data_encerramento - agora).total_seconds())))
+            pagina = gravar_pagina(chave_inscricao(link), 200, html, ttl)
+        else:
+            html = render_template('vaga_encerrada.html', pagina_publica=True)
+            pagina = gravar_pagina(chave_inscricao(link), 404, html, app.config['CACHE_PAGINAS_TTL_ENCERRADA'])
     
-    return render_template('inscricao.html', vaga=vaga)
+    return resposta_pagina(pagina)
 
 @app.route('/inscrever/<link>', methods=['POST'])
+@repetir_se_bloqueado
 def processar_inscricao(link):
     vaga = Vaga.query.filter_by(link_inscricao=link, status='ativa').first()
     
-    if not vaga:
+    if not vaga or (vaga.data_encerramento and vaga.data_encerramento <= datetime.utcnow()):
         flash('Vaga não encontrada ou encerrada.', 'error')
         return redirect(url_for('index'))
     
@@ -273,45 +343,43 @@ def processar_inscricao(link):
     linkedin = sanitize_input(request.form.get('linkedin', ''))
     expectativa_salario = sanitize_input(request.form.get('expectativa_salario', ''))
     
-    # Validar email
-    if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-        flash('Email inválido.', 'error')
-        return render_template('inscricao.html', vaga=vaga)
-    
-    # Validar nome
-    if len(nome) < 3:
-        flash('Nome inválido.', 'error')
+    # Validar email e nome (mesmas regras da importação em lote)
+    erro = validar_candidato(nome, email)
+    if erro:
+        flash(erro, 'error')
         return render_template('inscricao.html', vaga=vaga)
     
-    # Processar upload do currículo
+    # Processar upload do currículo (armazenado uma vez por conteúdo)
     arquivo = request.files['curriculo']
-    nome_arquivo = ''
+    armazenado = {'nome': '', 'hash': None, 'extensao': None, 'tamanho': None, 'mime': None}
     
     if arquivo and allowed_file(arquivo.filename):
         ext = arquivo.filename.rsplit('.', 1)[1].lower()
-        nome_arquivo = f"{nome.replace(' ', '_')}_{vaga.id}_{uuid.uuid4().hex[:6]}.{ext}"
-        arquivo.save(os.path.join(app.config['UPLOAD_FOLDER'], nome_arquivo))
+        armazenado = salvar_curriculo(arquivo, ext)
     
     candidato = Candidato(
         nome=nome,
         email=email,
         telefone=telefone,
         linkedin=linkedin,
-        arquivo_curriculo=nome_arquivo,
+        arquivo_curriculo=armazenado['nome'],
+        arquivo_hash=armazenado['hash'],
+        arquivo_tamanho=armazenado['tamanho'],
+        arquivo_mime=armazenado['mime'],
         expectativa_salario=expectativa_salario,
         vaga_id=vaga.id,
         status='pendente'
     )
     
     db.session.add(candidato)
-    db.session.commit()
+    db.session.flush()
+    indexar_candidatos([candidato.id])
     
-    # Enviar email de confirmação
-    try:
-        msg = Message(
-            subject=f"Confirmação de Candidatura - {vaga.titulo}",
-            recipients=[email],
-            body=f"""Olá {nome}!
+    # Email de confirmação vai para a outbox na mesma transação do candidato
+    enfileirar_email(
+        destinatario=email,
+        assunto=f"Confirmação de Candidatura - {vaga.titulo}",
+        corpo=f"""Olá {nome}!
 
 Obrigado por se candidatar à vaga de {vaga.titulo} na Talentos Budel.
 
@@ -320,10 +388,12 @@ Recebemos sua inscrição com sucesso! Nossa equipe de Recursos Humanos analisar
 Atenciosamente,
 Equipe Talentos Budel
 """
-        )
-        mail.send(msg)
-    except:
-        pass  # Se email falhar, continua normalmente
+    )
+    
+    db.session.commit()
+    invalidar_kpis()
+    notificar_enviador()
+    enfileirar_extracao(armazenado['hash'], armazenado['extensao'])
     
     flash('Candidatura realizada com sucesso! Verifique seu email para confirmação.', 'success')
     return render_template('inscricao_sucesso.html', vaga=vaga)
@@ -333,64 +403,369 @@ Equipe Talentos Budel
 @app.route('/candidatos/vaga/<int:vaga_id>')
 @login_required
 def candidatos_por_vaga(vaga_id):
-    vaga = Vaga.query.get_or_404(vaga_id)
-    candidatos = Candidato.query.filter_by(vaga_id=vaga_id).order_by(Candidato.data_candidatura.desc()).all()
-    
-    return render_template('candidatos_vaga.html', vaga=vaga, candidatos=candidatos)
+    vaga = db.session.get(Vaga, vaga_id)
+    if vaga is None:
+        if db.session.get(VagaArquivada, vaga_id) is None:
+            abort(404)
+        return redirect(url_for('ver_vaga_arquivada', vaga_id=vaga_id))
+    ordem = request.args.get('ordem', '')
+    
+    pontos = subconsulta_afinidade(vaga_id) if ordem == 'afinidade' else None
+    afinidades = None
+    if pontos is not None:
+        # Afinidade TF-IDF com a vaga; sem termos em comum fica 0 e vale a data
+        afinidade = func.coalesce(pontos.c.afinidade, 0.0)
+        query = db.session.query(Candidato, afinidade.label('afinidade')).outerjoin(
+            pontos, pontos.c.id == Candidato.id).filter(Candidato.vaga_id == vaga_id)
+        candidatos = paginar_requisicao(query, (afinidade, Candidato.data_candidatura, Candidato.id),
+                                        chave=lambda linha: (linha.afinidade, linha[0].data_candidatura, linha[0].id))
+        afinidades = {linha[0].id: linha.afinidade for linha in candidatos.itens}
+        candidatos.itens = [linha[0] for linha in candidatos.itens]
+    else:
+        candidatos = paginar_requisicao(Candidato.query.filter_by(vaga_id=vaga_id),
+                                        (Candidato.data_candidatura, Candidato.id))
+    
+    stats = contagem_por_status(vaga_id)
+    
+    return render_template('candidatos_vaga.html', vaga=vaga, candidatos=candidatos,
+                           total=vaga.candidatos_count, stats=stats, ordem=ordem, afinidades=afinidades)
 
 @app.route('/candidatos/status/<int:id>', methods=['POST'])
 @login_required
+@repetir_se_bloqueado
 def atualizar_status_candidato(id):
     candidato = Candidato.query.get_or_404(id)
+    status_anterior = candidato.status
+    observacoes_anteriores = candidato.observacoes
     candidato.status = request.form['status']
     candidato.observacoes = sanitize_input(request.form.get('observacoes', ''))
+    if candidato.observacoes != observacoes_anteriores:
+        indexar_candidatos([id])
     
     db.session.commit()
+    invalidar_kpis()
+    if candidato.status != status_anterior:
+        registrar('status_alterado', 'candidato', id, {'de': status_anterior, 'para': candidato.status})
     flash('Status atualizado com sucesso!', 'success')
     
     return redirect(url_for('candidatos_por_vaga', vaga_id=candidato.vaga_id))
 
-@app.route('/banco-talentos')
+@app.route('/candidatos/lote', methods=['POST'])
 @login_required
-def banco_talentos():
-    busca = sanitize_input(request.args.get('busca', ''))
-    status_filter = request.args.get('status', '')
-    
-    query = Candidato.query
-    
-    if busca:
-        query = query.filter(
-            (Candidato.nome.contains(busca)) | 
-            (Candidato.vaga.has(Vaga.titulo.contains(busca)))
-        )
+@repetir_se_bloqueado
+def acao_lote_candidatos():
+    acao = request.form.get('acao', '')
+    voltar = caminho_local(request.form.get('voltar', '')) or url_for('banco_talentos')
+    resultado = {}
+    ids = []
+    for valor in request.form.getlist('ids'):
+        if valor.isdigit():
+            ids.append(int(valor))
+        else:
+            resultado[valor] = 'invalido'
+    ids = sorted(set(ids))
+    
+    status = 'banco_talentos' if acao == 'banco_talentos' else request.form.get('status', '')
+    if acao not in ('status', 'banco_talentos', 'excluir') or (acao != 'excluir' and status not in STATUS_CANDIDATO):
+        flash('Ação em lote inválida.', 'error')
+        return redirect(voltar)
+    
+    # Uma consulta por lote de ids para saber quais existem (e seus currículos)
+    existentes = {}
+    for lote in em_lotes(ids):
+        existentes.update(db.session.query(Candidato.id, Candidato.arquivo_hash).filter(Candidato.id.in_(lote)).all())
+    
+    # Tudo em uma transação, com UPDATE/DELETE ... WHERE id IN (...); os triggers
+    # mantêm contadores, histograma de status e índice de busca consistentes
+    encontrados = sorted(existentes)
+    if acao == 'excluir':
+        liberar_curriculos(existentes.values())
+        for lote in em_lotes(encontrados):
+            Candidato.query.filter(Candidato.id.in_(lote)).delete(synchronize_session=False)
+    else:
+        valores = {'status': status, 'data_atualizacao': datetime.utcnow()}
+        observacoes = sanitize_input(request.form.get('observacoes', ''))
+        if observacoes:
+            valores['observacoes'] = observacoes
+        for lote in em_lotes(encontrados):
+            Candidato.query.filter(Candidato.id.in_(lote)).update(valores, synchronize_session=False)
+        if observacoes:
+            indexar_candidatos(encontrados)
     
-    if status_filter:
-        query = query.filter_by(status=status_filter)
+    db.session.commit()
+    invalidar_kpis()
+    if acao == 'excluir':
+        coletar_orfaos_apos_commit()
+        registrar_varios('candidatos_excluidos', 'candidato', encontrados, {'lote': len(encontrados)})
+    else:
+        registrar_varios('status_alterado', 'candidato', encontrados, {'para': status, 'lote': len(encontrados)})
     
-    candidatos = query.order_by(Candidato.data_candidatura.desc()).all()
+    situacao = 'excluido' if acao == 'excluir' else 'atualizado'
+    for id_candidato in ids:
+        resultado[str(id_candidato)] = situacao if id_candidato in existentes else 'nao_encontrado'
+    totais = Counter(resultado.values())
     
-    stats = {
-        'pendente': Candidato.query.filter_by(status='pendente').count(),
-        'em_analise': Candidato.query.filter_by(status='em_analise').count(),
-        'aprovado': Candidato.query.filter_by(status='aprovado').count(),
-        'reprovado': Candidato.query.filter_by(status='reprovado').count(),
-        'banco_talentos': Candidato.query.filter_by(status='banco_talentos').count()
-    }
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'resultado': resultado, 'totais': totais})
     
-    return render_template('banco_talentos.html', candidatos=candidatos, stats=stats)
+    resumo = ', '.join(f'{total} {situacao.replace("_", " ")}' for situacao, total in sorted(totais.items()))
+    flash(f'Ação em lote concluída: {resumo or "nenhum candidato selecionado"}.', 'success' if encontrados else 'warning')
+    return redirect(voltar)
+
+@app.route('/banco-talentos')
+@login_required
+def banco_talentos():
+    busca = sanitize_input(request.args.get('busca', ''))
+    status_filter = request.args.get('status', '')
+    arquivo = request.args.get('arquivo') == '1'
+    
+    resultado = subconsulta_busca(busca) if busca and not arquivo else None
+    
+    if arquivo:
+        # Inclui os candidatos arquivados, na mesma ordem e com os mesmos filtros
+        candidatos = candidatos_com_arquivo(status_filter, busca)
+    elif resultado is not None:
+        # Busca textual no índice FTS5, ordenada por relevância (bm25)
+        query = db.session.query(Candidato, resultado.c.rank).join(
+            resultado, resultado.c.id == Candidato.id).options(joinedload(Candidato.vaga),
+                                                               joinedload(Candidato.vaga_arquivada))
+        if status_filter:
+            query = query.filter(Candidato.status == status_filter)
+        candidatos = paginar_requisicao(query, (resultado.c.rank, Candidato.id), descendente=False,
+                                        chave=lambda linha: (linha.rank, linha[0].id))
+        candidatos.itens = [linha[0] for linha in candidatos.itens]
+    else:
+        # vaga_arquivada: candidatos do banco de talentos cuja vaga foi para o arquivo
+        query = Candidato.query.options(joinedload(Candidato.vaga), joinedload(Candidato.vaga_arquivada))
+        if status_filter:
+            query = query.filter_by(status=status_filter)
+        candidatos = paginar_requisicao(query, (Candidato.data_candidatura, Candidato.id))
+    
+    # Totais lidos do histograma materializado (status_counts)
+    stats = contagem_por_status()
+    if arquivo:
+        for status, quantidade in contagem_arquivo_por_status().items():
+            stats[status] = stats.get(status, 0) + quantidade
+    
+    # Total sem consulta extra quando não há busca textual
+    total = None
+    if resultado is None and not (arquivo and busca):
+        total = stats.get(status_filter, 0) if status_filter else sum(stats.values())
+    
+    return render_template('banco_talentos.html', candidatos=candidatos, stats=stats, total=total,
+                           arquivo=arquivo)
 
 @app.route('/candidatos/ver/<int:id>')
 @login_required
 def ver_candidato(id):
     candidato = Candidato.query.get_or_404(id)
-    return render_template('ver_candidato.html', candidato=candidato)
+    # Para o banco de talentos, sugere as vagas abertas mais próximas do perfil
+    sugestoes = vagas_por_afinidade(candidato) if candidato.status == 'banco_talentos' else []
+    return render_template('ver_candidato.html', candidato=candidato, sugestoes=sugestoes)
+
+# ===== ARQUIVO (SOMENTE LEITURA) =====
+
+@app.route('/vagas/arquivo/<int:vaga_id>')
+@login_required
+def ver_vaga_arquivada(vaga_id):
+    vaga = VagaArquivada.query.get_or_404(vaga_id)
+    candidatos = paginar_requisicao(CandidatoArquivado.query.filter_by(vaga_id=vaga_id),
+                                    (CandidatoArquivado.data_candidatura, CandidatoArquivado.id))
+    return render_template('vaga_arquivada.html', vaga=vaga, candidatos=candidatos)
+
+@app.route('/candidatos/arquivo/<int:id>')
+@login_required
+def ver_candidato_arquivado(id):
+    candidato = CandidatoArquivado.query.get_or_404(id)
+    return render_template('ver_candidato.html', candidato=candidato, sugestoes=[])
 
 @app.route('/download/<nome_arquivo>')
 @login_required
 def download_curriculo(nome_arquivo):
     # Validar nome do arquivo para evitar path traversal
     nome_arquivo = os.path.basename(nome_arquivo)
-    return send_from_directory(app.config['UPLOAD_FOLDER'], nome_arquivo, as_attachment=True)
+    relativo = caminho_arquivo(nome_arquivo)
+    caminho = safe_join(os.path.abspath(app.config['UPLOAD_FOLDER']), relativo)
+    if caminho is None or not os.path.isfile(caminho):
+        abort(404)
+    
+    # Arquivos endereçados por conteúdo nunca mudam: o próprio hash é um ETag forte
+    armazenado = NOME_ARMAZENADO.match(nome_arquivo)
+    etag = armazenado.group(1) if armazenado else True
+    ext = nome_arquivo.rsplit('.', 1)[-1].lower()
+    mimetype = MIME_POR_EXTENSAO.get(ext, 'application/octet-stream')
+    
+    if app.config['ARQUIVOS_SENDFILE'] == 'x-accel-redirect':
+        # O nginx entrega os bytes (e trata Range); aqui só validamos acesso e cache
+        resposta = Response(mimetype=mimetype)
+        resposta.headers['X-Accel-Redirect'] = app.config['ARQUIVOS_ACCEL_PREFIXO'] + relativo.replace(os.sep, '/')
+        resposta.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(nome_arquivo)}"
+        if armazenado:
+            resposta.set_etag(etag)
+        resposta = resposta.make_conditional(request)
+        if resposta.status_code == 304:
+            resposta.headers.pop('X-Accel-Redirect', None)
+    else:
+        # send_file responde 304 e Range; com USE_X_SENDFILE o proxy envia o arquivo
+        resposta = send_file(caminho, mimetype=mimetype, as_attachment=True,
+                             download_name=nome_arquivo, etag=etag, conditional=True)
+    
+    if armazenado:
+        resposta.cache_control.no_cache = None
+        resposta.cache_control.private = True
+        resposta.cache_control.max_age = app.config['ARQUIVOS_MAX_AGE']
+    if resposta.status_code != 304:
+        registrar('download_curriculo', 'arquivo', None, {'arquivo': nome_arquivo})
+    return resposta
+
+@app.route('/candidatos/vaga/<int:vaga_id>/curriculos.zip')
+@login_required
+def download_curriculos_vaga(vaga_id):
+    vaga = Vaga.query.get_or_404(vaga_id)
+    pasta = os.path.abspath(app.config['UPLOAD_FOLDER'])
+    
+    linhas = db.session.query(Candidato.id, Candidato.nome, Candidato.arquivo_curriculo).filter(
+        Candidato.vaga_id == vaga_id, Candidato.arquivo_curriculo != ''
+    ).order_by(Candidato.data_candidatura.desc(), Candidato.id.desc()).yield_per(200)
+    
+    def entradas():
+        for id_candidato, nome, arquivo in linhas:
+            caminho = safe_join(pasta, caminho_arquivo(arquivo))
+            if caminho is None or not os.path.isfile(caminho):
+                continue
+            ext = arquivo.rsplit('.', 1)[-1].lower()
+            nome_seguro = re.sub(r'[^\w\-]+', '_', nome).strip('_') or 'candidato'
+            yield f"{nome_seguro}_{id_candidato}.{ext}", ler_em_blocos(caminho)
+    
+    # ZIP montado em fluxo: memória constante e nenhum arquivo temporário
+    resposta = Response(stream_with_context(gerar_zip(entradas())), mimetype='application/zip')
+    resposta.headers['Content-Disposition'] = f'attachment; filename="curriculos_vaga_{vaga.id}.zip"'
+    registrar('download_curriculos', 'vaga', vaga.id)
+    return resposta
+
+# ===== EXPORTAÇÃO =====
+
+def _resposta_exportacao(query, nome_base, vaga_id=None):
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        abort(400)
+    registrar('exportacao', 'vaga' if vaga_id else None, vaga_id, dict(request.args))
+    gerar, mimetype = FORMATOS[formato]
+    resposta = Response(stream_with_context(gerar(query)), mimetype=mimetype)
+    nome = f"{nome_base}_{datetime.now().strftime('%Y%m%d_%H%M')}.{formato}"
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return resposta
+
+@app.route('/banco-talentos/exportar')
+@login_required
+def exportar_banco_talentos():
+    # Mesmos filtros da listagem, mas sem paginação: todas as linhas, em fluxo
+    busca = sanitize_input(request.args.get('busca', ''))
+    status_filter = request.args.get('status', '')
+    
+    query = consulta_exportacao()
+    if status_filter:
+        query = query.filter(Candidato.status == status_filter)
+    
+    resultado = subconsulta_busca(busca) if busca else None
+    if resultado is not None:
+        query = query.join(resultado, resultado.c.id == Candidato.id).order_by(resultado.c.rank, Candidato.id)
+    else:
+        query = query.order_by(Candidato.data_candidatura.desc(), Candidato.id.desc())
+    
+    return _resposta_exportacao(query, 'banco_talentos')
+
+@app.route('/candidatos/vaga/<int:vaga_id>/exportar')
+@login_required
+def exportar_candidatos_vaga(vaga_id):
+    vaga = Vaga.query.get_or_404(vaga_id)
+    query = consulta_exportacao(Candidato.vaga_id == vaga.id).order_by(
+        Candidato.data_candidatura.desc(), Candidato.id.desc())
+    return _resposta_exportacao(query, f'candidatos_vaga_{vaga.id}', vaga_id=vaga.id)
+
+# ===== API JSON =====
+
+def api_login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not verificar_admin():
+            return jsonify({'erro': 'Autenticação necessária.'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _resposta_api_pagina(query, definicoes, campos, chaves):
+    """Pagina a consulta por colunas e monta o JSON com os cursores"""
+    pagina = paginar_requisicao(query, chaves, chave=chave_linha)
+    return {
+        'itens': serializar(pagina.itens, definicoes, campos),
+        'paginacao': dict(
+            pagina.to_dict(),
+            proximo=url_pagina(apos=pagina.proximo_cursor) if pagina.proximo_cursor else None,
+            anterior=url_pagina(antes=pagina.anterior_cursor) if pagina.anterior_cursor else None
+        )
+    }
+
+@app.route('/api/vagas')
+def api_vagas():
+    # Sem login, apenas vagas ativas e campos públicos (site de carreiras)
+    publica = not verificar_admin()
+    filtros = []
+    if publica:
+        filtros.append(Vaga.status == 'ativa')
+    elif request.args.get('status'):
+        filtros.append(Vaga.status == request.args['status'])
+    
+    try:
+        campos = escolher_campos(CAMPOS_VAGA, CAMPOS_VAGA_PUBLICOS if publica else None)
+    except CampoInvalido as erro:
+        return jsonify({'erro': str(erro)}), 400
+    
+    chaves = (Vaga.data_criacao, Vaga.id)
+    return resposta_condicional(
+        impressao_vagas(*filtros),
+        lambda: _resposta_api_pagina(
+            db.session.query(*colunas_consulta(CAMPOS_VAGA, campos, chaves)).filter(*filtros),
+            CAMPOS_VAGA, campos, chaves
+        ),
+        publica=publica
+    )
+
+def _api_candidatos(filtros):
+    if request.args.get('status'):
+        filtros.append(Candidato.status == request.args['status'])
+    
+    try:
+        campos = escolher_campos(CAMPOS_CANDIDATO)
+    except CampoInvalido as erro:
+        return jsonify({'erro': str(erro)}), 400
+    
+    chaves = (Candidato.data_candidatura, Candidato.id)
+    query = db.session.query(*colunas_consulta(CAMPOS_CANDIDATO, campos, chaves)).filter(*filtros)
+    if 'vaga_titulo' in campos:
+        query = query.outerjoin(Vaga, Vaga.id == Candidato.vaga_id)
+    
+    return resposta_condicional(
+        impressao_candidatos(*filtros, com_vaga='vaga_titulo' in campos),
+        lambda: _resposta_api_pagina(query, CAMPOS_CANDIDATO, campos, chaves)
+    )
+
+@app.route('/api/vagas/<int:vaga_id>/candidatos')
+@api_login_required
+def api_candidatos_vaga(vaga_id):
+    if not db.session.query(Vaga.id).filter_by(id=vaga_id).first():
+        return jsonify({'erro': 'Vaga não encontrada.'}), 404
+    return _api_candidatos([Candidato.vaga_id == vaga_id])
+
+@app.route('/api/candidatos')
+@api_login_required
+def api_candidatos():
+    filtros = []
+    if request.args.get('vaga_id'):
+        vaga_id = request.args.get('vaga_id', type=int)
+        if vaga_id is None:
+            return jsonify({'erro': 'vaga_id deve ser um número inteiro.'}), 400
+        filtros.append(Candidato.vaga_id == vaga_id)
+    return _api_candidatos(filtros)
 
 # ===== MANUTENÇÃO (MASTER) =====
 
@@ -401,7 +776,10 @@ def manutencao():
         flash('Acesso restrito ao usuário master.', 'error')
         return redirect(url_for('login'))
     
-    return render_template('manutencao.html')
+    vagas = db.session.query(Vaga.id, Vaga.titulo).order_by(Vaga.titulo).all()
+    return render_template('manutencao.html', backup=ultima_tarefa('backup'),
+                           importacao=ultima_tarefa('importacao'), extracao=ultima_tarefa('extracao'),
+                           arquivamento=ultima_tarefa('arquivamento'), vagas=vagas)
 
 @app.route('/manutencao/backup')
 @login_required
@@ -410,18 +788,168 @@ def backup_banco():
         flash('Acesso restrito ao usuário master.', 'error')
         return redirect(url_for('login'))
     
-    import shutil
-    from datetime import datetime
+    # O backup roda em segundo plano; o progresso aparece em /manutencao
+    incluir_uploads = request.args.get('uploads') == '1'
+    tarefa = iniciar_tarefa('backup', executar_backup, incluir_uploads=incluir_uploads)
+    registrar('backup', 'backup', None, {'tarefa': tarefa.id, 'uploads': incluir_uploads})
+    
+    flash('Backup iniciado. Acompanhe o progresso abaixo.', 'success')
+    return redirect(url_for('manutencao'))
+
+@app.route('/manutencao/backup/status')
+@login_required
+def backup_status():
+    if not verificar_master():
+        return jsonify({'erro': 'Acesso restrito ao usuário master.'}), 403
+    
+    tarefa = ultima_tarefa('backup')
+    return jsonify(tarefa.to_dict() if tarefa else {})
+
+@app.route('/manutencao/extrair-textos')
+@login_required
+def extrair_textos():
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
+    
+    # Roda em segundo plano com um processo por núcleo; o progresso aparece em /manutencao
+    refazer = request.args.get('refazer') == '1'
+    tarefa = iniciar_tarefa('extracao', executar_extracao, refazer=refazer)
+    registrar('extracao_textos', None, None, {'tarefa': tarefa.id, 'refazer': refazer})
+    
+    flash('Extração de textos iniciada. Acompanhe o progresso abaixo.', 'success')
+    return redirect(url_for('manutencao'))
+
+@app.route('/manutencao/extrair-textos/status')
+@login_required
+def extracao_status():
+    if not verificar_master():
+        return jsonify({'erro': 'Acesso restrito ao usuário master.'}), 403
+    
+    tarefa = ultima_tarefa('extracao')
+    return jsonify(tarefa.to_dict() if tarefa else {})
+
+@app.route('/manutencao/arquivar-vagas')
+@login_required
+def arquivar_vagas():
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
+    
+    # Encerra as vagas vencidas e arquiva as antigas em segundo plano
+    tarefa = iniciar_tarefa('arquivamento', executar_ciclo)
+    registrar('arquivamento', None, None, {'tarefa': tarefa.id, 'dias': app.config['ARQUIVAMENTO_DIAS']})
+    
+    flash('Ciclo de vagas iniciado. Acompanhe o progresso abaixo.', 'success')
+    return redirect(url_for('manutencao'))
+
+@app.route('/manutencao/arquivar-vagas/status')
+@login_required
+def arquivamento_status():
+    if not verificar_master():
+        return jsonify({'erro': 'Acesso restrito ao usuário master.'}), 403
+    
+    tarefa = ultima_tarefa('arquivamento')
+    return jsonify(tarefa.to_dict() if tarefa else {})
+
+@app.route('/manutencao/reindexar-busca')
+@login_required
+def reindexar_busca():
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
+    
+    garantir_indice_busca()
+    with db.engine.begin() as conexao:
+        reconstruir_indice_busca(conexao)
     
-    if not os.path.exists('backups'):
-        os.makedirs('backups')
+    flash('Índice de busca reconstruído com sucesso!', 'success')
+    return redirect(url_for('manutencao'))
+
+@app.route('/manutencao/recalcular-contagens')
+@login_required
+def recalcular_contagens_status():
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
     
-    backup_name = f"backup_talentos_budel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-    shutil.copy('talentos_budel.db', f"backups/{backup_name}")
+    divergencias = recalcular_contagens()
     
-    flash(f'Backup realizado: {backup_name}', 'success')
+    if divergencias:
+        detalhes = '; '.join(
+            f"vaga {d['vaga_id']} / {d['status']}: {d['registrado']} -> {d['real']}" for d in divergencias[:10]
+        )
+        flash(f'Contagens recalculadas. {len(divergencias)} divergência(s) corrigida(s): {detalhes}', 'warning')
+    else:
+        flash('Contagens recalculadas. Nenhuma divergência encontrada.', 'success')
     return redirect(url_for('manutencao'))
 
+@app.route('/manutencao/importar', methods=['POST'])
+@login_required
+def importar_csv():
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
+    
+    tipo = request.form.get('tipo', 'candidatos')
+    arquivo = request.files.get('arquivo')
+    if tipo not in IMPORTADORES or not arquivo or not arquivo.filename.lower().endswith('.csv'):
+        flash('Selecione um arquivo CSV para importar.', 'error')
+        return redirect(url_for('manutencao'))
+    
+    atual = ultima_tarefa('importacao')
+    if atual and atual.status == 'executando':
+        flash('Já existe uma importação em andamento.', 'warning')
+        return redirect(url_for('manutencao'))
+    
+    opcoes = {}
+    if tipo == 'candidatos' and request.form.get('vaga_id'):
+        opcoes['vaga_id'] = Vaga.query.get_or_404(request.form.get('vaga_id', type=int)).id
+    
+    # O arquivo vai para disco e é processado em segundo plano (removido ao final)
+    os.makedirs(app.config['TAREFAS_PASTA'], exist_ok=True)
+    caminho = os.path.join(app.config['TAREFAS_PASTA'], f'importacao_{uuid.uuid4().hex}.upload')
+    arquivo.save(caminho)
+    tarefa = iniciar_tarefa('importacao', IMPORTADORES[tipo], caminho, **opcoes)
+    if not tarefa.criada:
+        # Outra importação começou entre a verificação acima e o início desta
+        os.remove(caminho)
+        flash('Já existe uma importação em andamento.', 'warning')
+        return redirect(url_for('manutencao'))
+    registrar('importacao', 'vaga' if opcoes else None, opcoes.get('vaga_id'),
+              {'tarefa': tarefa.id, 'tipo': tipo, 'arquivo': arquivo.filename})
+    
+    flash('Importação iniciada. Acompanhe o progresso abaixo.', 'success')
+    return redirect(url_for('manutencao'))
+
+@app.route('/manutencao/importar/status')
+@login_required
+def importacao_status():
+    if not verificar_master():
+        return jsonify({'erro': 'Acesso restrito ao usuário master.'}), 403
+    
+    tarefa = ultima_tarefa('importacao')
+    return jsonify(tarefa.to_dict() if tarefa else {})
+
+@app.route('/manutencao/importar/<id>/erros.csv')
+@login_required
+def importacao_erros(id):
+    if not verificar_master():
+        flash('Acesso restrito ao usuário master.', 'error')
+        return redirect(url_for('login'))
+    
+    caminho = caminho_relatorio(id)
+    if not os.path.isfile(caminho):
+        abort(404)
+    return send_file(os.path.abspath(caminho), mimetype='text/csv', as_attachment=True,
+                     download_name=f'erros_importacao_{os.path.basename(id)}.csv')
+
+def _data_filtro(campo):
+    try:
+        return datetime.strptime(request.args.get(campo, ''), '%Y-%m-%d')
+    except ValueError:
+        return None
+
 @app.route('/manutencao/logs')
 @login_required
 def ver_logs():
@@ -429,11 +957,37 @@ def ver_logs():
         flash('Acesso restrito ao usuário master.', 'error')
         return redirect(url_for('login'))
     
-    logs = [
-        {'data': '2024-01-15 10:30:00', 'acao': 'Login', 'usuario': 'admin@budel.com.br'},
-        {'data': '2024-01-15 10:35:00', 'acao': 'Criar vaga', 'usuario': 'admin@budel.com.br'},
-        {'data': '2024-01-15 11:00:00', 'acao': 'Candidatura', 'usuario': 'João Silva'},
-        {'data': '2024-01-15 11:15:00', 'acao': 'Atualizar status', 'usuario': 'rh@budel.com.br'},
-    ]
-    
-    return render_template('logs.html', logs=logs)
+    # Filtros por igualdade para aproveitar os índices (ator, data) e (entidade, entidade_id, data)
+    query = RegistroAuditoria.query
+    ator = request.args.get('ator', '').strip()
+    if ator:
+        query = query.filter(RegistroAuditoria.ator == ator)
+    acao = request.args.get('acao', '')
+    if acao:
+        query = query.filter(RegistroAuditoria.acao == acao)
+    entidade = request.args.get('entidade', '')
+    if entidade:
+        query = query.filter(RegistroAuditoria.entidade == entidade)
+        entidade_id = request.args.get('entidade_id', type=int)
+        if entidade_id is not None:
+            query = query.filter(RegistroAuditoria.entidade_id == entidade_id)
+    de = _data_filtro('de')
+    if de:
+        query = query.filter(RegistroAuditoria.data >= de)
+    ate = _data_filtro('ate')
+    if ate:
+        query = query.filter(RegistroAuditoria.data < ate + timedelta(days=1))
+    
+    logs = paginar_requisicao(query, (RegistroAuditoria.data, RegistroAuditoria.id))
+    return render_template('logs.html', logs=logs, acoes=ACOES)
+
+@app.route('/manutencao/metrics')
+def metricas_prometheus():
+    # Sessão do master ou, para o coletor do Prometheus, Authorization: Bearer METRICAS_TOKEN
+    token = app.config['METRICAS_TOKEN']
+    cabecalho = request.headers.get('Authorization', '')
+    autorizado_por_token = bool(token) and hmac.compare_digest(cabecalho.encode(), f'Bearer {token}'.encode())
+    if not verificar_master() and not autorizado_por_token:
+        return Response('Acesso restrito ao usuário master.\n', status=403, mimetype='text/plain')
+    
+    return Response(gerar_texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
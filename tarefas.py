@@ -0,0 +1,220 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from app import app, db
+
+logger = logging.getLogger(__name__)
+
+# Tarefas em segundo plano da manutenção (backup, importação, ...).
+# O estado vai para um JSON por tarefa, visível por todos os workers do gunicorn.
+# Enquanto roda, a tarefa mantém um flock em <tipo>_<id>.lock: o kernel o solta se o
+# processo morrer (timeout do gunicorn, deploy, comando interrompido), e a tarefa passa
+# a constar como interrompida. Sem atualização há TAREFAS_SEM_SINAL segundos, também.
+# O início é serializado entre processos por um flock em <tipo>.lock.
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+def _pasta():
+    pasta = app.config['TAREFAS_PASTA']
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+def _travar(caminho, esperar=True, criar=True):
+    """flock exclusivo no arquivo; retorna o descritor, ou None se outro o detém e esperar=False.
+
+    Com criar=False (só para sondar) o arquivo não é recriado: FileNotFoundError se não existe.
+    """
+    descritor = os.open(caminho, os.O_CREAT | os.O_RDWR if criar else os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(descritor, fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(descritor)
+        return None
+    return descritor
+
+def _soltar(descritor):
+    fcntl.flock(descritor, fcntl.LOCK_UN)
+    os.close(descritor)
+
+class Tarefa:
+    """Estado de uma tarefa em execução, gravado em disco a cada atualização"""
+
+    def __init__(self, tipo, id=None, status='executando', progresso=0, mensagem='',
+                 resultado=None, inicio=None, fim=None, pid=None, atualizado=None):
+        self.id = id or uuid.uuid4().hex[:12]
+        self.tipo = tipo
+        self.status = status  # executando, concluida, erro
+        self.progresso = progresso
+        self.mensagem = mensagem
+        self.resultado = resultado or {}
+        self.inicio = inicio or datetime.now().strftime(FORMATO_DATA)
+        self.fim = fim
+        self.pid = pid if id else os.getpid()
+        self.atualizado = atualizado or self.inicio  # último sinal de vida
+        self.criada = id is None  # criada agora por este processo, não lida do disco
+
+    @property
+    def caminho(self):
+        return os.path.join(_pasta(), f'{self.tipo}_{self.id}.json')
+
+    @property
+    def caminho_trava(self):
+        return os.path.join(_pasta(), f'{self.tipo}_{self.id}.lock')
+
+    def atualizar(self, progresso=None, mensagem=None, **resultado):
+        if progresso is not None:
+            self.progresso = round(min(max(progresso, 0), 100), 1)
+        if mensagem is not None:
+            self.mensagem = mensagem
+        self.resultado.update(resultado)
+        self.atualizado = datetime.now().strftime(FORMATO_DATA)
+        self.salvar()
+
+    def motivo_interrupcao(self):
+        """Por que uma tarefa 'executando' não está mais viva, ou None se está"""
+        if self.status != 'executando':
+            return None
+        try:
+            trava = _travar(self.caminho_trava, esperar=False, criar=False)
+            viva = trava is None
+            if trava is not None:
+                _soltar(trava)
+        except FileNotFoundError:
+            # A trava é apagada logo depois que o estado final é gravado: relê o JSON.
+            # Ainda 'executando' sem trava, só se o processo morreu antes de criá-la.
+            with open(self.caminho, encoding='utf-8') as arquivo:
+                self.__dict__.update(json.load(arquivo))
+            if self.status != 'executando':
+                return None
+            viva = False
+        if not viva:
+            processo = f'o processo {self.pid}' if self.pid else 'o processo'
+            return f'Interrompida: {processo} terminou sem concluir a tarefa'
+        limite = datetime.now() - timedelta(seconds=app.config['TAREFAS_SEM_SINAL'])
+        if datetime.strptime(self.atualizado, FORMATO_DATA) < limite:
+            return f'Interrompida: sem atualização desde {self.atualizado}'
+        return None
+
+    def salvar(self):
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.to_dict(), arquivo, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'status': self.status,
+            'progresso': self.progresso,
+            'mensagem': self.mensagem,
+            'resultado': self.resultado,
+            'inicio': self.inicio,
+            'fim': self.fim,
+            'pid': self.pid,
+            'atualizado': self.atualizado
+        }
+
+def obter_tarefa(tipo, id):
+    caminho = os.path.join(_pasta(), f'{tipo}_{os.path.basename(id)}.json')
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return Tarefa(**json.load(arquivo))
+
+def _arquivos_tarefas(tipo):
+    """JSONs das tarefas do tipo, do mais recente para o mais antigo"""
+    arquivos = [
+        os.path.join(_pasta(), nome) for nome in os.listdir(_pasta())
+        if nome.startswith(f'{tipo}_') and nome.endswith('.json')
+    ]
+    return sorted(arquivos, key=os.path.getmtime, reverse=True)
+
+def ultima_tarefa(tipo):
+    """Tarefa mais recente do tipo (em qualquer worker), ou None.
+
+    Uma tarefa que consta como em execução mas cujo processo morreu (ou parou de dar
+    sinal) é devolvida como erro.
+    """
+    arquivos = _arquivos_tarefas(tipo)
+    if not arquivos:
+        return None
+    with open(arquivos[0], encoding='utf-8') as arquivo:
+        tarefa = Tarefa(**json.load(arquivo))
+    motivo = tarefa.motivo_interrupcao()
+    if motivo:
+        tarefa.status = 'erro'
+        tarefa.mensagem = motivo
+    return tarefa
+
+def _podar(tipo):
+    """Remove os arquivos das tarefas antigas, mantendo as TAREFAS_MANTER mais recentes"""
+    for caminho in _arquivos_tarefas(tipo)[app.config['TAREFAS_MANTER']:]:
+        base = caminho[:-len('.json')]
+        for arquivo in [caminho, base + '.lock', *glob.glob(glob.escape(base) + '_*')]:
+            try:
+                os.remove(arquivo)
+            except FileNotFoundError:
+                pass
+
+def _reservar(tipo):
+    """Cria a tarefa se nenhuma do tipo está viva: (tarefa, trava), ou (tarefa em execução, None)"""
+    trava_tipo = _travar(os.path.join(_pasta(), f'{tipo}.lock'))
+    try:
+        atual = ultima_tarefa(tipo)
+        if atual and atual.status == 'executando':
+            return atual, None
+        if atual and atual.fim is None and atual.status == 'erro':
+            # Registra a interrupção detectada, para não depender da trava depois da poda
+            atual.fim = datetime.now().strftime(FORMATO_DATA)
+            atual.salvar()
+
+        tarefa = Tarefa(tipo)
+        trava = _travar(tarefa.caminho_trava)
+        tarefa.salvar()
+        _podar(tipo)
+        return tarefa, trava
+    finally:
+        _soltar(trava_tipo)
+
+def _executar(tarefa, trava, funcao, args, kwargs):
+    with app.app_context():
+        try:
+            funcao(tarefa, *args, **kwargs)
+            tarefa.status = 'concluida'
+            tarefa.progresso = 100
+        except Exception as erro:
+            logger.error('Tarefa %s falhou: %s', tarefa.tipo, traceback.format_exc())
+            tarefa.status = 'erro'
+            tarefa.mensagem = str(erro)
+        finally:
+            tarefa.fim = datetime.now().strftime(FORMATO_DATA)
+            tarefa.salvar()
+            db.session.remove()
+            os.remove(tarefa.caminho_trava)
+            _soltar(trava)
+
+def iniciar_tarefa(tipo, funcao, *args, **kwargs):
+    """Executa funcao(tarefa, *args) em uma thread com contexto da aplicação.
+
+    Se já existe uma tarefa do mesmo tipo em execução (em qualquer processo), ela é
+    retornada no lugar, com criada=False.
+    """
+    tarefa, trava = _reservar(tipo)
+    if trava is not None:
+        threading.Thread(target=_executar, args=(tarefa, trava, funcao, args, kwargs),
+                         name=f'tarefa-{tipo}', daemon=True).start()
+    return tarefa
+
+def executar_tarefa(tipo, funcao, *args, **kwargs):
+    """Como iniciar_tarefa, mas na thread atual (comandos de linha de comando)"""
+    tarefa, trava = _reservar(tipo)
+    if trava is not None:
+        _executar(tarefa, trava, funcao, args, kwargs)
+    return tarefa
@@ -0,0 +1,66 @@
+"""Banco sintético compartilhado pelos testes (o mesmo gerador do benchmark)."""
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+def _intercalar(db, quente, arquivo, coluna):
+    """Alterna linhas quentes e arquivadas no topo da ordem por data (no futuro, acima do que
+    os testes criarem), para que a primeira página das listagens com ?arquivo=1 misture os dois"""
+    topo = datetime.utcnow() + timedelta(days=1)
+    quentes = [id for id, in db.session.query(quente.id).order_by(quente.id).limit(3)]
+    arquivados = [id for id, in db.session.query(arquivo.id).order_by(arquivo.id).limit(3)]
+    for posicao, (id_quente, id_arquivado) in enumerate(zip(quentes, arquivados)):
+        db.session.query(quente).filter_by(id=id_quente).update({coluna: topo - timedelta(minutes=2 * posicao)})
+        db.session.query(arquivo).filter_by(id=id_arquivado).update({coluna: topo - timedelta(minutes=2 * posicao + 1)})
+    db.session.commit()
+
+@pytest.fixture(scope='session')
+def contexto(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('budel')
+    os.environ.update({
+        'DATABASE_PATH': str(pasta / 'testes.db'),
+        'UPLOAD_FOLDER': str(pasta / 'uploads'),
+        'TAREFAS_PASTA': str(pasta / 'tarefas'),
+        'BACKUP_PASTA': str(pasta / 'backups'),
+        'CACHE_PAGINAS_ARQUIVO': str(pasta / 'cache_paginas.db'),
+        'METRICAS_PASTA': str(pasta / 'metricas'),
+        'TEMPLATES_BYTECODE_PASTA': str(pasta / 'bytecode_templates'),
+        'OUTBOX_THREAD': 'False',
+        'AUDITORIA_THREAD': 'False',
+        'EXTRACAO_AUTOMATICA': 'False',
+    })
+    from app import app, db
+    from arquivamento import arquivar_vaga
+    from benchmark.dados import gerar_dados
+    from models import Vaga, VagaArquivada, Candidato, CandidatoArquivado
+    with app.app_context():
+        dados = gerar_dados(vagas=60, candidatos=600, usuarios=3, curriculos=5)
+        # As vagas com mais candidatos (fora as usadas nos testes) vão para o arquivo, e os
+        # candidatos do banco de talentos ficam
+        dados['vagas_arquivadas'] = [id for id, in db.session.query(Vaga.id).filter(
+            Vaga.id.notin_([dados['vaga_id'], dados['vaga_pequena_id']]),
+            Vaga.link_inscricao != dados['link_ativo']).order_by(Vaga.candidatos_count.desc()).limit(3)]
+        for vaga_id in dados['vagas_arquivadas']:
+            arquivar_vaga(vaga_id)
+        _intercalar(db, Vaga, VagaArquivada, 'data_criacao')
+        _intercalar(db, Candidato, CandidatoArquivado, 'data_candidatura')
+        db.session.remove()
+    return dados
+
+@pytest.fixture
+def app(contexto):
+    from app import app
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def cliente(app):
+    from benchmark.dados import EMAIL_MASTER, SENHA_MASTER
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data={'email': EMAIL_MASTER, 'senha': SENHA_MASTER})
+    assert resposta.status_code == 302
+    return cliente
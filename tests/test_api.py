@@ -0,0 +1,58 @@
+"""GET condicional da API: 200, 304 com o mesmo ETag e 200 de novo quando a coleção muda."""
+
+def _nova_vaga(db, link, **campos):
+    from models import Vaga
+    vaga = Vaga(titulo='Vaga da API', descricao='d', link_inscricao=link, **campos)
+    db.session.add(vaga)
+    db.session.commit()
+    return vaga
+
+def test_vagas_publicas_200_304_e_invalidacao(app):
+    from app import db
+    vaga = _nova_vaga(db, 'api-publica')
+    publico = app.test_client()
+
+    primeira = publico.get('/api/vagas')
+    assert primeira.status_code == 200 and primeira.headers.get('ETag')
+    repetida = publico.get('/api/vagas', headers={'If-None-Match': primeira.headers['ETag']})
+    assert repetida.status_code == 304
+
+    # A vaga sai do filtro público: a maior data_atualizacao das que restam não muda
+    vaga.status = 'encerrada'
+    db.session.commit()
+    for cabecalhos in ({'If-None-Match': primeira.headers['ETag']},
+                       {'If-Modified-Since': primeira.headers['Last-Modified']}):
+        resposta = publico.get('/api/vagas', headers=cabecalhos)
+        assert resposta.status_code == 200
+        assert vaga.id not in [item['id'] for item in resposta.get_json()['itens']]
+
+def test_candidatos_invalidados_ao_renomear_a_vaga(cliente, contexto):
+    from app import db
+    from models import Vaga
+    url = f"/api/vagas/{contexto['vaga_pequena_id']}/candidatos"
+    primeira = cliente.get(url)
+    assert primeira.status_code == 200
+    assert cliente.get(url, headers={'If-None-Match': primeira.headers['ETag']}).status_code == 304
+
+    vaga = db.session.get(Vaga, contexto['vaga_pequena_id'])
+    vaga.titulo = vaga.titulo + ' (renomeada)'
+    db.session.commit()
+    resposta = cliente.get(url, headers={'If-None-Match': primeira.headers['ETag']})
+    assert resposta.status_code == 200
+    assert all(item['vaga_titulo'].endswith('(renomeada)') for item in resposta.get_json()['itens'])
+
+def test_candidatos_invalidados_ao_excluir(cliente, contexto):
+    from app import db
+    from models import Candidato
+    url = f"/api/candidatos?vaga_id={contexto['vaga_pequena_id']}&campos=id,nome"
+    primeira = cliente.get(url)
+    candidato = Candidato.query.filter_by(vaga_id=contexto['vaga_pequena_id']).order_by(Candidato.id).first()
+    db.session.delete(candidato)
+    db.session.commit()
+    resposta = cliente.get(url, headers={'If-None-Match': primeira.headers['ETag']})
+    assert resposta.status_code == 200
+
+def test_vaga_id_invalido(cliente):
+    resposta = cliente.get('/api/candidatos?vaga_id=abc')
+    assert resposta.status_code == 400
+    assert 'erro' in resposta.get_json()
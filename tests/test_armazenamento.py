@@ -0,0 +1,57 @@
+"""Currículos endereçados por conteúdo: contagem de referências e coleta de órfãos."""
+import io
+import os
+import time
+
+def _upload(conteudo):
+    from werkzeug.datastructures import FileStorage
+    return FileStorage(stream=io.BytesIO(conteudo), filename='cv.pdf')
+
+def _caminho(app, armazenado):
+    from armazenamento import caminho_arquivo
+    return os.path.join(app.config['UPLOAD_FOLDER'], caminho_arquivo(armazenado['nome']))
+
+def test_mesmo_conteudo_um_arquivo_e_referencias(app):
+    from app import db
+    from models import ArquivoCurriculo
+    from armazenamento import salvar_curriculo, liberar_curriculos, coletar_orfaos
+    conteudo = b'%PDF-1.4 referencias ' + os.urandom(16)
+    primeiro = salvar_curriculo(_upload(conteudo), 'pdf')
+    segundo = salvar_curriculo(_upload(conteudo), 'pdf')
+    db.session.commit()
+    assert primeiro == segundo and primeiro['mime'] == 'application/pdf'
+    assert db.session.get(ArquivoCurriculo, primeiro['hash']).referencias == 2
+
+    liberar_curriculos([primeiro['hash']])
+    db.session.commit()
+    coletar_orfaos()
+    assert os.path.exists(_caminho(app, primeiro))
+
+    liberar_curriculos([primeiro['hash'], None])
+    db.session.commit()
+    assert coletar_orfaos() == 1
+    db.session.expire_all()
+    assert db.session.get(ArquivoCurriculo, primeiro['hash']) is None
+    assert not os.path.exists(_caminho(app, primeiro))
+
+def test_varredura_remove_arquivo_de_inscricao_desfeita(app):
+    from app import db
+    from armazenamento import salvar_curriculo, varrer_disco, TEMPORARIOS_MAX_IDADE
+    mantido = salvar_curriculo(_upload(b'%PDF-1.4 mantido ' + os.urandom(16)), 'pdf')
+    db.session.commit()
+    desfeito = salvar_curriculo(_upload(b'%PDF-1.4 desfeito ' + os.urandom(16)), 'pdf')
+    db.session.rollback()
+    assert os.path.exists(_caminho(app, desfeito))
+
+    pasta_temp = os.path.join(app.config['UPLOAD_FOLDER'], 'tmp')
+    abandonado = os.path.join(pasta_temp, 'abandonado')
+    recente = os.path.join(pasta_temp, 'recente')
+    for caminho in (abandonado, recente):
+        open(caminho, 'wb').close()
+    antigo = time.time() - TEMPORARIOS_MAX_IDADE - 60
+    os.utime(abandonado, (antigo, antigo))
+
+    assert varrer_disco() == 2
+    assert not os.path.exists(_caminho(app, desfeito)) and not os.path.exists(abandonado)
+    assert os.path.exists(_caminho(app, mantido)) and os.path.exists(recente)
+    os.remove(recente)
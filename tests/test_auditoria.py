@@ -0,0 +1,22 @@
+def test_ip_nao_vem_do_x_forwarded_for_do_cliente(app):
+    from auditoria import _evento
+    with app.test_request_context('/', environ_base={'REMOTE_ADDR': '10.0.0.7'},
+                                  headers={'X-Forwarded-For': '1.2.3.4'}):
+        assert _evento('teste', None, None, None, 'ator', 1)['ip'] == '10.0.0.7'
+
+def test_ip_do_proxy_confiavel(app):
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    from werkzeug.test import Client
+    from auditoria import _evento
+    ips = []
+
+    def aplicacao(environ, start_response):
+        with app.request_context(environ):
+            ips.append(_evento('teste', None, None, None, 'ator', 1)['ip'])
+        start_response('204 No Content', [])
+        return []
+
+    # Um salto: o último endereço da lista é o que o proxy viu; o primeiro foi forjado
+    Client(ProxyFix(aplicacao, x_for=1)).get('/', environ_base={'REMOTE_ADDR': '10.0.0.1'},
+                                             headers={'X-Forwarded-For': '6.6.6.6, 200.1.1.1'})
+    assert ips == ['200.1.1.1']
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+import time
+
+class Progresso:
+    def __init__(self):
+        self.copiadas = []
+
+    def atualizar(self, progresso, mensagem):
+        self.copiadas.append(progresso)
+
+def test_backup_nao_recomeca_com_escritas_concorrentes(app, tmp_path, monkeypatch):
+    """Sem o instantâneo único, cada escrita recomeçaria a cópia em passos"""
+    import backup
+    monkeypatch.setitem(app.config, 'BACKUP_PAGINAS_POR_PASSO', 5)
+    monkeypatch.setitem(app.config, 'BACKUP_PAUSA', 0.002)
+    caminho = backup._caminho_banco()
+    parar = threading.Event()
+    escritas = threading.Event()
+
+    def escrever():
+        conexao = sqlite3.connect(caminho, isolation_level=None, timeout=5)
+        conexao.execute('CREATE TABLE IF NOT EXISTS teste_backup (x)')
+        while not parar.is_set():
+            conexao.execute('INSERT INTO teste_backup VALUES (randomblob(200))')
+            escritas.set()
+            time.sleep(0.001)
+        conexao.close()
+
+    escritor = threading.Thread(target=escrever)
+    escritor.start()
+    progresso = Progresso()
+
+    def copiar():
+        with app.app_context():
+            backup.copiar_banco(str(tmp_path / 'copia.db'), progresso)
+
+    copia = threading.Thread(target=copiar)
+    try:
+        escritas.wait(5)
+        copia.start()
+        copia.join(timeout=60)
+        assert not copia.is_alive(), 'backup recomeçando a cada escrita'
+    finally:
+        parar.set()
+        escritor.join()
+        copia.join()
+    assert len(progresso.copiadas) > 3
+    assert progresso.copiadas == sorted(progresso.copiadas), 'a cópia recomeçou'
+    with sqlite3.connect(tmp_path / 'copia.db') as conexao:
+        assert conexao.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
@@ -0,0 +1,85 @@
+import io
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+
+def _bloqueio():
+    return OperationalError('UPDATE ...', {}, Exception('database is locked'))
+
+def test_estresse_sem_bloqueio_nem_escrita_dupla(app):
+    from banco import teste_estresse
+    resultado = teste_estresse(app.config, leitores=4, escritores=4, segundos=2)
+    assert resultado['erros_de_bloqueio'] == 0
+    assert resultado['escritas'] > 0
+    assert resultado['linhas'] == resultado['escritas']
+
+def test_inscricoes_concorrentes(app, contexto):
+    from app import db
+    from models import Candidato, Vaga
+    link = contexto['link_ativo']
+    vaga = Vaga.query.filter_by(link_inscricao=link).one()
+    antes = vaga.candidatos_count
+    status = []
+
+    def inscrever(indice):
+        cliente = app.test_client()
+        for numero in range(5):
+            resposta = cliente.post(f'/inscrever/{link}', data={
+                'nome': f'Concorrente {indice}', 'email': f'concorrente{indice}_{numero}@exemplo.com.br',
+                'curriculo': (io.BytesIO(b'%PDF-1.4 concorrente'), 'cv.pdf'),
+            })
+            status.append(resposta.status_code)
+
+    threads = [threading.Thread(target=inscrever, args=(indice,)) for indice in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert status == [200] * 40
+    assert Candidato.query.filter(Candidato.email.like('concorrente%')).count() == 40
+    assert db.session.get(Vaga, vaga.id).candidatos_count == antes + 40
+
+def test_repete_bloqueio_antes_do_commit(app):
+    from banco import repetir_se_bloqueado
+    chamadas = []
+
+    @repetir_se_bloqueado
+    def view():
+        chamadas.append(1)
+        if len(chamadas) < 3:
+            raise _bloqueio()
+        return 'ok'
+
+    assert view() == 'ok' and len(chamadas) == 3
+
+def test_nao_repete_bloqueio_depois_do_commit(app):
+    from app import db
+    from banco import repetir_se_bloqueado
+    chamadas = []
+
+    @repetir_se_bloqueado
+    def view():
+        chamadas.append(1)
+        db.session.commit()
+        raise _bloqueio()
+
+    with pytest.raises(OperationalError):
+        view()
+    assert len(chamadas) == 1
+
+def test_exclusao_de_vaga_com_coleta_bloqueada(cliente, monkeypatch):
+    import armazenamento
+    from app import db
+    from models import Vaga
+    vaga = Vaga(titulo='Para excluir', descricao='d', link_inscricao='para-excluir')
+    db.session.add(vaga)
+    db.session.commit()
+
+    def coleta_bloqueada():
+        raise _bloqueio()
+    monkeypatch.setattr(armazenamento, 'coletar_orfaos', coleta_bloqueada)
+    resposta = cliente.get(f'/vagas/excluir/{vaga.id}')
+    assert resposta.status_code == 302
+    assert db.session.get(Vaga, vaga.id) is None
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+def _s_maxage(resposta):
+    return resposta.cache_control.s_maxage, resposta.cache_control.max_age
+
+def test_inscricao_nao_fica_na_cdn_depois_do_encerramento(app):
+    from app import db
+    from models import Vaga
+    vaga = Vaga(titulo='Vence logo', descricao='d', link_inscricao='vence-logo',
+                data_encerramento=datetime.utcnow() + timedelta(seconds=30))
+    db.session.add(vaga)
+    db.session.commit()
+    for _ in range(2):  # gravada no cache e depois lida dele
+        resposta = app.test_client().get('/inscrever/vence-logo')
+        assert resposta.status_code == 200
+        s_maxage, max_age = _s_maxage(resposta)
+        assert 0 < s_maxage <= 30 and max_age <= 30
+
+def test_vaga_encerrada_tem_s_maxage_curto(app):
+    for _ in range(2):
+        resposta = app.test_client().get('/inscrever/nao-existe')
+        assert resposta.status_code == 404
+        assert resposta.cache_control.s_maxage <= app.config['CACHE_PAGINAS_TTL_ENCERRADA']
+
+def test_inscricao_ativa_respeita_ttl(app):
+    from app import db
+    from models import Vaga
+    db.session.add(Vaga(titulo='Sem prazo', descricao='d', link_inscricao='sem-prazo'))
+    db.session.commit()
+    resposta = app.test_client().get('/inscrever/sem-prazo')
+    assert resposta.status_code == 200
+    assert resposta.cache_control.s_maxage <= app.config['CACHE_PAGINAS_TTL']
+    assert resposta.cache_control.max_age <= app.config['CACHE_PAGINAS_MAX_AGE']
+
+def test_pagina_publica_sem_cookie_de_sessao(cliente, contexto):
+    for url in (f"/inscrever/{contexto['link_ativo']}", '/inscrever/nao-existe-2'):
+        for _ in range(2):  # renderizada e depois servida do cache
+            resposta = cliente.get(url)
+            assert resposta.cache_control.public
+            assert 'Set-Cookie' not in resposta.headers
+            assert 'Cookie' not in resposta.vary
+    # A sessão continua valendo nas páginas internas
+    assert cliente.get('/dashboard').status_code == 200
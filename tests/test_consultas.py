@@ -0,0 +1,80 @@
+"""O número de consultas de uma listagem não depende do tamanho da página (sem N+1),
+e a busca textual do banco de talentos casa sem acentos e ordena pelo bm25."""
+import uuid
+import pytest
+
+ROTAS = [
+    '/dashboard',
+    '/vagas',
+    '/vagas?arquivo=1',
+    '/candidatos/vaga/{vaga_id}',
+    '/candidatos/vaga/{vaga_id}?ordem=afinidade',
+    '/banco-talentos',
+    '/banco-talentos?status=banco_talentos',
+    '/banco-talentos?arquivo=1',
+]
+
+@pytest.mark.parametrize('rota', ROTAS)
+def test_consultas_nao_crescem_com_a_pagina(cliente, contexto, rota):
+    import cache_templates
+    from migracoes import capturar_consultas
+
+    url = rota.format(**contexto)
+    assert cliente.get(url).status_code == 200  # aquece os caches de KPIs e contagens
+    contagens = {}
+    for tamanho in (5, 50):
+        # Com os fragmentos em cache as linhas nem seriam renderizadas
+        cache_templates.fragmentos.limpar()
+        with capturar_consultas() as consultas:
+            resposta = cliente.get(f"{url}{'&' if '?' in url else '?'}por_pagina={tamanho}")
+            resposta.get_data()
+        assert resposta.status_code == 200
+        if 'arquivo=1' in url:
+            # A página precisa ter linhas quentes e arquivadas, cada lado com sua consulta
+            html = resposta.get_data(as_text=True)
+            assert '/arquivo/' in html and ('/candidatos/vaga/' in html or '/candidatos/ver/' in html)
+        contagens[tamanho] = len(consultas)
+    assert contagens[5] == contagens[50], contagens
+
+def test_banco_mostra_vaga_arquivada(cliente, contexto):
+    resposta = cliente.get('/banco-talentos', query_string={'status': 'banco_talentos', 'por_pagina': 200})
+    html = resposta.get_data(as_text=True)
+    assert any(f'/vagas/arquivo/{vaga_id}"' in html for vaga_id in contexto['vagas_arquivadas'])
+
+def _candidatos(db, *campos, titulo='Vaga da busca'):
+    from models import Vaga, Candidato
+    vaga = Vaga(titulo=titulo, descricao='d', link_inscricao=uuid.uuid4().hex[:8])
+    db.session.add(vaga)
+    db.session.flush()
+    candidatos = [Candidato(vaga_id=vaga.id, email=f'busca{indice}@{vaga.link_inscricao}.com', **valores)
+                  for indice, valores in enumerate(campos)]
+    db.session.add_all(candidatos)
+    db.session.commit()
+    return [candidato.id for candidato in candidatos]
+
+def _buscar(db, busca):
+    from models import Candidato
+    from busca import subconsulta_busca
+    resultado = subconsulta_busca(busca)
+    return [id for id, in db.session.query(Candidato.id).join(resultado, resultado.c.id == Candidato.id)
+            .order_by(resultado.c.rank, Candidato.id)]
+
+def test_busca_ignora_acentos_e_maiusculas(app):
+    from app import db
+    com_acento, sem_acento, outro_nome = _candidatos(
+        db, {'nome': 'João Quixabeira'}, {'nome': 'JOAO Quixabeira Souza'}, {'nome': 'Joana Quixabeira'})
+    for busca in ('joao quixabeira', 'JOÃO Quixabeira', 'joão quixa'):
+        assert sorted(_buscar(db, busca)) == [com_acento, sem_acento]
+    assert sorted(_buscar(db, 'quixabeira')) == [com_acento, sem_acento, outro_nome]
+
+def test_busca_ordena_pelo_bm25_com_pesos_por_coluna(cliente, app):
+    from app import db
+    no_nome, nas_observacoes = _candidatos(
+        db, {'nome': 'Zambujeiro Lima'}, {'nome': 'Carla Souza', 'observacoes': 'zambujeiro'})
+    no_titulo, = _candidatos(db, {'nome': 'Bruno Dias'}, titulo='Analista Zambujeiro')
+    # nome (10) > título da vaga (5) > observações (1)
+    assert _buscar(db, 'zambujeiro') == [no_nome, no_titulo, nas_observacoes]
+
+    html = cliente.get('/banco-talentos?busca=zambujeiro').get_data(as_text=True)
+    posicoes = [html.index(nome) for nome in ('Zambujeiro Lima', 'Bruno Dias', 'Carla Souza')]
+    assert posicoes == sorted(posicoes)
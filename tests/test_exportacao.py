@@ -0,0 +1,63 @@
+"""Exportação em CSV: enviada em fluxo, com escape do separador, aspas e quebras de linha."""
+import csv
+import io
+import uuid
+
+def _vaga(db, *campos):
+    from models import Vaga, Candidato
+    vaga = Vaga(titulo='Vaga exportada', descricao='d', link_inscricao=uuid.uuid4().hex[:8])
+    db.session.add(vaga)
+    db.session.flush()
+    candidatos = [Candidato(vaga_id=vaga.id, email=f'export{indice}@{vaga.link_inscricao}.com', **valores)
+                  for indice, valores in enumerate(campos)]
+    db.session.add_all(candidatos)
+    db.session.commit()
+    return vaga, [candidato.id for candidato in candidatos]
+
+def _linhas(corpo):
+    texto = corpo.decode('utf-8')
+    assert texto.startswith('\ufeff')
+    return list(csv.reader(io.StringIO(texto[1:], newline=''), delimiter=';'))
+
+def test_csv_escapa_separador_aspas_e_quebras(cliente, app):
+    from app import db
+    from exportacao import COLUNAS_EXPORTACAO
+    observacoes = 'salário; "negociável"\r\nsegunda linha'
+    vaga, (id,) = _vaga(db, {'nome': '=HYPERLINK("x")', 'observacoes': observacoes, 'telefone': '+55 11'})
+    resposta = cliente.get(f'/candidatos/vaga/{vaga.id}/exportar')
+    assert resposta.status_code == 200 and resposta.mimetype == 'text/csv'
+    assert resposta.headers['Content-Disposition'].startswith(f'attachment; filename="candidatos_vaga_{vaga.id}_')
+
+    cabecalho, linha = _linhas(resposta.get_data())
+    assert cabecalho == [titulo for titulo, _ in COLUNAS_EXPORTACAO]
+    campos = dict(zip(cabecalho, linha))
+    assert campos['ID'] == str(id) and campos['Vaga'] == 'Vaga exportada'
+    assert campos['Observações'] == observacoes
+    # Conteúdo que o Excel leria como fórmula vai como texto
+    assert campos['Nome'] == '\'=HYPERLINK("x")' and campos['Telefone'] == "'+55 11"
+
+def test_csv_em_fluxo_por_blocos(cliente, app, monkeypatch):
+    import exportacao
+    from app import db
+    monkeypatch.setattr(exportacao, 'LINHAS_POR_BLOCO', 2)
+    vaga, ids = _vaga(db, *({'nome': f'Fluxo {indice}'} for indice in range(5)))
+    resposta = cliente.get(f'/candidatos/vaga/{vaga.id}/exportar')
+    assert resposta.is_streamed
+    blocos = list(resposta.response)
+    # BOM, dois blocos de 2 linhas (o primeiro com o cabeçalho) e o restante
+    assert len(blocos) == 4
+    linhas = _linhas(b''.join(blocos))
+    assert [linha[0] for linha in linhas[1:]] == [str(id) for id in reversed(ids)]
+
+def test_filtros_da_listagem(cliente, app):
+    from app import db
+    termo = 'Xerimbabo'
+    _, (no_nome, nas_observacoes, reprovado) = _vaga(
+        db, {'nome': f'{termo} Dias', 'status': 'aprovado'},
+        {'nome': 'Ana Lopes', 'observacoes': termo.lower(), 'status': 'aprovado'},
+        {'nome': f'{termo} Reis', 'status': 'reprovado'})
+    resposta = cliente.get('/banco-talentos/exportar', query_string={'busca': termo, 'status': 'aprovado'})
+    assert [linha[0] for linha in _linhas(resposta.get_data())[1:]] == [str(no_nome), str(nas_observacoes)]
+    resposta = cliente.get('/banco-talentos/exportar', query_string={'busca': termo})
+    assert len(_linhas(resposta.get_data())) == 4
+    assert cliente.get('/banco-talentos/exportar?formato=pdf').status_code == 400
@@ -0,0 +1,18 @@
+from concurrent.futures import Future
+
+def test_falha_no_futuro_vira_erro_registrado(app):
+    from app import db
+    from models import TextoCurriculo
+    import extracao
+
+    cancelado, com_erro = Future(), Future()
+    cancelado.cancel()
+    com_erro.set_exception(RuntimeError('não serializável'))
+    for hash_arquivo, futuro in (('c' * 64, cancelado), ('e' * 64, com_erro)):
+        extracao._em_andamento.add(hash_arquivo)
+        extracao._ao_concluir(hash_arquivo, futuro)
+        assert hash_arquivo not in extracao._em_andamento
+        texto = db.session.get(TextoCurriculo, hash_arquivo)
+        assert texto.status == 'erro'
+    assert 'cancelada' in db.session.get(TextoCurriculo, 'c' * 64).erro
+    assert 'não serializável' in db.session.get(TextoCurriculo, 'e' * 64).erro
@@ -0,0 +1,95 @@
+"""Importação de CSV: leitura, validação, duplicidade e a corrida entre duas importações."""
+import csv
+import io
+import os
+
+def test_leitor_detecta_separador_codificacao_e_linhas(app, tmp_path):
+    from importacao import LeitorCsv
+    caminho = tmp_path / 'excel.csv'
+    caminho.write_bytes('Nome;E-mail Pessoal;Observações\r\n'
+                        'José;jose@x.com;"duas\r\nlinhas"\r\n'
+                        'Ana;ana@x.com;ok\r\n'.encode('cp1252'))
+    with LeitorCsv(str(caminho)) as leitor:
+        assert leitor.colunas == ['nome', 'e-mail_pessoal', 'observacoes']
+        linhas = list(leitor)
+        assert leitor.progresso == 100
+    assert [linha for linha, _ in linhas] == [3, 4]
+    assert linhas[0][1]['nome'] == 'José' and linhas[0][1]['observacoes'] == 'duas\r\nlinhas'
+
+def test_registro_candidato_valida_como_a_inscricao(app):
+    from datetime import datetime
+    from importacao import _registro_candidato
+    agora = datetime(2024, 1, 1)
+    vagas = {'abc123': 7}
+    registro, erro = _registro_candidato({'nome': 'Maria', 'email': 'maria@x.com', 'vaga': 'ABC123',
+                                          'data_candidatura': '02/03/2023'}, None, vagas, agora)
+    assert erro is None
+    assert registro['vaga_id'] == 7 and registro['status'] == 'pendente'
+    assert registro['data_candidatura'] == datetime(2023, 3, 2)
+    for campos, motivo in (({'nome': 'Maria', 'email': 'invalido'}, 'Email inválido.'),
+                           ({'nome': 'Maria', 'email': 'm@x.com', 'vaga': 'nenhuma'}, 'Vaga não encontrada: nenhuma'),
+                           ({'nome': 'Maria', 'email': 'm@x.com', 'status': 'contratado'}, 'Status inválido: contratado'),
+                           ({'nome': 'Maria', 'email': 'm@x.com', 'data_candidatura': '31/02'}, 'Data de candidatura inválida.')):
+        assert _registro_candidato(campos, 7, vagas, agora) == (None, motivo)
+
+def test_importacao_ignora_duplicados_no_banco_e_no_arquivo(app, contexto, tmp_path, monkeypatch):
+    from app import db
+    from models import Candidato, Vaga
+    from importacao import importar_candidatos, caminho_relatorio
+    from tarefas import executar_tarefa
+    import banco
+    # Lotes e cláusulas IN pequenos para cruzar as fronteiras entre eles
+    monkeypatch.setitem(app.config, 'IMPORTACAO_LOTE', 2)
+    monkeypatch.setattr(banco, 'LIMITE_IN', 1)
+    vaga_id = contexto['vaga_pequena_id']
+    ja_inscrito = 'ja.inscrito@x.com'
+    db.session.add(Candidato(nome='Já Inscrito', email=ja_inscrito, vaga_id=vaga_id))
+    db.session.commit()
+    antes = db.session.get(Vaga, vaga_id).candidatos_count
+
+    caminho = tmp_path / 'candidatos.upload'
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['nome', 'email', 'telefone'])
+        escritor.writerow(['Já Inscrito', ja_inscrito, ''])
+        escritor.writerow(['Nova Pessoa', 'nova.importacao@x.com', '11 9999'])
+        escritor.writerow(['Nova Pessoa', 'nova.importacao@x.com', ''])  # mesmo lote
+        escritor.writerow(['Outra Pessoa', 'outra.importacao@x.com', ''])
+        escritor.writerow(['Sem Email', 'sem-email', ''])
+        escritor.writerow(['Outra Pessoa', 'outra.importacao@x.com', ''])  # lote seguinte
+    tarefa = executar_tarefa('importacao', importar_candidatos, str(caminho), vaga_id=vaga_id)
+
+    assert tarefa.status == 'concluida', tarefa.mensagem
+    assert {chave: tarefa.resultado[chave] for chave in ('importados', 'duplicados', 'erros')} == \
+        {'importados': 2, 'duplicados': 3, 'erros': 1}
+    assert not os.path.exists(caminho)
+    with open(caminho_relatorio(tarefa.id), encoding='utf-8-sig') as relatorio:
+        assert list(csv.reader(relatorio, delimiter=';')) == [
+            ['Linha', 'Motivo'], ['2', 'Candidato já cadastrado nesta vaga.'],
+            ['4', 'Candidato já cadastrado nesta vaga.'], ['6', 'Email inválido.'],
+            ['7', 'Candidato já cadastrado nesta vaga.']]
+    db.session.expire_all()
+    assert db.session.get(Vaga, vaga_id).candidatos_count == antes + 2
+    assert Candidato.query.filter_by(email='nova.importacao@x.com', vaga_id=vaga_id).count() == 1
+
+def test_importacao_concorrente_descarta_o_upload(cliente, app, monkeypatch):
+    import threading
+    import auditoria
+    import routes
+    from tarefas import iniciar_tarefa
+    liberar = threading.Event()
+    rodando = iniciar_tarefa('importacao', lambda tarefa: liberar.wait(10))
+    try:
+        # A outra importação começa depois da verificação da rota
+        monkeypatch.setattr(routes, 'ultima_tarefa', lambda tipo: None)
+        eventos = len(auditoria._buffer)
+        resposta = cliente.post('/manutencao/importar', content_type='multipart/form-data', data={
+            'tipo': 'candidatos', 'arquivo': (io.BytesIO(b'nome,email\r\n'), 'lista.csv')})
+        assert resposta.status_code == 302
+        assert rodando.criada
+        assert not [nome for nome in os.listdir(app.config['TAREFAS_PASTA']) if nome.endswith('.upload')]
+        assert not [evento for evento in list(auditoria._buffer)[eventos:] if evento['acao'] == 'importacao']
+        with cliente.session_transaction() as sessao:
+            assert ('warning', 'Já existe uma importação em andamento.') in sessao['_flashes']
+    finally:
+        liberar.set()
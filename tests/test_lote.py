@@ -0,0 +1,87 @@
+"""Ações em lote nos candidatos: resultado por id e contadores mantidos pelos triggers."""
+import io
+import os
+
+def _vaga_com_candidatos(db, link, quantidade):
+    from models import Vaga, Candidato
+    vaga = Vaga(titulo='Vaga do lote', descricao='d', link_inscricao=link)
+    db.session.add(vaga)
+    db.session.flush()
+    candidatos = [Candidato(nome=f'Lote {indice}', email=f'lote{indice}@{link}.com', vaga_id=vaga.id)
+                  for indice in range(quantidade)]
+    db.session.add_all(candidatos)
+    db.session.commit()
+    return vaga, [candidato.id for candidato in candidatos]
+
+def _lote(cliente, acao, ids, **campos):
+    resposta = cliente.post('/candidatos/lote', data={'acao': acao, 'ids': ids, **campos},
+                            headers={'Accept': 'application/json'})
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+def _contadores_consistentes():
+    from indicadores import recalcular_contagens
+    assert recalcular_contagens() == []
+
+def test_status_em_lote(cliente, app):
+    from app import db
+    from models import Candidato, Vaga
+    from indicadores import contagem_por_status
+    vaga, ids = _vaga_com_candidatos(db, 'lote-status', 4)
+    inexistente = db.session.query(db.func.max(Candidato.id)).scalar() + 1000
+
+    corpo = _lote(cliente, 'status', [str(ids[0]), str(ids[1]), str(ids[1]), str(inexistente), 'abc'],
+                  status='aprovado')
+    assert corpo['resultado'] == {str(ids[0]): 'atualizado', str(ids[1]): 'atualizado',
+                                  str(inexistente): 'nao_encontrado', 'abc': 'invalido'}
+    assert corpo['totais'] == {'atualizado': 2, 'nao_encontrado': 1, 'invalido': 1}
+
+    db.session.expire_all()
+    assert [db.session.get(Candidato, id).status for id in ids] == ['aprovado', 'aprovado', 'pendente', 'pendente']
+    contagem = contagem_por_status(vaga.id)
+    assert contagem['aprovado'] == 2 and contagem['pendente'] == 2
+    assert db.session.get(Vaga, vaga.id).candidatos_count == 4
+
+    _lote(cliente, 'banco_talentos', [str(ids[2])])
+    assert contagem_por_status(vaga.id)['banco_talentos'] == 1
+    _contadores_consistentes()
+
+def test_status_invalido_nao_altera(cliente, app):
+    from app import db
+    from models import Candidato
+    _, ids = _vaga_com_candidatos(db, 'lote-invalido', 1)
+    resposta = cliente.post('/candidatos/lote', data={'acao': 'status', 'ids': [str(ids[0])], 'status': 'contratado'})
+    assert resposta.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Candidato, ids[0]).status == 'pendente'
+
+def test_exclusao_em_lote(cliente, app):
+    from werkzeug.datastructures import FileStorage
+    from app import db
+    from models import Candidato, Vaga, ArquivoCurriculo
+    from armazenamento import salvar_curriculo, caminho_arquivo
+    vaga, ids = _vaga_com_candidatos(db, 'lote-exclusao', 3)
+    # Dois candidatos com o mesmo currículo: uma referência sobra depois de excluir um
+    conteudo = b'%PDF-1.4 lote ' + os.urandom(16)
+    for id in ids[:2]:
+        armazenado = salvar_curriculo(FileStorage(stream=io.BytesIO(conteudo), filename='cv.pdf'), 'pdf')
+        db.session.get(Candidato, id).arquivo_hash = armazenado['hash']
+    db.session.commit()
+    caminho = os.path.join(app.config['UPLOAD_FOLDER'], caminho_arquivo(armazenado['nome']))
+    inexistente = db.session.query(db.func.max(Candidato.id)).scalar() + 1000
+
+    corpo = _lote(cliente, 'excluir', [str(ids[0]), str(inexistente)])
+    assert corpo['totais'] == {'excluido': 1, 'nao_encontrado': 1}
+    db.session.expire_all()
+    assert db.session.get(Candidato, ids[0]) is None
+    assert db.session.get(Vaga, vaga.id).candidatos_count == 2
+    assert db.session.get(ArquivoCurriculo, armazenado['hash']).referencias == 1
+    assert os.path.exists(caminho)
+
+    corpo = _lote(cliente, 'excluir', [str(id) for id in ids])
+    assert corpo['resultado'] == {str(ids[0]): 'nao_encontrado', str(ids[1]): 'excluido', str(ids[2]): 'excluido'}
+    db.session.expire_all()
+    assert db.session.get(Vaga, vaga.id).candidatos_count == 0
+    assert db.session.get(ArquivoCurriculo, armazenado['hash']) is None
+    assert not os.path.exists(caminho)
+    _contadores_consistentes()
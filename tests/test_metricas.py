@@ -0,0 +1,6 @@
+def test_server_timing_so_para_usuarios_logados(cliente, contexto, app):
+    publico = app.test_client()
+    for url in (f"/inscrever/{contexto['link_ativo']}", '/nao-existe', '/login'):
+        assert 'Server-Timing' not in publico.get(url).headers, url
+    tempos = cliente.get('/dashboard').headers['Server-Timing']
+    assert tempos.startswith('sql;dur=') and 'total;dur=' in tempos
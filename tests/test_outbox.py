@@ -0,0 +1,122 @@
+"""Outbox contra um servidor SMTP de mentira: entrega, nova tentativa com espera e descarte."""
+import socketserver
+import threading
+from datetime import datetime, timedelta
+import pytest
+
+class ServidorSmtp(socketserver.ThreadingTCPServer):
+    """O mínimo do SMTP para o smtplib; recusa destinatários que começam com 'recusar'"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SessaoSmtp)
+        self.recebidas = []
+
+class SessaoSmtp(socketserver.StreamRequestHandler):
+    def responder(self, linha):
+        self.wfile.write(linha.encode() + b'\r\n')
+
+    def handle(self):
+        self.responder('220 stub')
+        destinatarios = []
+        for comando in self.rfile:
+            verbo = comando[:4].decode().upper()
+            if verbo == 'EHLO' or verbo == 'HELO':
+                self.responder('250 stub')
+            elif verbo == 'RCPT':
+                if b'<recusar' in comando:
+                    self.responder('550 destinatario recusado')
+                else:
+                    destinatarios.append(comando.split(b'<', 1)[1].split(b'>', 1)[0].decode())
+                    self.responder('250 ok')
+            elif verbo == 'DATA':
+                self.responder('354 fim com .')
+                corpo = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                self.server.recebidas.append((destinatarios, corpo))
+                destinatarios = []
+                self.responder('250 ok')
+            elif verbo == 'QUIT':
+                self.responder('221 tchau')
+                return
+            else:  # MAIL, RSET, NOOP
+                if verbo == 'RSET':
+                    destinatarios = []
+                self.responder('250 ok')
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    from app import db
+    from models import EmailOutbox
+    servidor = ServidorSmtp()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    estado = app.extensions['mail']
+    for campo, valor in (('server', '127.0.0.1'), ('port', servidor.server_address[1]), ('use_tls', False),
+                         ('use_ssl', False), ('username', ''), ('suppress', False)):
+        monkeypatch.setattr(estado, campo, valor)
+    monkeypatch.setitem(app.config, 'MAIL_DEFAULT_SENDER', 'rh@budel.test')
+    monkeypatch.setitem(app.config, 'OUTBOX_LIMITE_POR_SEGUNDO', 1000)
+    # Só os emails do teste na fila (as inscrições de outros testes já enfileiraram os seus)
+    EmailOutbox.query.filter(EmailOutbox.status.in_(['pendente', 'enviando'])).update(
+        {'status': 'enviado'}, synchronize_session=False)
+    db.session.commit()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+def _enfileirar(*destinatarios):
+    from app import db
+    from outbox import enfileirar_email
+    itens = [enfileirar_email(destinatario, f'Assunto {destinatario}', 'Corpo') for destinatario in destinatarios]
+    db.session.commit()
+    return itens
+
+def test_entrega_em_uma_conexao(app, smtp):
+    from app import db
+    from outbox import processar_fila
+    itens = _enfileirar('ana@x.com', 'bia@x.com')
+    assert processar_fila() == 2
+    assert [destinatarios for destinatarios, _ in smtp.recebidas] == [['ana@x.com'], ['bia@x.com']]
+    assert b'Subject: Assunto ana@x.com' in smtp.recebidas[0][1]
+    for item in itens:
+        db.session.refresh(item)
+        assert item.status == 'enviado' and item.data_envio and item.tentativas == 0
+
+def test_falha_espera_e_descarte(app, smtp, monkeypatch):
+    from app import db
+    from outbox import processar_fila
+    monkeypatch.setitem(app.config, 'OUTBOX_MAX_TENTATIVAS', 3)
+    base = app.config['OUTBOX_BACKOFF_BASE']
+    recusado, aceito = _enfileirar('recusar@x.com', 'caio@x.com')
+
+    for tentativa in (1, 2):
+        antes = datetime.utcnow()
+        processar_fila()
+        db.session.refresh(recusado)
+        assert recusado.status == 'pendente' and recusado.tentativas == tentativa
+        assert '550' in recusado.ultimo_erro
+        espera = recusado.proxima_tentativa - antes
+        assert timedelta(seconds=base * 2 ** (tentativa - 1)) <= espera < timedelta(seconds=base * 2 ** (tentativa - 1) + 5)
+        # Antes da hora marcada o item não é reservado de novo
+        assert processar_fila() == 0
+        recusado.proxima_tentativa = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    processar_fila()
+    db.session.refresh(recusado)
+    assert recusado.status == 'falhou' and recusado.tentativas == 3
+    recusado.proxima_tentativa = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert processar_fila() == 0
+    db.session.refresh(aceito)
+    assert aceito.status == 'enviado'
+    assert [destinatarios for destinatarios, _ in smtp.recebidas] == [['caio@x.com']]
+
+def test_servidor_fora_do_ar_conta_tentativa(app, smtp, monkeypatch):
+    from app import db
+    from outbox import processar_fila
+    smtp.server_close()  # porta fechada: a conexão é recusada
+    item, = _enfileirar('dani@x.com')
+    assert processar_fila() == 1
+    db.session.refresh(item)
+    assert item.status == 'pendente' and item.tentativas == 1 and item.proxima_tentativa > datetime.utcnow()
@@ -0,0 +1,55 @@
+"""Paginação por cursor: ida e volta dos cursores, desempate pelo id e cursores adulterados."""
+import base64
+import json
+from datetime import datetime
+import pytest
+
+def _cursor(dados):
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip('=')
+
+def test_cursor_ida_e_volta(app):
+    from models import Vaga
+    from paginacao import codificar_cursor, decodificar_cursor
+    valores = [datetime(2024, 5, 1, 12, 30, 15, 123456), 42]
+    assert decodificar_cursor(codificar_cursor(valores), (Vaga.data_criacao, Vaga.id)) == valores
+
+@pytest.mark.parametrize('dados', [[['2024-05-01'], 1], [{'a': 1}, 1], ['2024-05-01T00:00:00', [1]],
+                                   ['2024-05-01T00:00:00', '1'], ['2024-05-01T00:00:00', True],
+                                   ['2024-05-01T00:00:00', 1.5], [20240501, 1], ['ontem', 1],
+                                   ['2024-05-01T00:00:00'], {'apos': 1}])
+def test_cursor_com_tipo_errado_e_invalido(app, dados):
+    from models import Vaga
+    from paginacao import decodificar_cursor
+    assert decodificar_cursor(_cursor(dados), (Vaga.data_criacao, Vaga.id)) is None
+
+@pytest.mark.parametrize('cursor', [_cursor([[1], {'x': 1}]), _cursor([{'x': 1}, 1]), 'nao-e-base64!'])
+def test_cursor_adulterado_responde_400(cliente, cursor):
+    for url in ('/api/vagas?apos=', '/vagas?antes='):
+        assert cliente.get(url + cursor).status_code == 400
+
+def test_empate_na_data_desempata_pelo_id(app):
+    from app import db
+    from models import Vaga, Candidato
+    from paginacao import paginar
+    vaga = Vaga(titulo='Vaga do empate', descricao='d', link_inscricao='empate')
+    db.session.add(vaga)
+    db.session.flush()
+    mesma_data = datetime(2024, 1, 1, 9, 0, 0)
+    db.session.add_all(Candidato(nome=f'Empate {indice}', email=f'empate{indice}@x.com', vaga_id=vaga.id,
+                                 data_candidatura=mesma_data) for indice in range(7))
+    db.session.commit()
+    esperados = [id for id, in db.session.query(Candidato.id).filter_by(vaga_id=vaga.id).order_by(Candidato.id.desc())]
+    colunas = (Candidato.data_candidatura, Candidato.id)
+    query = Candidato.query.filter_by(vaga_id=vaga.id)
+
+    paginas = [paginar(query, colunas, tamanho=3)]
+    while paginas[-1].proximo_cursor:
+        paginas.append(paginar(query, colunas, apos=paginas[-1].proximo_cursor, tamanho=3))
+    assert [[c.id for c in pagina] for pagina in paginas] == [esperados[:3], esperados[3:6], esperados[6:]]
+    assert paginas[0].anterior_cursor is None
+
+    # Voltando pelo cursor 'antes' as páginas se repetem iguais
+    voltando = [paginas[-1]]
+    while voltando[-1].anterior_cursor:
+        voltando.append(paginar(query, colunas, antes=voltando[-1].anterior_cursor, tamanho=3))
+    assert [[c.id for c in pagina] for pagina in reversed(voltando)] == [[c.id for c in pagina] for pagina in paginas]
@@ -0,0 +1,29 @@
+"""As consultas que as listagens realmente emitem usam índice (EXPLAIN QUERY PLAN).
+
+Também disponível contra o banco de produção: flask verificar-indices
+"""
+import pytest
+
+@pytest.fixture
+def resultados(cliente, contexto):
+    from cache_paginas import invalidar_pagina, chave_inscricao
+    from migracoes import urls_das_listagens, verificar_planos
+    invalidar_pagina(chave_inscricao(contexto['link_ativo']))  # a inscrição consulta o banco só na falta
+    return verificar_planos(cliente, urls_das_listagens(contexto['vaga_id'], contexto['link_ativo']))
+
+def test_rotas_respondem(resultados):
+    for nome, status, explicadas in resultados:
+        assert all(codigo == 200 for codigo in status), (nome, status)
+        assert explicadas, f'{nome}: nenhuma consulta capturada'
+
+def test_listagens_paginam(resultados):
+    paginadas = {nome for nome, status, _ in resultados if len(status) == 2}
+    assert {'vagas', 'candidatos da vaga', 'banco de talentos', 'api: candidatos'} <= paginadas
+
+def test_consultas_usam_indice(resultados):
+    falhas = [
+        f"{nome}: {' '.join(sql.split())[:200]}\n    -> {' | '.join(plano)}"
+        for nome, _, explicadas in resultados
+        for sql, plano, problemas in explicadas if problemas
+    ]
+    assert not falhas, '\n'.join(falhas)
@@ -0,0 +1,33 @@
+import os
+
+def test_sondagem_nao_recria_a_trava(app):
+    from tarefas import Tarefa
+    tarefa = Tarefa('sondagem')
+    tarefa.salvar()
+    lida = Tarefa(**tarefa.to_dict())  # o que outro worker leu enquanto ela rodava
+
+    # A tarefa termina: grava o estado final e apaga a trava
+    tarefa.status = 'concluida'
+    tarefa.salvar()
+    assert not os.path.exists(tarefa.caminho_trava)
+    assert lida.motivo_interrupcao() is None
+    assert lida.status == 'concluida'
+    assert not os.path.exists(tarefa.caminho_trava)
+
+def test_executando_sem_trava_e_interrompida(app):
+    from tarefas import Tarefa
+    tarefa = Tarefa('sem_trava')
+    tarefa.salvar()
+    assert tarefa.motivo_interrupcao().startswith('Interrompida')
+    assert not os.path.exists(tarefa.caminho_trava)
+
+def test_tarefa_viva_enquanto_executa(app):
+    import threading
+    from tarefas import iniciar_tarefa, ultima_tarefa
+    liberar = threading.Event()
+    tarefa = iniciar_tarefa('viva', lambda tarefa: liberar.wait(10))
+    try:
+        assert ultima_tarefa('viva').status == 'executando'
+        assert iniciar_tarefa('viva', lambda tarefa: None).id == tarefa.id
+    finally:
+        liberar.set()
@@ -0,0 +1,16 @@
+import pytest
+from validacao import caminho_local
+
+@pytest.mark.parametrize('url', ['/banco-talentos', '/candidatos/vaga/3?status=pendente&apos=x', '/a//b'])
+def test_caminho_local_aceita_caminhos_do_site(url):
+    assert caminho_local(url) == url
+
+@pytest.mark.parametrize('url', ['', 'banco-talentos', '//evil.com', '///evil.com', '/\\evil.com', '/\\/evil.com',
+                                 '\\\\evil.com', 'https://evil.com', '/\t/evil.com', '/\n/evil.com', ' //evil.com'])
+def test_caminho_local_recusa_outros_hosts(url):
+    assert caminho_local(url) is None
+
+def test_lote_nao_redireciona_para_fora(cliente):
+    resposta = cliente.post('/candidatos/lote', data={'acao': 'status', 'voltar': '/\\evil.com'})
+    assert resposta.status_code == 302
+    assert resposta.headers['Location'].endswith('/banco-talentos')
@@ -0,0 +1,43 @@
+import re
+from datetime import datetime, date, time
+from urllib.parse import urlsplit
+
+# Regras de validação compartilhadas pelo formulário de inscrição e pela importação
+
+REGEX_EMAIL = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
+def sanitize_input(text):
+    """Remove caracteres perigosos de entrada"""
+    if not text:
+        return ''
+    # Remove tags HTML/JS
+    text = re.sub(r'<[^>]+>', '', str(text))
+    return text.strip()
+
+def validar_candidato(nome, email):
+    """Mensagem de erro para nome/email já sanitizados, ou None se válidos"""
+    if not REGEX_EMAIL.match(email):
+        return 'Email inválido.'
+    if len(nome) < 3:
+        return 'Nome inválido.'
+    return None
+
+def ler_data_encerramento(valor):
+    """Data do formulário (AAAA-MM-DD) como o último instante do dia; None se vazia ou inválida"""
+    try:
+        return datetime.combine(date.fromisoformat(valor), time(23, 59, 59)) if valor else None
+    except ValueError:
+        return None
+
+def caminho_local(url):
+    """url se for um caminho deste site (para redirecionar de volta), ou None.
+
+    Recusa esquema, host, barra invertida (navegadores a tratam como /) e espaços ou
+    caracteres de controle (removidos pelo navegador, podem formar um //host).
+    """
+    if not url or not url.startswith('/') or url.startswith('//') or '\\' in url or any(ord(c) <= 32 or ord(c) == 127 for c in url):
+        return None
+    partes = urlsplit(url)
+    if partes.scheme or partes.netloc:
+        return None
+    return url